@@ -0,0 +1,304 @@
+"""
+A local stand-in for the Ollama HTTP API, for benchmarks and tests.
+
+Implements /api/embeddings, /api/embed, /api/generate, /api/chat (NDJSON
+streaming or a single JSON body) and /api/tags. Embeddings are deterministic
+pseudo-random unit vectors derived from the input text, so the same chunk
+always maps to the same vector. Latency and throughput are configurable to
+model a slower or faster machine:
+
+    with FakeOllama(latency=0.01, token_rate=50) as server:
+        config["ollama_base_url"] = server.url
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, List, Optional
+
+DEFAULT_MODELS = [
+    "manutic/nomic-embed-code:7b-Q4_K_M",
+    "codestral:22b-v0.1-q2_K",
+]
+
+
+def fake_vector(text: str, dim: int = 768) -> List[float]:
+    """A unit vector seeded by the text's hash."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vec = [rng.gauss(0.0, 1.0) for _ in range(dim)]
+    norm = math.sqrt(sum(v * v for v in vec)) or 1.0
+    return [v / norm for v in vec]
+
+
+_MANIFEST_LANGUAGES = {
+    "package.json": ("node", "20"),
+    "go.mod": ("go", "1.22"),
+    "pyproject.toml": ("python", "3.11"),
+    "requirements.txt": ("python", "3.11"),
+    "Pipfile": ("python", "3.11"),
+}
+
+
+def default_reply(prompt: str) -> str:
+    """
+    Canned answers shaped like the ones the pipeline expects: service
+    detection JSON for manifest prompts, a Dockerfile or compose file for
+    generation prompts, and a short answer otherwise.
+    """
+    match = re.search(r"Manifest filename: (\S+)", prompt)
+    if match:
+        path = match.group(1)
+        language, version = _MANIFEST_LANGUAGES.get(
+            os.path.basename(path), ("unknown", None)
+        )
+        return json.dumps(
+            {
+                "language": language,
+                "version": version,
+                "service_name": os.path.basename(os.path.dirname(path))
+                or "root_service",
+            }
+        )
+    # The system prompt comes first and names the artifact being generated.
+    head = prompt[:300].lower()
+    if "compose" in head:
+        return "services:\n  app:\n    build: .\n    ports:\n      - '8000:8000'\n"
+    if "dockerfile" in head:
+        return (
+            "FROM python:3.11-slim\nWORKDIR /app\nCOPY . .\n"
+            'CMD ["python", "main.py"]\n'
+        )
+    return "Not found in context."
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format, *args):  # noqa: A002 - silence request logs
+        pass
+
+    def _send_json(self, body: dict, status: int = 200) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.end_headers()
+
+    def do_GET(self):
+        fake = self.server.fake
+        fake._record(self.path)
+        if self.path == "/api/tags":
+            self._send_json(
+                {
+                    "models": [
+                        {"name": m, "model": m, "size": 0, "digest": ""}
+                        for m in fake.models
+                    ]
+                }
+            )
+        elif self.path == "/":
+            data = b"Ollama is running"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        fake = self.server.fake
+        fake._record(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, status=400)
+            return
+        fake._sleep(fake.latency)
+        if self.path == "/api/embeddings":
+            fake._sleep_for_embeddings(1)
+            self._send_json({"embedding": fake_vector(body["prompt"], fake.dim)})
+        elif self.path == "/api/embed":
+            inputs = body["input"]
+            if isinstance(inputs, str):
+                inputs = [inputs]
+            fake._sleep_for_embeddings(len(inputs))
+            self._send_json(
+                {
+                    "model": body.get("model"),
+                    "embeddings": [fake_vector(t, fake.dim) for t in inputs],
+                }
+            )
+        elif self.path == "/api/generate":
+            self._generate(body, body.get("prompt", ""), chat=False)
+        elif self.path == "/api/chat":
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+            self._generate(body, prompt, chat=True)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _generate(self, body: dict, prompt: str, chat: bool) -> None:
+        fake = self.server.fake
+        reply = fake.responder(prompt)
+        # Split into word-ish pieces that keep their whitespace.
+        pieces = re.findall(r"\S+\s*|\s+", reply) or [""]
+        started = time.perf_counter_ns()
+        base = {
+            "model": body.get("model"),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        }
+
+        def chunk(text: str) -> dict:
+            if chat:
+                return {**base, "message": {"role": "assistant", "content": text}}
+            return {**base, "response": text}
+
+        def final() -> dict:
+            total = time.perf_counter_ns() - started
+            done = chunk("")
+            done.update(
+                {
+                    "done": True,
+                    "done_reason": "stop",
+                    "total_duration": total,
+                    "load_duration": 0,
+                    "prompt_eval_count": len(prompt) // 4 + 1,
+                    "prompt_eval_duration": 0,
+                    "eval_count": len(pieces),
+                    "eval_duration": total,
+                }
+            )
+            return done
+
+        if body.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.end_headers()
+            for piece in pieces:
+                fake._sleep_for_tokens(1)
+                self.wfile.write(
+                    (json.dumps({**chunk(piece), "done": False}) + "\n").encode()
+                )
+                self.wfile.flush()
+            self.wfile.write((json.dumps(final()) + "\n").encode())
+            self.close_connection = True
+        else:
+            fake._sleep_for_tokens(len(pieces))
+            body = final()
+            if chat:
+                body["message"]["content"] = reply
+            else:
+                body["response"] = reply
+            self._send_json(body)
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    fake: "FakeOllama"
+
+
+class FakeOllama:
+    """
+    Fake Ollama server on ``host:port`` (port 0 picks a free one).
+
+    ``latency`` seconds are added to every POST; ``embed_rate`` (embeddings
+    per second) and ``token_rate`` (generated tokens per second) throttle
+    throughput when set. ``responder`` maps a prompt to the reply text.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.0,
+        embed_rate: Optional[float] = None,
+        token_rate: Optional[float] = None,
+        dim: int = 768,
+        models: Optional[List[str]] = None,
+        responder: Callable[[str], str] = default_reply,
+    ):
+        self.latency = latency
+        self.embed_rate = embed_rate
+        self.token_rate = token_rate
+        self.dim = dim
+        self.models = list(models or DEFAULT_MODELS)
+        self.responder = responder
+        self.requests: Counter = Counter()
+        self._lock = threading.Lock()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.fake = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        self._thread = threading.Thread(
+            target=self._httpd.serve_forever, name="fake-ollama", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "FakeOllama":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _record(self, path: str) -> None:
+        with self._lock:
+            self.requests[path] += 1
+
+    @staticmethod
+    def _sleep(seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def _sleep_for_embeddings(self, count: int) -> None:
+        if self.embed_rate:
+            self._sleep(count / self.embed_rate)
+
+    def _sleep_for_tokens(self, count: int) -> None:
+        if self.token_rate:
+            self._sleep(count / self.token_rate)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a fake Ollama server")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--embed-rate", type=float)
+    parser.add_argument("--token-rate", type=float)
+    args = parser.parse_args()
+    server = FakeOllama(
+        port=args.port,
+        latency=args.latency,
+        embed_rate=args.embed_rate,
+        token_rate=args.token_rate,
+    )
+    print(f"Fake Ollama listening on {server.url}")
+    server._httpd.serve_forever()
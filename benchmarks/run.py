@@ -0,0 +1,178 @@
+"""
+Benchmarks for the embed, retrieval, Q&A and generate-infra paths, run
+against the fake Ollama server so no GPU or model download is needed.
+
+    PYTHONPATH=src python -m benchmarks.run --scale 1x --out results.json
+
+Results are written as JSON (to stdout without --out) so they can be
+compared across commits to catch regressions.
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from infra_generator.chroma_manager import ChromaManager
+from infra_generator.embedder import Embedder
+from infra_generator.infra_agent import run_infra_pipeline
+from infra_generator.query_handler import QueryHandler
+from infra_generator.retriever import Retriever
+from infra_generator.tracing import TRACER
+from infra_generator.utils import load_config
+
+from .fake_ollama import FakeOllama
+from .synthetic_repo import SCALES, generate_repo
+
+QUERIES = [
+    "database connection string or redis client",
+    "http server setup and routes",
+    "environment variables and configuration",
+    "entrypoint and dependencies",
+]
+
+
+def _latencies(func: Callable[[str], object], repeat: int) -> Dict[str, float]:
+    samples = []
+    for n in range(repeat):
+        t0 = time.perf_counter()
+        func(QUERIES[n % len(QUERIES)])
+        samples.append(time.perf_counter() - t0)
+    samples.sort()
+    return {
+        "count": len(samples),
+        "mean_s": statistics.fmean(samples),
+        "p50_s": samples[len(samples) // 2],
+        "p95_s": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "max_s": samples[-1],
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    results: Dict[str, dict] = {}
+    with (
+        tempfile.TemporaryDirectory() as tmp,
+        FakeOllama(
+            latency=args.latency,
+            embed_rate=args.embed_rate,
+            token_rate=args.token_rate,
+            dim=args.dim,
+        ) as server,
+    ):
+        project_dir = os.path.join(tmp, "sample")
+        repo = generate_repo(
+            project_dir,
+            files=args.files or SCALES[args.scale],
+            services=args.services,
+            seed=args.seed,
+        )
+        config = load_config(args.config)
+        config.update(
+            {
+                "ollama_base_url": server.url,
+                "chroma_db_dir": os.path.join(tmp, "chroma"),
+                "clone_cache_dir": os.path.join(tmp, "repos"),
+                "stage_cache_dir": os.path.join(tmp, "stages"),
+            }
+        )
+        chroma_manager = ChromaManager.from_config(config)
+        embedder = Embedder(config, chroma_manager)
+        retriever = Retriever(config, chroma_manager)
+
+        t0 = time.perf_counter()
+        report = embedder.embed_project(project_dir, "sample", full=True)
+        elapsed = time.perf_counter() - t0
+        chunks = report["chunks"]
+        results["embed_project"] = {
+            "seconds": elapsed,
+            "files": repo["files"],
+            "chunks": chunks,
+            "files_per_s": repo["files"]["total"] / elapsed,
+            "chunks_per_s": chunks / elapsed,
+            "batches": report["batches"],
+            "peak_rss_mb": report["peak_rss_mb"],
+            "requests": dict(server.requests),
+        }
+
+        results["retrieve_chunks"] = _latencies(
+            lambda q: retriever.retrieve_chunks(q, k=5, project="sample"),
+            args.repeat,
+        )
+        query_handler = QueryHandler(config, retriever)
+        results["ask"] = _latencies(
+            lambda q: query_handler.ask(q, project="sample"), max(args.repeat // 4, 1)
+        )
+
+        # End to end from a cold index, so embedding is part of the run.
+        config["chroma_db_dir"] = os.path.join(tmp, "chroma-e2e")
+        TRACER.reset()
+        t0 = time.perf_counter()
+        run_infra_pipeline(project_dir, "infra", config=config)
+        stages = {s.name: s.duration for s in TRACER.spans if s.cat == "stage"}
+        results["run_infra_pipeline"] = {
+            "seconds": time.perf_counter() - t0,
+            "stages_s": stages,
+        }
+
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": vars(args),
+        "results": results,
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="infra-generator benchmarks")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=sorted(SCALES), default="1x")
+    size.add_argument("--files", type=int, help="Approximate repository size")
+    parser.add_argument("--services", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=20, help="Queries to time")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds/request")
+    parser.add_argument("--embed-rate", type=float, help="Embeddings per second")
+    parser.add_argument("--token-rate", type=float, help="Generated tokens/second")
+    parser.add_argument("--dim", type=int, default=768, help="Embedding dimension")
+    parser.add_argument("--config", help="Base config.yaml (default: bundled)")
+    parser.add_argument("--out", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    # The embedder and query handler print progress; keep stdout for JSON.
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmarks(args)
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""
+CLI startup budget: times `infra-gen --help` and `infra-gen list` in fresh
+interpreters and the import of infra_generator.main, and fails if any median
+exceeds the budget or a heavy dependency is imported at load time.
+
+    PYTHONPATH=src python -m benchmarks.startup --budget-ms 200
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+import yaml
+
+# Modules that must only be imported by the commands that need them.
+HEAVY_MODULES = ["chromadb", "langchain", "langchain_ollama", "gitingest", "requests"]
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.dirname(__file__)), "src")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [src, env.get("PYTHONPATH")]))
+    return env
+
+
+def time_command(argv: List[str], repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run(
+            [sys.executable, *argv],
+            env=_env(),
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        samples.append((time.perf_counter() - t0) * 1000)
+    return {"median_ms": statistics.median(samples), "max_ms": max(samples)}
+
+
+def import_profile() -> Dict[str, object]:
+    """Cumulative import time of infra_generator.main and heavy modules loaded."""
+    check = (
+        "import json, sys, infra_generator.main; print(json.dumps(list(sys.modules)))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        env=_env(),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    match = re.search(r"\|\s*(\d+)\s*\|\s*infra_generator\.main$", result.stderr, re.M)
+    loaded = set(json.loads(result.stdout))
+    return {
+        "import_ms": int(match.group(1)) / 1000 if match else None,
+        "heavy_modules_loaded": [m for m in HEAVY_MODULES if m in loaded],
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="CLI startup time budget")
+    parser.add_argument("--budget-ms", type=float, default=200.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--out", help="Write JSON results here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = os.path.join(tmp, "config.yaml")
+        with open(config_path, "w") as f:
+            yaml.safe_dump({"chroma_db_dir": os.path.join(tmp, "chroma")}, f)
+        cli = ["-m", "infra_generator.main"]
+        results = {
+            "help": time_command([*cli, "--help"], args.repeat),
+            "list": time_command([*cli, "--config", config_path, "list"], args.repeat),
+            **import_profile(),
+        }
+
+    failures = [
+        f"{name} took {r['median_ms']:.0f} ms"
+        for name, r in results.items()
+        if isinstance(r, dict) and r["median_ms"] > args.budget_ms
+    ]
+    if results["heavy_modules_loaded"]:
+        failures.append(f"imported at load: {results['heavy_modules_loaded']}")
+    report = {"budget_ms": args.budget_ms, "results": results, "failures": failures}
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""
+Reproducible synthetic monorepos for scale testing.
+
+A repository has N services cycling through Python (poetry), Node and Go.
+Each service gets a manifest, an entrypoint, env-var-heavy configuration,
+and nested packages of source modules. Vendored noise directories
+(node_modules/, .venv/, vendor/, dist/, build/, __pycache__/) are mixed in
+and should be skipped by the default exclude patterns. The same seed and
+sizes always produce byte-identical trees.
+
+    python -m benchmarks.synthetic_repo /tmp/mono --scale 10x
+"""
+
+import argparse
+import json
+import os
+import random
+from typing import Dict, List
+
+# 1x is roughly the size of the largest repositories we run on today.
+SCALES = {"1x": 2_000, "10x": 20_000, "100x": 200_000}
+
+LANGUAGES = ["python", "node", "go"]
+NOISE_DIRS = {
+    "python": [".venv/lib/python3.11/site-packages", "build/lib", "__pycache__"],
+    "node": ["node_modules", "dist"],
+    "go": ["vendor/github.com/acme"],
+}
+FILES_PER_DIR = 50
+
+_WORDS = [
+    "account", "billing", "cache", "catalog", "order", "payment", "profile",
+    "search", "session", "shipping", "stock", "token", "user", "webhook",
+]  # fmt: skip
+
+
+def _env_names(rng: random.Random, service: str, count: int) -> List[str]:
+    prefix = service.upper().replace("-", "_")
+    return [f"{prefix}_{rng.choice(_WORDS).upper()}_{i}" for i in range(count)]
+
+
+def _python_files(rng: random.Random, name: str, modules: int) -> Dict[str, str]:
+    env = _env_names(rng, name, 12)
+    files = {
+        "pyproject.toml": (
+            "[tool.poetry]\n"
+            f'name = "{name}"\nversion = "0.1.0"\ndescription = ""\n\n'
+            "[tool.poetry.dependencies]\n"
+            'python = "^3.11"\nfastapi = "^0.110.0"\nuvicorn = "^0.29.0"\n'
+            'sqlalchemy = "^2.0"\nredis = "^5.0"\n\n'
+            "[build-system]\n"
+            'requires = ["poetry-core"]\nbuild-backend = "poetry.core.masonry.api"\n'
+        ),
+        "poetry.lock": "# This file is automatically @generated by Poetry.\n",
+        "main.py": (
+            "import uvicorn\n\nfrom app.settings import Settings\n\n\n"
+            "if __name__ == '__main__':\n"
+            "    settings = Settings()\n"
+            "    uvicorn.run('app.api:app', host='0.0.0.0', port=settings.port)\n"
+        ),
+        "app/settings.py": "import os\n\n\nclass Settings:\n"
+        + "".join(
+            f'    {v.lower()} = os.environ.get("{v}", "{rng.choice(_WORDS)}")\n'
+            for v in env
+        )
+        + '    port = int(os.environ.get("PORT", "8000"))\n'
+        + '    database_url = os.environ["DATABASE_URL"]\n'
+        + '    redis_url = os.environ.get("REDIS_URL", "redis://redis:6379/0")\n',
+        ".env.example": "".join(f"{v}=\n" for v in env)
+        + "DATABASE_URL=postgresql://postgres@db:5432/app\n",
+    }
+    for i in range(modules):
+        word, limit = rng.choice(_WORDS), rng.randint(1, 500)
+        files[f"app/{word}_{i // FILES_PER_DIR}/{word}_{i}.py"] = (
+            "import os\n\n\n"
+            f"def handle_{word}_{i}(payload: dict) -> dict:\n"
+            f'    """Process a {word} event."""\n'
+            f'    limit = int(os.environ.get("{word.upper()}_LIMIT", "{limit}"))\n'
+            f'    return {{"id": {i}, "kind": "{word}", "limit": limit, **payload}}\n'
+        )
+    return files
+
+
+def _node_files(rng: random.Random, name: str, modules: int) -> Dict[str, str]:
+    env = _env_names(rng, name, 12)
+    files = {
+        "package.json": json.dumps(
+            {
+                "name": name,
+                "version": "1.0.0",
+                "main": "server.js",
+                "scripts": {"start": "node server.js"},
+                "engines": {"node": ">=20"},
+                "dependencies": {"express": "^4.19.0", "pg": "^8.11.0"},
+            },
+            indent=2,
+        )
+        + "\n",
+        "yarn.lock": "# yarn lockfile v1\n",
+        "server.js": (
+            'const express = require("express");\n'
+            'const config = require("./src/config");\n\n'
+            "const app = express();\n"
+            "app.listen(config.port, () =>\n"
+            "  console.log(`listening on ${config.port}`));\n"
+        ),
+        "src/config.js": "module.exports = {\n"
+        + "".join(
+            f'  {v.lower()}: process.env.{v} || "{rng.choice(_WORDS)}",\n' for v in env
+        )
+        + '  port: parseInt(process.env.PORT || "3000", 10),\n'
+        + "  databaseUrl: process.env.DATABASE_URL,\n};\n",
+        ".env.example": "".join(f"{v}=\n" for v in env),
+    }
+    for i in range(modules):
+        word, limit = rng.choice(_WORDS), rng.randint(1, 500)
+        files[f"src/{word}_{i // FILES_PER_DIR}/{word}{i}.js"] = (
+            f"function handle{word.capitalize()}{i}(req, res) {{\n"
+            f"  const limit = Number(process.env.{word.upper()}_LIMIT || {limit});\n"
+            f'  res.json({{ id: {i}, kind: "{word}", limit }});\n'
+            "}\n\n"
+            f"module.exports = {{ handle{word.capitalize()}{i} }};\n"
+        )
+    return files
+
+
+def _go_files(rng: random.Random, name: str, modules: int) -> Dict[str, str]:
+    env = _env_names(rng, name, 12)
+    files = {
+        "go.mod": (
+            f"module github.com/acme/{name}\n\ngo 1.22\n\n"
+            "require github.com/jackc/pgx/v5 v5.5.5\n"
+        ),
+        "go.sum": "github.com/jackc/pgx/v5 v5.5.5 h1:synthetic=\n",
+        "main.go": (
+            'package main\n\nimport (\n\t"net/http"\n\t"os"\n)\n\n'
+            "func main() {\n"
+            '\tport := os.Getenv("PORT")\n'
+            '\tif port == "" {\n\t\tport = "8080"\n\t}\n'
+            '\thttp.ListenAndServe(":"+port, nil)\n}\n'
+        ),
+        "internal/config/config.go": 'package config\n\nimport "os"\n\n'
+        + "type Config struct {\n"
+        + "".join(f"\t{v.title().replace('_', '')} string\n" for v in env)
+        + "}\n\nfunc Load() Config {\n\treturn Config{\n"
+        + "".join(f'\t\t{v.title().replace("_", "")}: os.Getenv("{v}"),\n' for v in env)
+        + "\t}\n}\n",
+        ".env.example": "".join(f"{v}=\n" for v in env),
+    }
+    for i in range(modules):
+        word = rng.choice(_WORDS)
+        pkg = f"{word}{i // FILES_PER_DIR}"
+        files[f"internal/{pkg}/{word}_{i}.go"] = (
+            f'package {pkg}\n\nimport "os"\n\n'
+            f"// Handle{i} processes a {word} event.\n"
+            f"func Handle{i}() map[string]string {{\n"
+            f'\treturn map[string]string{{"kind": "{word}", '
+            f'"limit": os.Getenv("{word.upper()}_LIMIT")}}\n'
+            "}\n"
+        )
+    return files
+
+
+_GENERATORS = {"python": _python_files, "node": _node_files, "go": _go_files}
+_MANIFESTS = {"python": "pyproject.toml", "node": "package.json", "go": "go.mod"}
+_ENTRYPOINTS = {"python": "main.py", "node": "server.js", "go": "main.go"}
+_NOISE_EXT = {"python": ".py", "node": ".js", "go": ".go"}
+
+
+def generate_repo(
+    root: str,
+    files: int = SCALES["1x"],
+    services: int = 3,
+    noise_ratio: float = 0.3,
+    seed: int = 0,
+) -> dict:
+    """
+    Write a synthetic monorepo of about ``files`` files under ``root`` and
+    return a description of it: the services (name, language, path, manifest,
+    entrypoint) and counts of source, noise and total files written.
+    ``noise_ratio`` of the files go to vendored/build directories.
+    """
+    rng = random.Random(seed)
+    services = max(1, services)
+    noise_total = int(files * noise_ratio)
+    per_service = max(0, files - noise_total) // services
+    written = {"source": 0, "noise": 0}
+    described = []
+
+    def write(rel_path: str, content: str, kind: str) -> None:
+        path = os.path.join(root, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        written[kind] += 1
+
+    for n in range(services):
+        language = LANGUAGES[n % len(LANGUAGES)]
+        name = f"{rng.choice(_WORDS)}-{language}-{n}"
+        service_dir = f"services/{name}"
+        fixed = len(_GENERATORS[language](random.Random(0), name, 0))
+        modules = max(0, per_service - fixed)
+        for rel_path, content in _GENERATORS[language](rng, name, modules).items():
+            write(f"{service_dir}/{rel_path}", content, "source")
+        described.append(
+            {
+                "name": name,
+                "language": language,
+                "path": service_dir,
+                "manifest": f"{service_dir}/{_MANIFESTS[language]}",
+                "entrypoint": f"{service_dir}/{_ENTRYPOINTS[language]}",
+            }
+        )
+
+    noise_per_service = noise_total // services
+    for n, service in enumerate(described):
+        language = service["language"]
+        dirs = NOISE_DIRS[language]
+        for i in range(noise_per_service):
+            noise_dir = dirs[i % len(dirs)]
+            write(
+                f"{service['path']}/{noise_dir}/pkg{i // FILES_PER_DIR}/"
+                f"mod{i}{_NOISE_EXT[language]}",
+                f"// vendored file {i} of {service['name']}\n",
+                "noise",
+            )
+
+    write(
+        "README.md",
+        "# Synthetic monorepo\n\n"
+        + "".join(f"- {s['name']} ({s['language']})\n" for s in described),
+        "source",
+    )
+    return {
+        "root": os.path.abspath(root),
+        "seed": seed,
+        "services": described,
+        "files": {**written, "total": written["source"] + written["noise"]},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a synthetic monorepo")
+    parser.add_argument("root", help="Directory to create the repository in")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=sorted(SCALES), default="1x")
+    size.add_argument("--files", type=int, help="Approximate number of files")
+    parser.add_argument("--services", type=int, default=3)
+    parser.add_argument("--noise-ratio", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    info = generate_repo(
+        args.root,
+        files=args.files or SCALES[args.scale],
+        services=args.services,
+        noise_ratio=args.noise_ratio,
+        seed=args.seed,
+    )
+    print(json.dumps(info, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Fingerprints of generated artifacts, kept in ``infra.lock.json`` beside them.
+
+Each artifact (a service's Dockerfile, the compose file) records a hash of
+everything its prompt was built from: the manifest and detected version,
+the summary and summarized file tree, the retrieved code context, the
+prompt templates and the model settings. A Dockerfile's summary and tree
+cover only its own service (see ``tree_summary.service_scope``), so a change
+elsewhere in the repository doesn't touch its fingerprint. On the next run
+an artifact whose fingerprint is unchanged, and whose file is still there,
+is kept instead of being generated again, so only the services that changed
+cost an LLM call. Dockerfiles rendered from a stack template are
+fingerprinted by their rendered content.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from .prompt_templates import (
+    DOCKER_COMPOSE_SYSTEM_PROMPT,
+    DOCKER_COMPOSE_USER_PROMPT,
+    DOCKERFILE_SYSTEM_PROMPT,
+    DOCKERFILE_USER_PROMPT,
+)
+from .tree_summary import summarize_tree
+
+logger = logging.getLogger(__name__)
+
+LOCK_FILENAME = "infra.lock.json"
+LOCK_VERSION = 1
+
+
+def _digest(value: Any) -> str:
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def _model_settings(config: dict) -> Dict[str, Any]:
+    return {
+        "model": config["models"]["qna_model"],
+        "temperature": config.get("temperature", 0.05),
+    }
+
+
+def _prompt_tree(tree: List[str], config: dict, focus: Optional[str] = None) -> str:
+    # The tree exactly as the generation tools put it in the prompt
+    return summarize_tree(
+        tree, max_tokens=config.get("tree_token_budget", 2000), focus=focus
+    )
+
+
+def dockerfile_fingerprint(
+    service: dict, summary: str, tree: List[str], code_context: str, config: dict
+) -> str:
+    """
+    Hash of the inputs of one service's Dockerfile prompt. ``summary`` and
+    ``tree`` are the service's own, as returned by ``service_scope``.
+    """
+    return _digest(
+        {
+            "template": _digest([DOCKERFILE_SYSTEM_PROMPT, DOCKERFILE_USER_PROMPT]),
+            "service": {
+                k: service.get(k)
+                for k in ("name", "path", "language", "version", "manifest_content")
+            },
+            "summary": _digest(summary),
+            "tree": _digest(_prompt_tree(tree, config, focus=service.get("path"))),
+            "code_context": _digest(code_context),
+            **_model_settings(config),
+        }
+    )
+
+
+def template_fingerprint(stack: str, content: str) -> str:
+    """Hash of a Dockerfile rendered from a stack template (no LLM inputs)."""
+    return _digest({"stack_template": stack, "content": _digest(content)})
+
+
+def compose_fingerprint(
+    project_name: str,
+    services: List[dict],
+    summary: str,
+    tree: List[str],
+    repo_context: str,
+    config: dict,
+) -> str:
+    """Hash of the inputs of the compose prompt (including the service list)."""
+    return _digest(
+        {
+            "template": _digest(
+                [DOCKER_COMPOSE_SYSTEM_PROMPT, DOCKER_COMPOSE_USER_PROMPT]
+            ),
+            "project_name": project_name,
+            "services": [
+                {k: s.get(k) for k in ("name", "path", "language", "version")}
+                for s in services
+            ],
+            "manifest_content": services[0].get("manifest_content") if services else "",
+            "summary": _digest(summary),
+            "tree": _digest(_prompt_tree(tree, config)),
+            "repo_context": _digest(repo_context),
+            **_model_settings(config),
+        }
+    )
+
+
+def generated_paths(project_dir: str, output_path: str) -> List[str]:
+    """
+    Paths (relative to ``project_dir``) of generated output inside the
+    project: the output folder itself, or, when artifacts are written into
+    the project root, the lock file and the artifacts it records. Left out
+    of snapshots so a rerun doesn't mistake its own Dockerfiles for
+    manifests.
+    """
+    rel = os.path.relpath(os.path.abspath(output_path), os.path.abspath(project_dir))
+    if rel == os.pardir or rel.startswith(os.pardir + os.sep):
+        return []
+    if rel != os.curdir:
+        return [rel.replace(os.sep, "/")]
+    return [LOCK_FILENAME, *ArtifactLock(output_path).artifacts]
+
+
+class ArtifactLock:
+    """The lock file of one output folder."""
+
+    def __init__(self, output_path: str):
+        self.output_path = output_path
+        self.path = os.path.join(output_path, LOCK_FILENAME)
+        self.artifacts: Dict[str, Dict[str, Any]] = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == LOCK_VERSION:
+                    self.artifacts = data.get("artifacts", {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable lock file {self.path}: {e}")
+
+    def reusable(self, artifact_path: str, fingerprint: str) -> Optional[str]:
+        """
+        The current content of ``artifact_path`` if it was generated from
+        the same inputs and is still on disk, else None.
+        """
+        entry = self.artifacts.get(artifact_path)
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None
+        try:
+            with open(
+                os.path.join(self.output_path, artifact_path), encoding="utf-8"
+            ) as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def record(self, artifact_path: str, fingerprint: str) -> None:
+        previous = self.artifacts.get(artifact_path, {})
+        if previous.get("fingerprint") != fingerprint:
+            previous = {"fingerprint": fingerprint, "generated": time.time()}
+        self.artifacts[artifact_path] = previous
+
+    def forget(self, artifact_path: str) -> None:
+        self.artifacts.pop(artifact_path, None)
+
+    def save(self) -> None:
+        os.makedirs(self.output_path, exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": LOCK_VERSION, "artifacts": self.artifacts},
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+        os.replace(tmp, self.path)
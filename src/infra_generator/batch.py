@@ -0,0 +1,305 @@
+"""
+generate-infra for many repositories in one process.
+
+Each repository goes through three phases that overlap across repositories:
+
+1. discovery (checkout, snapshot, summary/tree, manifests) on a process pool;
+2. embedding on a small thread pool in this process, since one Chroma
+   persistent client must not be shared between processes;
+3. LLM work (service detection, retrieval, generation, writing) taken from a
+   bounded asyncio queue by a fixed number of workers.
+
+While one repository is generating, the next ones are being walked and
+embedded. At most ``queue_size + llm_workers`` repositories are in flight
+(from discovery until their generation finishes), so finished discovery and
+its snapshots don't pile up ahead of the model. Components, LLM clients and
+the clone cache are shared by all repositories. This module imports only
+light modules at load time because discovery workers are spawned processes.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from .artifact_lock import generated_paths
+from .clone_cache import CloneCache, is_git_url, repo_name_from_url
+from .project_context import MANIFEST_FILENAMES
+from .repo_snapshot import RepoSnapshot
+
+logger = logging.getLogger(__name__)
+
+GENERATION_STAGES = [
+    "context",
+    "services",
+    "templates",
+    "contexts",
+    "dockerfiles",
+    "compose",
+    "write",
+]
+
+
+def default_project_name(source: str) -> str:
+    return repo_name_from_url(source) if is_git_url(source) else Path(source).stem
+
+
+def load_batch_manifest(path: str, output_folder: str = "infra") -> List[dict]:
+    """
+    Read a batch manifest: a YAML/JSON list whose items are a source string or
+    a mapping with ``source`` and optional ``ref``, ``output`` and ``name``,
+    or a text file with one source per line (``#`` starts a comment).
+
+    Every entry gets a distinct project name (its Chroma collection): names
+    derived from sources that collide, such as two repos called ``api``,
+    get a suffix from a hash of the source; colliding explicit names are an
+    error. Git URLs without their own ``output`` write to
+    ``<output_folder>/<name>``; local sources write inside themselves.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    data = None
+    if not path.endswith(".txt"):
+        data = yaml.safe_load(text)
+    if not isinstance(data, list):
+        data = [
+            line.strip()
+            for line in text.splitlines()
+            if line.strip() and not line.strip().startswith("#")
+        ]
+    entries = []
+    for item in data:
+        if isinstance(item, str):
+            item = {"source": item}
+        if not isinstance(item, dict) or not item.get("source"):
+            raise ValueError(f"Invalid batch manifest entry: {item!r}")
+        entries.append(
+            {
+                "source": item["source"],
+                "ref": item.get("ref"),
+                "output": item.get("output"),
+                "name": item.get("name"),
+            }
+        )
+
+    explicit = Counter(e["name"] for e in entries if e["name"])
+    duplicates = sorted(name for name, count in explicit.items() if count > 1)
+    if duplicates:
+        raise ValueError(f"Duplicate project names in batch manifest: {duplicates}")
+    derived = Counter(
+        default_project_name(e["source"]) for e in entries if not e["name"]
+    )
+    for entry in entries:
+        if not entry["name"]:
+            name = default_project_name(entry["source"])
+            if derived[name] > 1 or name in explicit:
+                digest = hashlib.sha1(entry["source"].encode("utf-8")).hexdigest()
+                name = f"{name}-{digest[:8]}"
+            entry["name"] = name
+        if entry["output"] is None:
+            entry["output"] = (
+                os.path.join(output_folder, entry["name"])
+                if is_git_url(entry["source"])
+                else output_folder
+            )
+    names = Counter(e["name"] for e in entries)
+    if len(names) < len(entries):
+        raise ValueError(
+            "Duplicate project names in batch manifest: "
+            f"{sorted(n for n, c in names.items() if c > 1)}"
+        )
+    return entries
+
+
+def discover(entry: dict, config: dict) -> Dict[str, Any]:
+    """
+    Checkout, snapshot and manifest discovery for one manifest entry; runs in
+    a worker process and returns the graph values the later stages need.
+    """
+    source = entry["source"]
+    if is_git_url(source):
+        project_name = entry.get("name") or default_project_name(source)
+        project_dir = CloneCache.from_config(config).get(source, entry.get("ref"))
+        output_path = entry["output"]
+    else:
+        if not os.path.isdir(source):
+            raise FileNotFoundError(f"Source directory not found: {source}")
+        project_name = entry.get("name") or default_project_name(source)
+        project_dir = source
+        output_path = os.path.join(source, entry["output"])
+    snapshot = RepoSnapshot.build(
+        project_dir,
+        config.get("exclude_patterns", []),
+        skip_paths=generated_paths(project_dir, output_path),
+    )
+    return {
+        "project_name": project_name,
+        "project_dir": project_dir,
+        "output_path": output_path,
+        "snapshot": snapshot,
+        "summary": snapshot.summary(project_name),
+        "tree": snapshot.paths(),
+        "manifest_paths": snapshot.find(MANIFEST_FILENAMES),
+    }
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        config: dict,
+        discovery_workers: Optional[int] = None,
+        embed_workers: Optional[int] = None,
+        llm_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+    ):
+        from .chroma_manager import ChromaManager
+        from .embedder import Embedder
+        from .infra_agent import build_infra_graph
+        from .retriever import Retriever
+
+        self.config = config
+        self.discovery_workers = discovery_workers or config.get(
+            "batch_discovery_workers", min(4, os.cpu_count() or 1)
+        )
+        self.embed_workers = embed_workers or config.get("batch_embed_workers", 2)
+        self.llm_workers = llm_workers or config.get("batch_llm_workers", 1)
+        self.queue_size = queue_size or config.get("batch_queue_size", 4)
+        chroma_manager = ChromaManager.from_config(config)
+        self.graph = build_infra_graph(
+            config,
+            chroma_manager,
+            Embedder(config, chroma_manager),
+            Retriever(config, chroma_manager),
+        )
+
+    def run(self, entries: List[dict]) -> List[Dict[str, Any]]:
+        """Process every entry; returns one status/timing record per entry."""
+        records = asyncio.run(self._run(entries))
+        # Clone cache GC runs once the whole batch is done, so no worker can
+        # evict a checkout another repository is still using.
+        clone_cache = CloneCache.from_config(self.config)
+        urls = [e for e in entries if is_git_url(e["source"])]
+        if urls:
+            clone_cache.gc(
+                keep=[clone_cache.key(e["source"], e.get("ref")) for e in urls]
+            )
+        return records
+
+    async def _run(self, entries: List[dict]) -> List[Dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        records = [
+            {"source": e["source"], "status": "pending", "timings": {}} for e in entries
+        ]
+        process_pool = ProcessPoolExecutor(
+            max_workers=self.discovery_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        embed_pool = ThreadPoolExecutor(
+            max_workers=self.embed_workers, thread_name_prefix="batch-embed"
+        )
+        # A repository holds a slot from discovery until its generation is
+        # done, so its snapshot is released before another one is taken.
+        in_flight = asyncio.Semaphore(self.queue_size + self.llm_workers)
+
+        async def prepare(entry: dict, record: dict) -> None:
+            await in_flight.acquire()
+            try:
+                t0 = time.perf_counter()
+                values = await loop.run_in_executor(
+                    process_pool, discover, entry, self.config
+                )
+                record["project"] = values["project_name"]
+                record["files"] = len(values["snapshot"])
+                record["timings"]["discover_s"] = time.perf_counter() - t0
+                t0 = time.perf_counter()
+                values = await loop.run_in_executor(
+                    embed_pool, self._run_stages, values, ["embed"]
+                )
+                record["timings"]["embed_s"] = time.perf_counter() - t0
+            except Exception as e:
+                self._fail(record, e)
+                in_flight.release()
+                return
+            record["queued_at"] = time.perf_counter()
+            await queue.put((values, record))
+
+        async def generate() -> None:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                values, record = item
+                record["timings"]["queue_wait_s"] = time.perf_counter() - record.pop(
+                    "queued_at"
+                )
+                t0 = time.perf_counter()
+                try:
+                    values = await asyncio.to_thread(
+                        self._run_stages, values, GENERATION_STAGES
+                    )
+                    record["status"] = "ok"
+                    record["services"] = [s["name"] for s in values["services"]]
+                    record["written"] = values["written"]
+                except Exception as e:
+                    self._fail(record, e)
+                finally:
+                    in_flight.release()
+                record["timings"]["generate_s"] = time.perf_counter() - t0
+                logger.info(f"Batch: {record['source']} {record['status']}")
+
+        t_start = time.perf_counter()
+        workers = [asyncio.create_task(generate()) for _ in range(self.llm_workers)]
+        try:
+            await asyncio.gather(*(prepare(e, r) for e, r in zip(entries, records)))
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            process_pool.shutdown()
+            embed_pool.shutdown()
+        logger.info(
+            f"Batch of {len(entries)} finished in {time.perf_counter() - t_start:.1f}s"
+        )
+        return records
+
+    def _run_stages(self, values: Dict[str, Any], stages: List[str]) -> dict:
+        return self.graph.run(values, only=stages, max_workers=2)
+
+    @staticmethod
+    def _fail(record: dict, error: Exception) -> None:
+        record["status"] = "failed"
+        record["error"] = f"{type(error).__name__}: {error}"
+        logger.error(f"Batch: {record['source']} failed: {record['error']}")
+
+
+def format_report(records: List[Dict[str, Any]]) -> List[str]:
+    """A fixed-width status and timing table, one row per repository."""
+    phases = ["discover_s", "embed_s", "queue_wait_s", "generate_s"]
+    width = max([len(r["source"]) for r in records] + [6])
+    lines = [
+        f"{'source':<{width}}  {'status':<7}" + "".join(f"{p:>14}" for p in phases)
+    ]
+    for r in records:
+        times = "".join(
+            f"{r['timings'][p]:>13.1f}s" if p in r["timings"] else f"{'-':>14}"
+            for p in phases
+        )
+        lines.append(f"{r['source']:<{width}}  {r['status']:<7}{times}")
+    ok = sum(r["status"] == "ok" for r in records)
+    lines.append(f"{ok}/{len(records)} succeeded")
+    return lines
+
+
+def write_report(records: List[Dict[str, Any]], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"created": time.time(), "repositories": records}, f, indent=2)
@@ -1,49 +1,191 @@
+import json
 import os
-<<<<<<< HEAD
+import sqlite3
+import threading
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Dict, List, Optional
 
-import chromadb
+from .chunk_occurrences import ChunkOccurrences
+
+
+def list_collection_names(chroma_db_dir: str) -> List[str]:
+    """
+    Collection names read straight from Chroma's SQLite catalog, which avoids
+    importing chromadb (about a second) for a plain listing. Service shards
+    (see ``shards.py``) are left out. Falls back to the client if the catalog
+    can't be read.
+    """
+    path = os.path.join(chroma_db_dir, "chroma.sqlite3")
+    if not os.path.isfile(path):
+        return []
+    try:
+        con = sqlite3.connect(f"{Path(path).resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            rows = con.execute(
+                "SELECT name FROM collections WHERE id NOT IN ("
+                "SELECT collection_id FROM collection_metadata WHERE key = 'shard_of'"
+                ") ORDER BY rowid"
+            )
+            return [name for (name,) in rows.fetchall()]
+        finally:
+            con.close()
+    except sqlite3.Error:
+        return ChromaManager(chroma_db_dir).get_all_projects()
+
+
+# Config names (as in Chroma's legacy "hnsw:*" metadata) -> collection
+# configuration fields.
+HNSW_FIELDS = {
+    "space": "space",
+    "M": "max_neighbors",
+    "construction_ef": "ef_construction",
+    "search_ef": "ef_search",
+}
 
-=======
-import chromadb
-from chromadb.config import Settings
->>>>>>> main
 
 class ChromaManager:
-    def __init__(self, chroma_db_dir: str):
+    """
+    Chroma client plus a registry of collection handles and their metadata
+    (project_dir, embed model, index version, ...). The registry is built
+    from one ``list_collections`` call and then answers lookups from memory;
+    it is updated by this manager's own writes and reloaded when another
+    process changes the database (detected from ``chroma.sqlite3``'s stat).
+    """
+
+    def __init__(self, chroma_db_dir: str, hnsw: Optional[dict] = None):
+        import chromadb
+
         self.chroma_db_dir = chroma_db_dir
         self.client = chromadb.PersistentClient(path=self.chroma_db_dir)
+        # HNSW parameters for collections created from now on; existing
+        # collections keep the ones they were built with.
+        self.hnsw = {
+            HNSW_FIELDS[k]: v for k, v in (hnsw or {}).items() if v is not None
+        }
+        self._registry: Optional[Dict[str, Any]] = None
+        self._stamp = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_config(cls, config: dict) -> "ChromaManager":
+        return cls(config["chroma_db_dir"], hnsw=config.get("hnsw"))
+
+    def _db_stamp(self):
+        try:
+            st = os.stat(os.path.join(self.chroma_db_dir, "chroma.sqlite3"))
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _collections(self) -> Dict[str, Any]:
+        with self._lock:
+            stamp = self._db_stamp()
+            if self._registry is None or stamp != self._stamp:
+                self._registry = {c.name: c for c in self.client.list_collections()}
+                self._stamp = stamp
+            return self._registry
+
+    def _remember(self, collection) -> None:
+        # Our own write: keep the registry and accept the new database stamp.
+        with self._lock:
+            if self._registry is not None:
+                self._registry[collection.name] = collection
+                self._stamp = self._db_stamp()
+
+    def refresh(self) -> None:
+        """Forget the registry; the next lookup reloads it."""
+        with self._lock:
+            self._registry = None
 
     def get_all_projects(self):
-        # Return all ChromaDB collection names (not directory names)
-        return [col.name for col in self.client.list_collections()]
+        # Return all ChromaDB collection names (not directory names), without
+        # the per-service shards of sharded projects
+        return [
+            name
+            for name, collection in self._collections().items()
+            if "shard_of" not in (collection.metadata or {})
+        ]
+
+    def has_project(self, project_name: str) -> bool:
+        collection = self._collections().get(project_name)
+        return collection is not None and "shard_of" not in (collection.metadata or {})
+
+    def get_shards(self, project_name: str) -> Dict[str, str]:
+        """Service directory -> shard collection, empty if not sharded."""
+        return json.loads(self.get_project_metadata(project_name).get("shards", "{}"))
 
     def get_collection(self, project_name: str, project_dir: str = None):
         """Get or create a collection. If creating, set project_dir as metadata."""
+        collection = self._collections().get(project_name)
+        if collection is not None:
+            return collection
+        configuration = {"hnsw": self.hnsw} if self.hnsw else None
         if project_dir is not None:
-<<<<<<< HEAD
-            return self.client.get_or_create_collection(
+            collection = self.client.get_or_create_collection(
                 name=project_name,
                 metadata={"project_dir": os.path.abspath(project_dir)},
+                configuration=configuration,
             )
-=======
-            return self.client.get_or_create_collection(name=project_name, metadata={"project_dir": os.path.abspath(project_dir)})
->>>>>>> main
         else:
-            return self.client.get_or_create_collection(name=project_name)
+            collection = self.client.get_or_create_collection(
+                name=project_name, configuration=configuration
+            )
+        self._remember(collection)
+        return collection
+
+    def recreate_collection(self, project_name: str, project_dir: str = None):
+        """Drop a collection and start an empty one (e.g. for a new dimension)."""
+        try:
+            self.client.delete_collection(name=project_name)
+        except Exception:
+            pass
+        with self._lock:
+            if self._registry is not None:
+                self._registry.pop(project_name, None)
+        return self.get_collection(project_name, project_dir=project_dir)
+
+    def delete_project(self, project_name: str) -> None:
+        """Drop a project's collection, its shards and everything beside them."""
+        for shard in self.get_shards(project_name).values():
+            self.delete_project(shard)
+        self.client.delete_collection(name=project_name)
+        with self._lock:
+            if self._registry is not None:
+                self._registry.pop(project_name, None)
+                self._stamp = self._db_stamp()
+        self.occurrences.remove_project(project_name)
+        self.projections.remove(project_name)
+
+    def get_project_metadata(self, project_name: str) -> dict:
+        collection = self._collections().get(project_name)
+        return dict(collection.metadata or {}) if collection is not None else {}
 
-    def get_project_metadata(self, project_name: str):
+    def set_project_metadata(self, project_name: str, metadata: dict) -> None:
         collection = self.get_collection(project_name)
-        return getattr(collection, "metadata", {})
+        collection.modify(metadata=metadata)
+        self._remember(collection)
+
+    @cached_property
+    def occurrences(self) -> ChunkOccurrences:
+        """Where each deduplicated chunk occurs, stored beside the index."""
+        return ChunkOccurrences(
+            os.path.join(self.chroma_db_dir, "chunk_occurrences.sqlite3")
+        )
+
+    @cached_property
+    def projections(self) -> "ProjectionStore":
+        """Per-project embedding projections (see ``projection.py``)."""
+        # Imported here: numpy is too slow to load for `infra-gen list`.
+        from .projection import ProjectionStore
+
+        return ProjectionStore(os.path.join(self.chroma_db_dir, "projections"))
 
-<<<<<<< HEAD
 
-=======
->>>>>>> main
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Explore ChromaDB collections.")
-<<<<<<< HEAD
     parser.add_argument(
         "--db_dir", type=str, required=True, help="Path to ChromaDB directory"
     )
@@ -54,13 +196,29 @@ if __name__ == "__main__":
     parser.add_argument(
         "--limit", type=int, default=5, help="Limit of documents to preview"
     )
-=======
-    parser.add_argument("--db_dir", type=str, required=True, help="Path to ChromaDB directory")
-    parser.add_argument("--list", action="store_true", help="List all collections")
-    parser.add_argument("--preview", type=str, help="Preview documents in a collection (by name)")
-    parser.add_argument("--limit", type=int, default=5, help="Limit of documents to preview")
->>>>>>> main
     parser.add_argument("--delete", type=str, help="Delete a collection by name")
+    parser.add_argument(
+        "--export", type=str, help="Write a collection to a snapshot (see --out)"
+    )
+    parser.add_argument("--out", type=str, help="Snapshot path for --export (.npz)")
+    parser.add_argument(
+        "--dtype",
+        choices=["float16", "float32"],
+        default="float16",
+        help="Precision of exported vectors",
+    )
+    parser.add_argument(
+        "--import", dest="import_path", type=str, help="Load a snapshot file"
+    )
+    parser.add_argument("--name", type=str, help="Collection name for --import")
+    parser.add_argument(
+        "--config", type=str, help="Config whose embed model --import must match"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Import even if the embed model or dimension doesn't match",
+    )
     args = parser.parse_args()
 
     manager = ChromaManager(chroma_db_dir=args.db_dir)
@@ -88,10 +246,41 @@ if __name__ == "__main__":
 
     elif args.delete:
         try:
-            manager.client.delete_collection(name=args.delete)
+            manager.delete_project(args.delete)
             print(f"Deleted collection: {args.delete}")
         except Exception as e:
             print(f"Failed to delete collection: {e}")
 
+    elif args.export:
+        from .index_snapshot import export_project
+
+        out = args.out or f"{args.export}.npz"
+        header = export_project(manager, args.export, out, dtype=args.dtype)
+        print(
+            f"Exported {header['count']} chunks ({header['dim']} dims, "
+            f"{args.dtype}) from '{args.export}' to {out}"
+        )
+
+    elif args.import_path:
+        from .index_snapshot import SnapshotError, import_project
+        from .utils import load_config
+
+        config = load_config(args.config)
+        try:
+            header = import_project(
+                manager,
+                args.import_path,
+                embed_model=config["models"]["embed_model"],
+                project=args.name,
+                force=args.force,
+            )
+        except SnapshotError as e:
+            print(f"Import refused: {e}")
+            raise SystemExit(1)
+        print(f"Imported {header['count']} chunks into '{header['project']}'")
+
     else:
-        print("No action specified. Use --list, --preview <name>, or --delete <name>.")
+        print(
+            "No action specified. Use --list, --preview <name>, --delete <name>, "
+            "--export <name> or --import <file>."
+        )
@@ -0,0 +1,123 @@
+import hashlib
+import sqlite3
+from contextlib import closing
+from typing import Dict, Iterable, List, Tuple
+
+
+def normalize_chunk(text: str) -> str:
+    """Chunk text with trailing whitespace and surrounding blank lines removed."""
+    return "\n".join(line.rstrip() for line in text.splitlines()).strip("\n")
+
+
+def chunk_content_id(text: str) -> str:
+    """Collection id of a chunk: identical (normalized) text, identical id."""
+    return hashlib.sha1(normalize_chunk(text).encode("utf-8")).hexdigest()
+
+
+class ChunkOccurrences:
+    """
+    Every (file, line span) a deduplicated chunk occurs at, kept in a SQLite
+    file next to the Chroma index. The collection stores each distinct chunk
+    once; this table maps its id back to all copies, so retrieval can still
+    report every location and incremental updates know when the last copy
+    of a chunk is gone.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with closing(self._connect()) as con, con:
+            con.execute(
+                "CREATE TABLE IF NOT EXISTS occurrences ("
+                "project TEXT, chunk_id TEXT, file_path TEXT, "
+                "start_line INTEGER, end_line INTEGER)"
+            )
+            con.execute(
+                "CREATE INDEX IF NOT EXISTS occ_chunk "
+                "ON occurrences (project, chunk_id)"
+            )
+            con.execute(
+                "CREATE INDEX IF NOT EXISTS occ_path "
+                "ON occurrences (project, file_path)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One short-lived connection per call keeps this safe to use from the
+        # embedder's and the daemon's threads.
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def add(self, project: str, rows: Iterable[Tuple[str, str, int, int]]) -> None:
+        """Record ``(chunk_id, file_path, start_line, end_line)`` rows."""
+        with closing(self._connect()) as con, con:
+            con.executemany(
+                "INSERT INTO occurrences VALUES (?, ?, ?, ?, ?)",
+                ((project, *row) for row in rows),
+            )
+
+    def rows(self, project: str) -> List[Tuple[str, str, int, int]]:
+        """All ``(chunk_id, file_path, start_line, end_line)`` rows of a project."""
+        with closing(self._connect()) as con:
+            return con.execute(
+                "SELECT chunk_id, file_path, start_line, end_line FROM occurrences "
+                "WHERE project = ? ORDER BY rowid",
+                (project,),
+            ).fetchall()
+
+    def remove_project(self, project: str) -> None:
+        with closing(self._connect()) as con, con:
+            con.execute("DELETE FROM occurrences WHERE project = ?", (project,))
+
+    def remove_paths(self, project: str, paths: Iterable[str]) -> List[str]:
+        """
+        Forget the occurrences in ``paths`` and return the ids of chunks that
+        no longer occur anywhere (to be deleted from the collection).
+        """
+        paths = sorted(set(paths))
+        if not paths:
+            return []
+        with closing(self._connect()) as con, con:
+            con.execute("CREATE TEMP TABLE gone (file_path TEXT PRIMARY KEY)")
+            con.executemany("INSERT INTO gone VALUES (?)", ((p,) for p in paths))
+            candidates = [
+                chunk_id
+                for (chunk_id,) in con.execute(
+                    "SELECT DISTINCT chunk_id FROM occurrences "
+                    "WHERE project = ? AND file_path IN (SELECT file_path FROM gone)",
+                    (project,),
+                )
+            ]
+            con.execute(
+                "DELETE FROM occurrences "
+                "WHERE project = ? AND file_path IN (SELECT file_path FROM gone)",
+                (project,),
+            )
+            still_used = set(self._lookup(con, project, candidates))
+        return [c for c in candidates if c not in still_used]
+
+    def lookup(
+        self, project: str, chunk_ids: Iterable[str]
+    ) -> Dict[str, List[Dict[str, object]]]:
+        """All occurrences of each chunk id, in file order."""
+        with closing(self._connect()) as con:
+            return self._lookup(con, project, list(chunk_ids))
+
+    @staticmethod
+    def _lookup(con, project: str, chunk_ids: List[str]):
+        found: Dict[str, List[Dict[str, object]]] = {}
+        # Stay well under SQLite's bound-parameter limit.
+        for i in range(0, len(chunk_ids), 500):
+            part = chunk_ids[i : i + 500]
+            rows = con.execute(
+                "SELECT chunk_id, file_path, start_line, end_line FROM occurrences "
+                f"WHERE project = ? AND chunk_id IN ({','.join('?' * len(part))}) "
+                "ORDER BY file_path, start_line",
+                (project, *part),
+            )
+            for chunk_id, file_path, start_line, end_line in rows:
+                found.setdefault(chunk_id, []).append(
+                    {
+                        "file_path": file_path,
+                        "start_line": start_line,
+                        "end_line": end_line,
+                    }
+                )
+        return found
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import subprocess
+import time
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_URL_PATTERN = re.compile(r"^(https?|ssh|git|file)://|^[\w.-]+@[\w.-]+:")
+_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+# Clones used this recently may still be read by another process (a batch
+# worker or a concurrent command), so GC leaves them alone.
+GC_MIN_IDLE_S = 3600
+
+
+class CloneError(RuntimeError):
+    pass
+
+
+def is_git_url(source: str) -> bool:
+    """True for remote Git URLs, file:// URLs and local bare repositories."""
+    if _URL_PATTERN.match(source):
+        return True
+    return (
+        os.path.isdir(source)
+        and os.path.isfile(os.path.join(source, "HEAD"))
+        and os.path.isdir(os.path.join(source, "objects"))
+    )
+
+
+def repo_name_from_url(url: str) -> str:
+    name = re.split(r"[/:]", url.rstrip("/"))[-1]
+    return name[:-4] if name.endswith(".git") else name
+
+
+def _git(*args: str, cwd: Optional[str] = None) -> str:
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=cwd, capture_output=True, text=True, check=True
+        )
+    except FileNotFoundError as e:
+        raise CloneError("git is not installed or not on PATH") from e
+    except subprocess.CalledProcessError as e:
+        raise CloneError(f"git {' '.join(args)} failed: {e.stderr.strip()}") from e
+    return result.stdout.strip()
+
+
+def _dir_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class CloneCache:
+    """
+    Local cache of shallow, partial (blob-less) clones keyed by (URL, ref).
+
+    Repeated runs against the same URL and ref reuse the checkout: a pinned
+    commit is used as is, while a branch, tag or the default branch is
+    refreshed with a depth-1 fetch. Each entry's stamp records its size, so
+    ``gc`` (run once per command or batch, not per clone) doesn't walk the
+    cache: entries unused for ``max_age_days`` are removed, then the least
+    recently used ones until the cache fits in ``max_size_mb``.
+    """
+
+    def __init__(
+        self, cache_dir: str, max_age_days: float = 14, max_size_mb: float = 5120
+    ):
+        self.cache_dir = os.path.expanduser(cache_dir)
+        self.max_age_days = max_age_days
+        self.max_size_mb = max_size_mb
+
+    @classmethod
+    def from_config(cls, config: dict) -> "CloneCache":
+        return cls(
+            config.get("clone_cache_dir", "~/.cache/infra-generator/repos"),
+            max_age_days=config.get("clone_cache_max_age_days", 14),
+            max_size_mb=config.get("clone_cache_max_size_mb", 5120),
+        )
+
+    def key(self, url: str, ref: Optional[str] = None) -> str:
+        return hashlib.sha256(f"{url}\0{ref or ''}".encode()).hexdigest()[:16]
+
+    def _stamp_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, url: str, ref: Optional[str] = None) -> str:
+        """Return a local checkout of ``url`` at ``ref`` (default branch if None)."""
+        key = self.key(url, ref)
+        dest = os.path.join(self.cache_dir, key)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if os.path.isdir(os.path.join(dest, ".git")):
+            pinned = ref and _SHA_PATTERN.match(ref)
+            if pinned and _git("rev-parse", "HEAD", cwd=dest) == ref:
+                logger.info(f"Using cached clone of {url}@{ref} at {dest}")
+            else:
+                logger.info(f"Refreshing cached clone of {url}@{ref or 'HEAD'}")
+                self._fetch_checkout(dest, ref)
+        else:
+            logger.info(f"Cloning {url}@{ref or 'HEAD'} into {dest}")
+            tmp = f"{dest}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp, ignore_errors=True)
+            try:
+                _git("init", "-q", tmp)
+                _git("remote", "add", "origin", url, cwd=tmp)
+                self._fetch_checkout(tmp, ref)
+                try:
+                    os.replace(tmp, dest)
+                except OSError:
+                    # Another process cloned the same URL and ref first
+                    if not os.path.isdir(os.path.join(dest, ".git")):
+                        raise
+                    logger.info(f"Using the clone of {url} made concurrently")
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        commit = _git("rev-parse", "HEAD", cwd=dest)
+        stamp = {
+            "url": url,
+            "ref": ref,
+            "commit": commit,
+            "last_used": time.time(),
+            "size": _dir_size(dest),
+        }
+        tmp_stamp = f"{self._stamp_path(key)}.tmp-{os.getpid()}"
+        with open(tmp_stamp, "w", encoding="utf-8") as f:
+            json.dump(stamp, f)
+        os.replace(tmp_stamp, self._stamp_path(key))
+        return dest
+
+    def _fetch_checkout(self, repo: str, ref: Optional[str]) -> None:
+        _git(
+            "fetch",
+            "-q",
+            "--depth",
+            "1",
+            "--filter=blob:none",
+            "origin",
+            ref or "HEAD",
+            cwd=repo,
+        )
+        _git("checkout", "-q", "--force", "FETCH_HEAD", cwd=repo)
+
+    def entries(self) -> List[dict]:
+        """Cached clones with their stamp data, least recently used first."""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            key = name[: -len(".json")]
+            try:
+                with open(self._stamp_path(key), encoding="utf-8") as f:
+                    stamp = json.load(f)
+            except (OSError, ValueError):
+                stamp = {"last_used": 0}
+            stamp["key"] = key
+            stamp["path"] = os.path.join(self.cache_dir, key)
+            entries.append(stamp)
+        return sorted(entries, key=lambda e: e.get("last_used", 0))
+
+    def remove(self, key: str) -> None:
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+        try:
+            os.remove(self._stamp_path(key))
+        except FileNotFoundError:
+            pass
+
+    def gc(
+        self, keep: Iterable[str] = (), min_idle_s: float = GC_MIN_IDLE_S
+    ) -> List[str]:
+        """
+        Evict stale and least recently used clones; returns removed keys.
+        ``keep`` and clones used within ``min_idle_s`` are never removed.
+        """
+        keep = set(keep)
+        now = time.time()
+        removed = []
+        cutoff = now - self.max_age_days * 86400
+        live = []
+        for entry in self.entries():
+            if entry["key"] not in keep and entry.get("last_used", 0) < cutoff:
+                self.remove(entry["key"])
+                removed.append(entry["key"])
+            else:
+                live.append(entry)
+        sizes = {
+            e["key"]: e["size"] if "size" in e else _dir_size(e["path"]) for e in live
+        }
+        total = sum(sizes.values())
+        budget = self.max_size_mb * 1024 * 1024
+        for entry in live:
+            if total <= budget:
+                break
+            if entry["key"] in keep or now - entry.get("last_used", 0) < min_idle_s:
+                continue
+            self.remove(entry["key"])
+            removed.append(entry["key"])
+            total -= sizes[entry["key"]]
+        if removed:
+            logger.info(f"Clone cache GC removed {len(removed)} entr(ies)")
+        return removed
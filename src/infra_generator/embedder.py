@@ -1,20 +1,28 @@
-<<<<<<< HEAD
-import fnmatch
+import json
+import logging
 import os
-=======
-import os
-import uuid
-from typing import Any, Dict, List
->>>>>>> main
+import queue
+import threading
+import time
+from bisect import bisect_right
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import requests
-from langchain_core.documents import Document
 from langchain_text_splitters import Language, RecursiveCharacterTextSplitter
 from tqdm import tqdm
 
 from .chroma_manager import ChromaManager
-<<<<<<< HEAD
-from .utils import get_language_from_extension, get_project_name, list_source_files
+from .chunk_occurrences import chunk_content_id
+from .git_changes import changed_since, git_state
+from .projection import Projection, describe_config
+from .repo_snapshot import RepoSnapshot
+from .shards import ROOT_SERVICE, plan_shards, service_dirs, shard_name
+from .tracing import current_span, span
+from .triage import FileTriage
+from .utils import get_language_from_extension, get_project_name, peak_rss_mb
+
+logger = logging.getLogger(__name__)
 
 EXT_TO_LANGUAGE = {
     ".py": Language.PYTHON,
@@ -32,6 +40,51 @@ EXT_TO_LANGUAGE = {
 }
 
 
+# Bumped when the stored layout changes (2: chunks keyed by content hash);
+# collections with another version are re-embedded in full.
+INDEX_VERSION = 2
+
+# Characters per chunk (and overlap) for languages with a code-aware splitter
+# and for everything else; overridden by the `chunking` config section.
+DEFAULT_CHUNKING = {
+    "code_chunk_size": 500,
+    "code_chunk_overlap": 50,
+    "text_chunk_size": 1000,
+    "text_chunk_overlap": 100,
+}
+
+_warned_legacy_chunk_size = False
+
+
+def chunking_settings(config: dict) -> Dict[str, int]:
+    """
+    The ``chunking`` section over ``DEFAULT_CHUNKING``. The retired
+    top-level ``embedding_chunk_size`` still sets ``text_chunk_size`` (unless
+    the section does), with a deprecation warning.
+    """
+    global _warned_legacy_chunk_size
+    chunking = {**DEFAULT_CHUNKING, **(config.get("chunking") or {})}
+    legacy = config.get("embedding_chunk_size")
+    if legacy is not None:
+        if not _warned_legacy_chunk_size:
+            logger.warning(
+                "Config key 'embedding_chunk_size' is deprecated; set "
+                "'chunking.text_chunk_size' instead."
+            )
+            _warned_legacy_chunk_size = True
+        if "text_chunk_size" not in (config.get("chunking") or {}):
+            chunking["text_chunk_size"] = int(legacy)
+    return chunking
+
+
+def describe_chunking(config: dict) -> str:
+    chunking = chunking_settings(config)
+    return (
+        f"code:{chunking['code_chunk_size']}/{chunking['code_chunk_overlap']},"
+        f"text:{chunking['text_chunk_size']}/{chunking['text_chunk_overlap']}"
+    )
+
+
 def get_langchain_language(file_path):
     for ext, lang in EXT_TO_LANGUAGE.items():
         if file_path.endswith(ext):
@@ -39,15 +92,6 @@ def get_langchain_language(file_path):
     return None
 
 
-def should_exclude(path, exclude_patterns):
-    for pattern in exclude_patterns:
-        if fnmatch.fnmatch(os.path.basename(path), pattern) or fnmatch.fnmatch(
-            path, pattern
-        ):
-            return True
-    return False
-
-
 def get_line_offsets(text):
     """Return a list of character offsets for the start of each line in text."""
     offsets = [0]
@@ -82,197 +126,510 @@ def get_chunk_line_numbers(chunk_text, file_text, start_search=0):
     else:
         end_line = len(line_offsets)
     return start_line, end_line
-=======
-from .utils import get_language_from_extension, get_project_name, load_config
->>>>>>> main
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    """Group ``items`` into lists of at most ``size``."""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def prefetch(items: Iterable, depth: int) -> Iterator:
+    """
+    Iterate ``items`` on a background thread, at most ``depth`` items ahead of
+    the consumer. The producer blocks while the queue is full, so a slow
+    consumer bounds how much is held in memory.
+    """
+    q: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+    errors = []
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        put(done)
+
+    thread = threading.Thread(target=produce, name="embed-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = q.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+    if errors:
+        raise errors[0]
+
+
+class _ChunkWriter:
+    """
+    Adds embedded chunks to a collection through the project's projection.
+    When a PCA projection still has to be fitted, the first ``fit_chunks``
+    new chunks are held back, the projection is fitted on their vectors and
+    saved, and everything from then on is added already projected.
+    """
+
+    def __init__(self, collection, projection=None, fit_pca_dim=None, fit_chunks=0):
+        self.collection = collection
+        self.projection = projection
+        self.fit_pca_dim = fit_pca_dim
+        self.fit_chunks = fit_chunks
+        self.pending: List[tuple] = []
+        self.pending_ids: set = set()
+
+    def add(self, ids, texts, metadatas, vectors) -> None:
+        if self.fit_pca_dim:
+            self.pending.append((ids, texts, metadatas, vectors))
+            self.pending_ids.update(ids)
+            if len(self.pending_ids) >= self.fit_chunks:
+                self.flush()
+            return
+        if self.projection is not None:
+            vectors = self.projection.apply(vectors).tolist()
+        self.collection.add(
+            ids=ids, documents=texts, metadatas=metadatas, embeddings=vectors
+        )
+
+    def flush(self) -> None:
+        """Fit the pending PCA (if any) and add what was held back."""
+        if not self.fit_pca_dim:
+            return
+        if self.pending:
+            self.projection = Projection.fit_pca(
+                [v for *_, vectors in self.pending for v in vectors], self.fit_pca_dim
+            )
+        else:
+            self.projection = Projection("pca", self.fit_pca_dim)
+        self.fit_pca_dim = None
+        pending, self.pending, self.pending_ids = self.pending, [], set()
+        for args in pending:
+            self.add(*args)
 
 
 class Embedder:
     def __init__(self, config: dict, chroma_manager: ChromaManager):
         self.config = config
         self.chroma_manager = chroma_manager
-<<<<<<< HEAD
+        self.session = requests.Session()
+        self._splitters: Dict[Any, RecursiveCharacterTextSplitter] = {}
 
-    def chunk_code(self, file_path: str, source_code: str):
+    def _splitter(self, file_path: str) -> RecursiveCharacterTextSplitter:
         language = get_langchain_language(file_path)
-        if language:
-            splitter = RecursiveCharacterTextSplitter.from_language(
-                language=language, chunk_size=500, chunk_overlap=50
-            )
-        else:
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000, chunk_overlap=100
+        if language not in self._splitters:
+            chunking = chunking_settings(self.config)
+            if language:
+                splitter = RecursiveCharacterTextSplitter.from_language(
+                    language=language,
+                    chunk_size=chunking["code_chunk_size"],
+                    chunk_overlap=chunking["code_chunk_overlap"],
+                )
+            else:
+                splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=chunking["text_chunk_size"],
+                    chunk_overlap=chunking["text_chunk_overlap"],
+                )
+            self._splitters[language] = splitter
+        return self._splitters[language]
+
+    def chunk_code(
+        self, file_path: str, source_code: str
+    ) -> Iterator[Tuple[str, int, int]]:
+        """Yield ``(text, start_line, end_line)`` for each chunk of a file."""
+        line_offsets = get_line_offsets(source_code)
+        search_from = 0
+        for text in self._splitter(file_path).split_text(source_code):
+            # Chunks come in file order, so each is found after the previous
+            # chunk's start (they may overlap).
+            idx = source_code.find(text, search_from)
+            if idx == -1:
+                yield text, -1, -1
+                continue
+            search_from = idx + 1
+            yield (
+                text,
+                bisect_right(line_offsets, idx),
+                bisect_right(line_offsets, idx + len(text)),
             )
 
-        docs = [Document(page_content=source_code, metadata={"file_path": file_path})]
-        split_docs = splitter.split_documents(docs)
-        # Add start_line and end_line to each chunk's metadata using helper
-        for doc in split_docs:
-            start_line, end_line = get_chunk_line_numbers(doc.page_content, source_code)
-            doc.metadata["start_line"] = start_line
-            doc.metadata["end_line"] = end_line
-        return split_docs
-
     def embed_code(self, text):
         url = f"{self.config['ollama_base_url']}/api/embeddings"
         payload = {"model": self.config["models"]["embed_model"], "prompt": text}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
         resp.raise_for_status()
         return resp.json()["embedding"]
 
-    def embed_project(self, project_dir, project_name=None, exclude=None):
-        # Always use exclude_patterns from config for central management
-        exclude = self.config.get("exclude_patterns", [])
-        project_name = project_name or get_project_name(project_dir)
-        source_files = [
-            f
-            for f in list_source_files(project_dir, self.config["extensions"].values())
-            if not should_exclude(f, exclude)
-            and not should_exclude(os.path.relpath(f, project_dir), exclude)
-        ]
-        print(f"Source files found: {len(source_files)}")
-        print(f"Source files: {source_files}")
-        print(f"Embedding {len(source_files)} files in project '{project_name}'")
-
-        collection = self.chroma_manager.get_collection(
-            project_name, project_dir=project_dir
-        )
-        collection.modify(metadata={"project_dir": os.path.abspath(project_dir)})
-        for file_path in tqdm(source_files, desc=f"Embedding code for {project_name}"):
-            rel_path = os.path.relpath(file_path, project_dir)
-            with open(file_path, "r", encoding="utf-8") as f:
-                code = f.read()
-
-            if not code.strip():
-                continue
-
-            split_docs = self.chunk_code(rel_path, code)
-
-            for i, doc in enumerate(split_docs):
-                if len(doc.page_content.strip()) < 10:
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts in one /api/embed request."""
+        url = f"{self.config['ollama_base_url']}/api/embed"
+        payload = {"model": self.config["models"]["embed_model"], "input": texts}
+        resp = self.session.post(url, json=payload)
+        if resp.status_code == 404:
+            # Ollama before 0.3 only has the single-prompt endpoint.
+            return [self.embed_code(t) for t in texts]
+        resp.raise_for_status()
+        return resp.json()["embeddings"]
+
+    def iter_chunks(
+        self,
+        project_name: str,
+        source_files: Iterable,
+        parent=None,
+        skipped: Optional[List[Dict[str, str]]] = None,
+    ) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """
+        Yield ``(content id, text, metadata)`` for every chunk worth embedding,
+        reading one file at a time. Files triage rejects (binary, oversized, minified,
+        generated) are not read; they are appended to ``skipped`` with the
+        reason.
+        """
+        triage = FileTriage.from_config(self.config)
+        for source_file in source_files:
+            rel_path = source_file.path
+            with span("chunk_file", cat="embed", parent=parent, path=rel_path) as s:
+                reason = triage.check(source_file)
+                if reason is None:
+                    try:
+                        code = source_file.read_text()
+                    except UnicodeDecodeError:
+                        reason = "not UTF-8"
+                if reason is not None:
+                    s.set(skipped=reason)
+                    if skipped is not None:
+                        skipped.append({"path": rel_path, "reason": reason})
                     continue
-
-                embedding = self.embed_code(doc.page_content)
-                doc.metadata.update(
-                    {
+                if not code.strip():
+                    continue
+                language = get_language_from_extension(rel_path, self.config)
+                count = 0
+                for i, (text, start_line, end_line) in enumerate(
+                    self.chunk_code(rel_path, code)
+                ):
+                    if len(text.strip()) < 10:
+                        continue
+                    count += 1
+                    yield chunk_content_id(text), text, {
                         "file_path": rel_path,
-                        "language": get_language_from_extension(file_path, self.config),
+                        "language": language,
                         "project": project_name,
                         "chunk_id": f"chunk_{i}",
-                        # start_line and end_line are already set by chunk_code
+                        "start_line": start_line,
+                        "end_line": end_line,
                     }
-                )
-
-                doc_id = f"{project_name}:{rel_path}:{i}"
-                collection.add(
-                    documents=[doc.page_content],
-                    metadatas=[doc.metadata],
-                    embeddings=[embedding],
-                    ids=[doc_id],
-                )
+                s.set(chunks=count)
+
+    def _store_batch(self, writer: _ChunkWriter, project_name: str, batch: list) -> int:
+        """
+        Embed and add the chunks of ``batch`` the collection doesn't have yet,
+        record every occurrence, and return how many chunks were new.
+        """
+        unique = {}
+        for chunk_id, text, metadata in batch:
+            if chunk_id not in writer.pending_ids:
+                unique.setdefault(chunk_id, (text, metadata))
+        existing = set(writer.collection.get(ids=list(unique), include=[])["ids"])
+        new_ids = [c for c in unique if c not in existing]
+        if new_ids:
+            texts = [unique[c][0] for c in new_ids]
+            writer.add(
+                new_ids,
+                texts,
+                [unique[c][1] for c in new_ids],
+                self.embed_batch(texts),
+            )
+        self.chroma_manager.occurrences.add(
+            project_name,
+            ((c, m["file_path"], m["start_line"], m["end_line"]) for c, _, m in batch),
+        )
+        return len(new_ids)
+
+    def embed_project(
+        self,
+        project_dir,
+        project_name=None,
+        exclude=None,
+        snapshot: Optional[RepoSnapshot] = None,
+        full: bool = False,
+        services: Optional[List[str]] = None,
+    ):
+        """
+        Embed a project into its collection. In a git checkout that was
+        embedded before, only paths git reports as changed since the recorded
+        commit are re-embedded; otherwise (or with ``full=True``) every source
+        file is.
+
+        Chunks are keyed by a hash of their normalized text, so license
+        headers, copied modules and vendored files are embedded and stored
+        once; ``chroma_manager.occurrences`` keeps every file and line span
+        they appear at. With ``embedding_projection`` set, reduced vectors are
+        stored (see ``projection.py``); a PCA is fitted on the first
+        ``pca_fit_chunks`` chunks of a full scan and reused by later updates.
+
+        With ``index_sharding.enabled`` each service gets its own collection
+        (see ``shards.py``). ``services`` then rebuilds just those services'
+        shards in full and leaves the rest alone.
+        """
+        # Always use exclude_patterns from config for central management
+        exclude = self.config.get("exclude_patterns", [])
+        project_name = project_name or get_project_name(project_dir)
+        if snapshot is None:
+            snapshot = RepoSnapshot.build(project_dir, exclude)
+        source_files = snapshot.with_extensions(self.config["extensions"].values())
+        state = git_state(project_dir)
+        sharding = self.config.get("index_sharding") or {}
+        previous_shards = self.chroma_manager.get_shards(project_name)
+        if not sharding.get("enabled"):
+            if services:
+                raise ValueError("--service needs index_sharding.enabled")
+            for name in previous_shards.values():
+                self.chroma_manager.delete_project(name)
+            return self._embed_index(
+                project_dir,
+                project_name,
+                source_files,
+                snapshot,
+                state,
+                full=full or bool(previous_shards),
+                extra_metadata={"shards": None},
+            )
 
-        print(f"Embedding complete for project '{project_name}'.")
-=======
-        self.ollama_base_url = config["ollama_base_url"]
-        self.embedding_model = config["models"]["embedding_model"]
-        self.supported_languages = config["supported_languages"]
-
-    def _get_embedding(self, text: str) -> List[float]:
-        url = f"{self.ollama_base_url}/api/embeddings"
-        payload = {"model": self.embedding_model, "prompt": text}
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-        return response.json()["embedding"]
-
-    def _split_code_into_chunks(self, code: str, language: str) -> List[str]:
-        if language == "python":
-            splitter = RecursiveCharacterTextSplitter.from_language(
-                language=Language.PYTHON,
-                chunk_size=self.config.get("chunk_size", 2000),
-                chunk_overlap=self.config.get("chunk_overlap", 200),
+        if describe_config(self.config).startswith("pca:"):
+            raise ValueError(
+                "index_sharding can't be combined with a pca embedding_projection: "
+                "each shard would get its own PCA and their distances couldn't "
+                "be merged"
             )
-        elif language == "javascript":
-            splitter = RecursiveCharacterTextSplitter.from_language(
-                language=Language.JS,
-                chunk_size=self.config.get("chunk_size", 2000),
-                chunk_overlap=self.config.get("chunk_overlap", 200),
+        groups = plan_shards(
+            [f.path for f in source_files],
+            service_dirs(snapshot.paths()),
+            sharding.get("min_files", 20),
+        )
+        shards = {s: shard_name(project_name, s) for s in groups if s != ROOT_SERVICE}
+        unknown = set(services or []) - set(shards)
+        if unknown:
+            raise ValueError(
+                f"Unknown service(s) {sorted(unknown)}; shards: {sorted(shards)}"
             )
-        elif language == "typescript":
-            splitter = RecursiveCharacterTextSplitter.from_language(
-                language=Language.TS,
-                chunk_size=self.config.get("chunk_size", 2000),
-                chunk_overlap=self.config.get("chunk_overlap", 200),
+        if shards != previous_shards:
+            # Files moved between shards: rebuild them all.
+            if previous_shards:
+                print("Service layout changed; rebuilding all shards.")
+            for name in set(previous_shards.values()) - set(shards.values()):
+                self.chroma_manager.delete_project(name)
+            full, services = True, None
+        by_path = {f.path: f for f in source_files}
+        reports = {}
+        for service, paths in groups.items():
+            if services and service not in services:
+                continue
+            index_name = shard_name(project_name, service)
+            extra = (
+                {"shards": json.dumps(shards)}
+                if service == ROOT_SERVICE
+                else {"shard_of": project_name, "service": service}
             )
-        elif language == "go":
-            splitter = RecursiveCharacterTextSplitter.from_language(
-                language=Language.GO,
-                chunk_size=self.config.get("chunk_size", 2000),
-                chunk_overlap=self.config.get("chunk_overlap", 200),
+            reports[service or "."] = self._embed_index(
+                project_dir,
+                index_name,
+                [by_path[p] for p in paths],
+                snapshot,
+                state,
+                full=full or bool(services),
+                extra_metadata=extra,
             )
+        report = {
+            key: sum(r[key] for r in reports.values())
+            for key in ("files", "chunks", "new_chunks", "reused_chunks", "batches")
+        }
+        skipped_files = [e for r in reports.values() for e in r["skipped_files"]]
+        report.update(
+            {
+                "skipped": dict(Counter(e["reason"] for e in skipped_files)),
+                "skipped_files": skipped_files,
+                "seconds": sum(r["seconds"] for r in reports.values()),
+                "peak_rss_mb": peak_rss_mb(),
+                "shards": reports,
+            }
+        )
+        return report
+
+    def _embed_index(
+        self,
+        project_dir,
+        project_name: str,
+        source_files: List,
+        snapshot: RepoSnapshot,
+        state,
+        full: bool = False,
+        extra_metadata: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Embed ``source_files`` into the collection ``project_name`` (a whole
+        project, or one of its shards) and return the embed report.
+        """
+        collection = self.chroma_manager.get_collection(
+            project_name, project_dir=project_dir
+        )
+        previous = collection.metadata or {}
+        occurrences = self.chroma_manager.occurrences
+        projections = self.chroma_manager.projections
+        wanted_projection = describe_config(self.config)
+        chunking = describe_chunking(self.config)
+        embed_model = self.config["models"]["embed_model"]
+
+        def content_hash(path):
+            entry = snapshot.get(path)
+            return entry.sha1 if entry else None
+
+        changed = None
+        # Collections from an older index layout or embedding model, or stored
+        # with a different projection or chunking, are rebuilt in full.
+        if (
+            state
+            and not full
+            and previous.get("git_commit")
+            and previous.get("index_version") == INDEX_VERSION
+            and previous.get("embed_model") == embed_model
+            and previous.get("projection", "none") == wanted_projection
+            and previous.get("chunking", chunking) == chunking
+            and collection.count()
+        ):
+            previously_dirty = json.loads(previous.get("git_dirty", "{}"))
+            changed = changed_since(
+                project_dir, previous["git_commit"], previously_dirty
+            )
+            if changed is not None:
+                # Uncommitted files embedded last time are only redone if
+                # their content moved on since then.
+                changed = {
+                    p
+                    for p in changed
+                    if p not in previously_dirty
+                    or previously_dirty[p] != content_hash(p)
+                }
+
+        settings = self.config.get("embedding_projection") or {}
+        if changed is None:
+            print(f"Full scan: {len(source_files)} source files.")
+            if previous.get("projection", "none") != wanted_projection:
+                # The index dimension is fixed once vectors are added.
+                collection = self.chroma_manager.recreate_collection(
+                    project_name, project_dir=project_dir
+                )
+            elif collection.count():
+                collection.delete(where={"project": project_name})
+            occurrences.remove_project(project_name)
+            projections.remove(project_name)
+            writer = _ChunkWriter(collection)
+            if wanted_projection.startswith("truncate:"):
+                writer.projection = Projection.truncate(settings.get("dim", 256))
+            elif wanted_projection.startswith("pca:"):
+                writer.fit_pca_dim = settings.get("dim", 256)
+                writer.fit_chunks = settings.get("pca_fit_chunks", 2048)
         else:
-            # Fallback for unsupported languages or plain text
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=self.config.get("chunk_size", 2000),
-                chunk_overlap=self.config.get("chunk_overlap", 200),
+            print(
+                f"Git reports {len(changed)} changed path(s) since "
+                f"{previous['git_commit'][:12]}."
             )
-        return splitter.split_text(code)
-
-    def embed_project(self, project_path: str, project_name: str = None):
-        project_name = project_name or get_project_name(project_path)
-        collection = self.chroma_manager.get_collection(project_name, project_path)
-
-        documents = []
-        metadatas = []
-        ids = []
-
-        # Filter files based on supported languages and exclude patterns
-        all_files = []
-        for root, _, files in os.walk(project_path):
-            for file in files:
-                file_path = os.path.join(root, file)
-                relative_path = os.path.relpath(file_path, project_path)
-                # Check against exclude patterns
-                if any(
-                    fnmatch.fnmatch(relative_path, pattern)
-                    for pattern in self.config.get("exclude_patterns", [])
-                ):
-                    continue
-                all_files.append(file_path)
-
-        print(f"Source files found: {len(all_files)}")
-        print(f"Source files: {all_files}")
-
-        print(f"Embedding {len(all_files)} files in project '{project_name}'")
-        for file_path in tqdm(all_files, desc=f"Embedding code for {project_name}"):
-            try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    code = f.read()
+            # A chunk is only deleted once no unchanged file still has it.
+            orphaned = occurrences.remove_paths(project_name, changed)
+            if orphaned:
+                collection.delete(ids=orphaned)
+            source_files = [f for f in source_files if f.path in changed]
+            writer = _ChunkWriter(collection, projections.load(project_name))
+        print(f"Embedding {len(source_files)} files in project '{project_name}'")
 
-                language = get_language_from_extension(
-                    file_path, self.supported_languages
-                )
-                chunks = self._split_code_into_chunks(code, language)
-
-                for i, chunk in enumerate(chunks):
-                    documents.append(chunk)
-                    metadatas.append(
-                        {
-                            "file_path": os.path.relpath(file_path, project_path),
-                            "project": project_name,
-                            "language": language,
-                            "chunk_index": i,
-                        }
-                    )
-                    ids.append(f"{project_name}-{os.path.relpath(file_path, project_path)}-{i}")
-
-            except Exception as e:
-                print(f"Error processing {file_path}: {e}")
-
-        if documents:
-            # ChromaDB can handle batching internally, but for very large projects
-            # you might want to add explicit batching here.
-            collection.add(documents=documents, metadatas=metadatas, ids=ids)
-            print(f"Embedding complete for project '{project_name}'.")
+        # Files are read and chunked on a background thread into fixed-size
+        # batches; at most `embed_queue_depth` batches wait for the embedding
+        # model, so memory stays flat however large the repository is.
+        t0 = time.perf_counter()
+        batch_size = self.config.get("embed_batch_size", 32)
+        depth = self.config.get("embed_queue_depth", 4)
+        skipped: List[Dict[str, str]] = []
+        chunks = self.iter_chunks(
+            project_name, source_files, parent=current_span(), skipped=skipped
+        )
+        added = unique = batches = 0
+        with tqdm(desc=f"Embedding code for {project_name}", unit="chunk") as bar:
+            for batch in prefetch(batched(chunks, batch_size), depth):
+                with span("embed_batch", cat="embed", chunks=len(batch)) as s:
+                    new = self._store_batch(writer, project_name, batch)
+                    s.set(new=new)
+                added += len(batch)
+                unique += new
+                batches += 1
+                bar.update(len(batch))
+        writer.flush()
+        if writer.projection is not None and changed is None:
+            projections.save(project_name, writer.projection)
+
+        metadata = {
+            **previous,
+            "project_dir": os.path.abspath(project_dir),
+            "index_version": INDEX_VERSION,
+            "embed_model": embed_model,
+            "projection": wanted_projection,
+            "chunking": chunking,
+        }
+        if state:
+            # Record what was embedded so the next run can ask git for changes
+            metadata.update(
+                {
+                    "git_commit": state.commit,
+                    "git_tree": state.tree,
+                    "git_dirty": json.dumps({p: content_hash(p) for p in state.dirty}),
+                }
+            )
         else:
-            print(f"No documents to embed for project '{project_name}'.")
->>>>>>> main
+            for key in ("git_commit", "git_tree", "git_dirty"):
+                metadata.pop(key, None)
+        for key, value in (extra_metadata or {}).items():
+            if value is None:
+                metadata.pop(key, None)
+            else:
+                metadata[key] = value
+        self.chroma_manager.set_project_metadata(project_name, metadata)
+        report = {
+            "files": len(source_files),
+            "chunks": added,
+            "new_chunks": unique,
+            "reused_chunks": added - unique,
+            "batches": batches,
+            "skipped": dict(Counter(entry["reason"] for entry in skipped)),
+            "skipped_files": skipped,
+            "seconds": time.perf_counter() - t0,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+        if skipped:
+            reasons = ", ".join(f"{n} {r}" for r, n in report["skipped"].items())
+            print(f"Skipped {len(skipped)} file(s): {reasons}.")
+        rss = report["peak_rss_mb"]
+        print(
+            f"Embedding complete for project '{project_name}': {added} chunks "
+            f"({unique} new, {added - unique} already stored) from "
+            f"{len(source_files)} files in {report['seconds']:.1f}s"
+            + (f", peak RSS {rss:.0f} MB." if rss is not None else ".")
+        )
+        return report
@@ -0,0 +1,225 @@
+"""
+Retrieval evaluation: embed a project under each combination of chunking and
+HNSW parameters and score a labeled query set against it.
+
+A query set is a YAML/JSON list of ``{query, relevant}`` items, where
+``relevant`` lists the files (relative paths) a good answer comes from:
+
+    - query: where is the redis client configured?
+      relevant: [services/cache/client.py]
+
+Relevance is judged per file, so the same labels work for every chunking.
+Each combination reports recall@k, MRR, p50/p95 search latency, index size on
+disk and embed time. Combinations that only differ in HNSW parameters share
+one embedding run; its vectors are copied into a fresh index per setting.
+"""
+
+import itertools
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import yaml
+
+from .chroma_manager import ChromaManager
+from .embedder import Embedder
+from .retriever import Retriever
+
+EVAL_PROJECT = "eval"
+
+
+def load_query_set(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        items = yaml.safe_load(f) or []
+    queries = []
+    for item in items:
+        relevant = item.get("relevant") or item.get("file")
+        if not item.get("query") or not relevant:
+            raise ValueError(f"Query set items need 'query' and 'relevant': {item!r}")
+        if isinstance(relevant, str):
+            relevant = [relevant]
+        queries.append({"query": item["query"], "relevant": list(relevant)})
+    return queries
+
+
+def parameter_grid(
+    chunk_sizes: Iterable[int],
+    chunk_overlaps: Iterable[int],
+    ms: Iterable[int],
+    construction_efs: Iterable[int],
+    search_efs: Iterable[int],
+) -> List[Dict[str, int]]:
+    """Every combination, skipping overlaps that aren't smaller than the size."""
+    return [
+        {
+            "chunk_size": size,
+            "chunk_overlap": overlap,
+            "M": m,
+            "construction_ef": construction_ef,
+            "search_ef": search_ef,
+        }
+        for size, overlap, m, construction_ef, search_ef in itertools.product(
+            chunk_sizes, chunk_overlaps, ms, construction_efs, search_efs
+        )
+        if overlap < size
+    ]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[round(q * (len(ordered) - 1))]
+
+
+def _dir_size_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total / (1024 * 1024)
+
+
+def _chunking(params: Dict[str, int]) -> tuple:
+    return params["chunk_size"], params["chunk_overlap"]
+
+
+def _run_config(config: dict, params: Dict[str, int], db_dir: str) -> dict:
+    return {
+        **config,
+        "chroma_db_dir": db_dir,
+        # Scored as one index; _copy_index doesn't know about shards
+        "index_sharding": {"enabled": False},
+        # One size for code-aware and plain-text splitting alike
+        "chunking": {
+            "code_chunk_size": params["chunk_size"],
+            "code_chunk_overlap": params["chunk_overlap"],
+            "text_chunk_size": params["chunk_size"],
+            "text_chunk_overlap": params["chunk_overlap"],
+        },
+        "hnsw": {
+            **(config.get("hnsw") or {}),
+            "M": params["M"],
+            "construction_ef": params["construction_ef"],
+            "search_ef": params["search_ef"],
+        },
+    }
+
+
+def _copy_index(source: ChromaManager, target: ChromaManager) -> None:
+    """Copy the eval project's vectors, occurrences and projection."""
+    src = source.get_collection(EVAL_PROJECT)
+    dst = target.get_collection(EVAL_PROJECT)
+    offset = 0
+    while True:
+        page = src.get(
+            limit=1000,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"],
+        )
+        if not page["ids"]:
+            break
+        dst.add(
+            ids=page["ids"],
+            embeddings=page["embeddings"],
+            documents=page["documents"],
+            metadatas=page["metadatas"],
+        )
+        offset += len(page["ids"])
+    dst.modify(metadata=src.metadata)
+    shutil.copyfile(source.occurrences.db_path, target.occurrences.db_path)
+    projection = source.projections.load(EVAL_PROJECT)
+    if projection is not None:
+        target.projections.save(EVAL_PROJECT, projection)
+
+
+def _score(
+    retriever: Retriever, queries: List[dict], vectors: List[list], k: int
+) -> Dict[str, float]:
+    latencies, recalls, reciprocal_ranks = [], [], []
+    for item, vector in zip(queries, vectors):
+        t0 = time.perf_counter()
+        hits = retriever.search(EVAL_PROJECT, vector, k)
+        latencies.append((time.perf_counter() - t0) * 1000)
+        relevant = set(item["relevant"])
+        found, first_rank = set(), None
+        for rank, hit in enumerate(hits, start=1):
+            files = {o["file_path"] for o in hit["occurrences"]} & relevant
+            if files and first_rank is None:
+                first_rank = rank
+            found |= files
+        recalls.append(len(found) / len(relevant))
+        reciprocal_ranks.append(1 / first_rank if first_rank else 0.0)
+    return {
+        "recall_at_k": sum(recalls) / len(recalls),
+        "mrr": sum(reciprocal_ranks) / len(reciprocal_ranks),
+        "p50_ms": _percentile(latencies, 0.5),
+        "p95_ms": _percentile(latencies, 0.95),
+    }
+
+
+def evaluate(
+    config: dict,
+    project_dir: str,
+    queries: List[dict],
+    grid: List[Dict[str, int]],
+    k: int = 5,
+    work_dir: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Score ``queries`` for every combination in ``grid``; one row each."""
+    if not queries:
+        raise ValueError("The query set is empty")
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp:
+        rows = []
+        vectors = None
+        for _, group in itertools.groupby(sorted(grid, key=_chunking), key=_chunking):
+            source = None
+            for params in group:
+                run_config = _run_config(
+                    config, params, os.path.join(tmp, f"run{len(rows)}")
+                )
+                manager = ChromaManager.from_config(run_config)
+                if source is None:
+                    embedder = Embedder(run_config, manager)
+                    t0 = time.perf_counter()
+                    report = embedder.embed_project(
+                        project_dir, EVAL_PROJECT, full=True
+                    )
+                    embed_s = time.perf_counter() - t0
+                    if vectors is None:
+                        vectors = embedder.embed_batch([q["query"] for q in queries])
+                    source = manager
+                else:
+                    _copy_index(source, manager)
+                row = {
+                    **params,
+                    **_score(Retriever(run_config, manager), queries, vectors, k),
+                    "k": k,
+                    "chunks": report["new_chunks"],
+                    "index_mb": _dir_size_mb(run_config["chroma_db_dir"]),
+                    "embed_s": embed_s,
+                }
+                rows.append(row)
+        return rows
+
+
+def format_results(rows: List[Dict[str, Any]]) -> List[str]:
+    """A fixed-width table, best recall@k first."""
+    header = (
+        f"{'size':>6} {'overlap':>7} {'M':>4} {'c_ef':>5} {'s_ef':>5} "
+        f"{'recall':>7} {'mrr':>6} {'p50ms':>7} {'p95ms':>7} "
+        f"{'chunks':>7} {'indexMB':>8} {'embed_s':>8}"
+    )
+    lines = [header]
+    for r in sorted(rows, key=lambda r: (-r["recall_at_k"], -r["mrr"])):
+        lines.append(
+            f"{r['chunk_size']:>6} {r['chunk_overlap']:>7} {r['M']:>4} "
+            f"{r['construction_ef']:>5} {r['search_ef']:>5} "
+            f"{r['recall_at_k']:>7.3f} {r['mrr']:>6.3f} {r['p50_ms']:>7.1f} "
+            f"{r['p95_ms']:>7.1f} {r['chunks']:>7} {r['index_mb']:>8.1f} "
+            f"{r['embed_s']:>8.1f}"
+        )
+    return lines
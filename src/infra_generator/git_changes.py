@@ -0,0 +1,77 @@
+import logging
+import subprocess
+from typing import Iterable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def _git(project_dir: str, *args: str) -> Optional[str]:
+    """Run a git command in ``project_dir``; None if git fails or is missing."""
+    try:
+        result = subprocess.run(
+            ["git", "-C", project_dir, *args],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout
+
+
+def _paths(output: Optional[str]) -> List[str]:
+    # Paths listed with -z: NUL-separated and never quoted, so non-ASCII
+    # names come back as they appear in the snapshot
+    return [path for path in (output or "").split("\0") if path]
+
+
+class GitState:
+    """HEAD commit, tree and uncommitted paths of the checkout at project_dir."""
+
+    def __init__(self, commit: str, tree: str, dirty: List[str]):
+        self.commit = commit
+        self.tree = tree
+        self.dirty = dirty
+
+
+def git_state(project_dir: str) -> Optional[GitState]:
+    """
+    Return the git state of ``project_dir``, or None outside a git checkout
+    (or in a repository without commits). ``dirty`` lists paths, relative to
+    ``project_dir``, that differ from HEAD: modified, staged, deleted and
+    untracked (non-ignored) files.
+    """
+    commit = _git(project_dir, "rev-parse", "HEAD")
+    tree = _git(project_dir, "rev-parse", "HEAD^{tree}")
+    if not commit or not tree:
+        return None
+    diff = _git(
+        project_dir, "diff", "-z", "--name-only", "--no-renames", "--relative", "HEAD"
+    )
+    untracked = _git(project_dir, "ls-files", "-z", "--others", "--exclude-standard")
+    if diff is None or untracked is None:
+        return None
+    dirty = sorted(set(_paths(diff)) | set(_paths(untracked)))
+    return GitState(commit.strip(), tree.strip(), dirty)
+
+
+def changed_since(
+    project_dir: str, commit: str, previously_dirty: Iterable[str] = ()
+) -> Optional[Set[str]]:
+    """
+    Paths (relative to ``project_dir``) whose content may differ from what was
+    embedded at ``commit``. Combines the working tree diff against that commit
+    (which also covers branch switches), untracked files, and paths that were
+    dirty when the previous embed ran. Returns None when the commit is no
+    longer available, in which case callers should fall back to a full scan.
+    """
+    if _git(project_dir, "cat-file", "-e", f"{commit}^{{commit}}") is None:
+        logger.info(f"Commit {commit} not found; falling back to a full scan.")
+        return None
+    diff = _git(
+        project_dir, "diff", "-z", "--name-only", "--no-renames", "--relative", commit
+    )
+    untracked = _git(project_dir, "ls-files", "-z", "--others", "--exclude-standard")
+    if diff is None or untracked is None:
+        return None
+    return set(_paths(diff)) | set(_paths(untracked)) | set(previously_dirty)
@@ -0,0 +1,181 @@
+"""
+Portable snapshots of an embedded project.
+
+A snapshot is one compressed ``.npz`` file holding a collection column by
+column: the embeddings as a float16 (or float32) matrix, and ids, documents
+and each metadata key as UTF-8 JSON arrays, plus the chunk occurrences and
+the project's projection. Loading one takes seconds where re-embedding takes
+hours, so a CI runner or a new machine can start from a colleague's index.
+
+A snapshot is only imported if it was embedded with the configured model and
+its vectors have the width the target index expects.
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+FORMAT_VERSION = 1
+PAGE_SIZE = 1000
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _json_column(values: List[Any]) -> np.ndarray:
+    return np.frombuffer(json.dumps(values).encode("utf-8"), dtype=np.uint8)
+
+
+def _read_json(array: np.ndarray) -> Any:
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+def export_project(
+    manager, project: str, path: str, dtype: str = "float16"
+) -> Dict[str, Any]:
+    """Write ``project`` to ``path`` and return the snapshot header."""
+    if not manager.has_project(project):
+        raise SnapshotError(f"Project '{project}' does not exist")
+    if manager.get_shards(project):
+        raise SnapshotError(f"Project '{project}' is sharded by service")
+    collection = manager.get_collection(project)
+    ids, documents, metadatas, vectors = [], [], [], []
+    offset = 0
+    while True:
+        page = collection.get(
+            limit=PAGE_SIZE,
+            offset=offset,
+            include=["embeddings", "documents", "metadatas"],
+        )
+        if not len(page["ids"]):
+            break
+        ids.extend(page["ids"])
+        documents.extend(page["documents"])
+        metadatas.extend(page["metadatas"])
+        vectors.append(np.asarray(page["embeddings"], dtype=dtype))
+        offset += len(page["ids"])
+    if not ids:
+        raise SnapshotError(f"Project '{project}' has no vectors to export")
+    embeddings = np.concatenate(vectors)
+
+    collection_metadata = manager.get_project_metadata(project)
+    projection = manager.projections.load(project)
+    header = {
+        "format": FORMAT_VERSION,
+        "project": project,
+        "count": len(ids),
+        "dim": int(embeddings.shape[1]),
+        "dtype": dtype,
+        "embed_model": collection_metadata.get("embed_model"),
+        "projection": projection.describe() if projection else "none",
+        "metadata": collection_metadata,
+    }
+    keys = sorted({k for m in metadatas for k in m})
+    arrays = {
+        "header": _json_column(header),
+        "embeddings": embeddings,
+        "ids": _json_column(ids),
+        "documents": _json_column(documents),
+        "meta_keys": _json_column(keys),
+        "occurrences": _json_column(manager.occurrences.rows(project)),
+    }
+    for i, key in enumerate(keys):
+        arrays[f"meta_{i}"] = _json_column([m.get(key) for m in metadatas])
+    if projection is not None and projection.components is not None:
+        arrays["projection_components"] = projection.components
+    np.savez_compressed(path, **arrays)
+    return header
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    with np.load(path) as data:
+        return _read_json(data["header"])
+
+
+def _existing_dim(manager, embed_model: str, projection: str) -> Optional[int]:
+    """Vector width of another project embedded the same way, if any."""
+    for name in manager.get_all_projects():
+        metadata = manager.get_project_metadata(name)
+        if (
+            metadata.get("embed_model") != embed_model
+            or metadata.get("projection", "none") != projection
+        ):
+            continue
+        sample = manager.get_collection(name).get(limit=1, include=["embeddings"])
+        if len(sample["ids"]):
+            return len(sample["embeddings"][0])
+    return None
+
+
+def import_project(
+    manager,
+    path: str,
+    embed_model: Optional[str] = None,
+    project: Optional[str] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """
+    Load a snapshot into ``manager`` as ``project`` (default: the exported
+    name), replacing any collection of that name. ``embed_model`` is the
+    model queries will be embedded with; a snapshot made with another model,
+    or whose width differs from same-model projects already in the index, is
+    refused unless ``force``.
+    """
+    with np.load(path) as data:
+        header = _read_json(data["header"])
+        if header.get("format") != FORMAT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot format {header.get('format')}")
+        embeddings = data["embeddings"]
+        if embeddings.shape != (header["count"], header["dim"]):
+            raise SnapshotError("Snapshot is truncated or corrupt")
+        if not force:
+            if embed_model and header["embed_model"] != embed_model:
+                raise SnapshotError(
+                    f"Snapshot was embedded with '{header['embed_model']}', "
+                    f"but the configured model is '{embed_model}'"
+                )
+            dim = _existing_dim(manager, header["embed_model"], header["projection"])
+            if dim is not None and dim != header["dim"]:
+                raise SnapshotError(
+                    f"Snapshot vectors have {header['dim']} dimensions; this "
+                    f"index has {dim} for '{header['embed_model']}'"
+                )
+        ids = _read_json(data["ids"])
+        documents = _read_json(data["documents"])
+        keys = _read_json(data["meta_keys"])
+        columns = [_read_json(data[f"meta_{i}"]) for i in range(len(keys))]
+        occurrences = _read_json(data["occurrences"])
+        components = (
+            data["projection_components"] if "projection_components" in data else None
+        )
+
+    project = project or header["project"]
+    metadatas = [
+        {k: col[i] for k, col in zip(keys, columns) if col[i] is not None}
+        for i in range(len(ids))
+    ]
+    if project != header["project"]:
+        for metadata in metadatas:
+            metadata["project"] = project
+    collection = manager.recreate_collection(project)
+    batch = manager.client.get_max_batch_size()
+    for start in range(0, len(ids), batch):
+        end = start + batch
+        collection.add(
+            ids=ids[start:end],
+            documents=documents[start:end],
+            metadatas=metadatas[start:end],
+            embeddings=embeddings[start:end].astype(np.float32),
+        )
+    manager.set_project_metadata(project, header["metadata"])
+    manager.occurrences.remove_project(project)
+    manager.occurrences.add(project, [tuple(row) for row in occurrences])
+    manager.projections.remove(project)
+    if header["projection"] != "none":
+        from .projection import Projection
+
+        method, dim = header["projection"].split(":")
+        manager.projections.save(project, Projection(method, int(dim), components))
+    return {**header, "project": project}
@@ -1,18 +1,35 @@
 import json
 import logging
 import os
-import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
+from .artifact_lock import (
+    ArtifactLock,
+    compose_fingerprint,
+    dockerfile_fingerprint,
+    generated_paths,
+    template_fingerprint,
+)
 from .chroma_manager import ChromaManager
+from .clone_cache import CloneCache, is_git_url, repo_name_from_url
 from .embedder import Embedder
-from .infra_generator import InfraGenerator
+from .infra_generator import detect_services_and_versions
+from .llm_client import get_chat_model
+from .llm_usage import summarize_usage
+from .pipeline import Stage, StageCache, StageGraph
+from .project_context import MANIFEST_FILENAMES, ProjectContext
 from .query_handler import QueryHandler
+from .repo_snapshot import RepoSnapshot
 from .retriever import Retriever
+from .shards import service_shard
+from .stack_templates import detect_service, render_dockerfile
+from .tracing import span
+from .tree_summary import service_scope
 from .tools.git_tools import GitIngestTool
 from .tools.infra_tools import ComposeTool, DockerfileServiceTool
 from .utils import load_config
+from .validation import tree_checker, validate_dockerfile
 
 logger = logging.getLogger(__name__)
 
@@ -22,33 +39,8 @@ def llm_parse_tree(tree_str: str, config: dict) -> list:
     Use the LLM to parse a pretty-printed directory tree string into a list of
     relative manifest file paths only.
     """
-    from langchain_ollama import ChatOllama
-
-    manifest_filenames = [
-        "package.json",
-        "requirements.txt",
-        "pyproject.toml",
-        "Pipfile",
-        "environment.yml",
-        "setup.py",
-        "poetry.lock",
-        "yarn.lock",
-        "Dockerfile",
-        "go.mod",
-        "go.sum",
-        "Gemfile",
-        "composer.json",
-        "Cargo.toml",
-        "Cargo.lock",
-        "build.gradle",
-        "pom.xml",
-    ]
-    manifest_patterns = ", ".join(f'"{name}"' for name in manifest_filenames)
-    llm = ChatOllama(
-        base_url=config["ollama_base_url"],
-        model=config["models"]["qna_model"],
-        temperature=0.0,
-    )
+    manifest_patterns = ", ".join(f'"{name}"' for name in MANIFEST_FILENAMES)
+    llm = get_chat_model(config, temperature=0.0)
     prompt = f"""
     Given the following directory tree (as output by the `tree` command),
     extract and return a JSON list of all file paths (relative to the root)
@@ -71,160 +63,513 @@ def llm_parse_tree(tree_str: str, config: dict) -> list:
     return []
 
 
-def run_infra_pipeline(source: str, output_folder: str) -> None:
-    config = load_config()
+def build_infra_graph(
+    config: dict,
+    chroma_manager: ChromaManager,
+    embedder: Embedder,
+    retriever: Retriever,
+    regenerate: bool = False,
+    use_llm: bool = False,
+) -> StageGraph:
+    """
+    The generate-infra pipeline as a stage graph. Embedding runs alongside
+    the summary/tree ingest and service detection, which only need the
+    checkout; context retrieval waits for both.
 
-    # --- Setup core components ---
-    chroma_manager = ChromaManager(config["chroma_db_dir"])
-    embedder = Embedder(config, chroma_manager)
-    retriever = Retriever(config, chroma_manager)
-    query_handler = QueryHandler(config, retriever)
-
-    project_name = Path(source).stem
-    t0 = time.time()
-
-    # --- Embed project if it's new ---
-    if project_name not in chroma_manager.get_all_projects():
-        logger.info(f"Project '{project_name}' not found. Embedding source: {source}")
-        t_embed = time.time()
-        embedder.embed_project(source, project_name)
-        logger.info(f"Embedding complete. Time taken: {time.time() - t_embed:.1f}s")
-    else:
-        logger.info(f"Project '{project_name}' already embedded.")
+    Artifacts whose inputs match the fingerprint in the output folder's
+    ``infra.lock.json`` are kept rather than generated again, unless
+    ``regenerate`` is set.
 
-    # 1) Ingest project summary
-    logger.info("Ingesting project summary...")
-    t_ingest = time.time()
-    ingest_tool = GitIngestTool(
-        exclude_patterns=set(config.get("exclude_patterns", []))
-    )
-    ingest_res = ingest_tool.run(source)
-    ingest_data: Dict[str, Any] = json.loads(ingest_res)
-    summary: str = ingest_data["summary"]
-    logger.info(f"Project summary: {summary}")
-    logger.info(
-        f"Project summary ingestion complete. Time taken: "
-        f"{time.time() - t_ingest:.1f}s"
-    )
+    Services on a common stack get their Dockerfile from a template (see
+    ``stack_templates.py``) unless ``use_llm`` is set or the
+    ``template_fast_path`` config is off; the rest go to the LLM. On the
+    template path, the manifests templates cover are also read for language
+    and version directly, and retrieval runs only for the LLM's services.
+    """
+    use_templates = not use_llm and config.get("template_fast_path", True)
+
+    def reusable(output_path: str, artifact_path: str, fingerprint: str):
+        if regenerate:
+            return None
+        return ArtifactLock(output_path).reusable(artifact_path, fingerprint)
+
+    def checkout(source: str, ref: Optional[str], output_folder: str) -> dict:
+        if is_git_url(source):
+            # Git URLs are materialized once in the clone cache and then
+            # handled like any local checkout; artifacts go to the output
+            # folder as given.
+            project_dir = CloneCache.from_config(config).get(source, ref)
+            return {"project_dir": project_dir, "output_path": output_folder}
+        return {
+            "project_dir": source,
+            "output_path": os.path.join(source, output_folder),
+        }
 
-    # Use file tree from ingest
-    tree = ingest_data.get("tree") or []
-    logger.info(f"Project tree datatype: {type(tree)}")
-    logger.info(f"Project tree: {tree}")
-    # If tree is a string, use LLM to parse it robustly
-    if isinstance(tree, str):
-        all_file_paths = llm_parse_tree(tree, config)
-        logger.info(
-            f"LLM parsed {len(all_file_paths)} manifest file paths from pretty "
-            "tree."
+    def snapshot(project_dir: str, output_path: str) -> dict:
+        # A local checkout is walked exactly once; the embedder, summary/tree,
+        # manifest reader and entrypoint lookup all share the snapshot.
+        if not os.path.isdir(project_dir):
+            return {"snapshot": None}
+        snap = RepoSnapshot.build(
+            project_dir,
+            config.get("exclude_patterns", []),
+            skip_paths=generated_paths(project_dir, output_path),
         )
-        manifest_paths = all_file_paths
-    else:
-        all_file_paths = tree
-        manifest_paths = tree  # fallback, but should be list of strings
-
-    # Read manifest file contents
-    manifest_files = []
-    for fpath in manifest_paths:
-        abs_path = os.path.join(source, fpath)
-        try:
-            with open(abs_path, "r", encoding="utf-8") as mf:
-                content = mf.read()
-        except Exception as e:
-            logger.warning(f"Could not read manifest {abs_path}: {e}")
-            content = ""
-        manifest_files.append({"path": fpath, "content": content})
-
-    # 3) Detect services and versions
-    logger.info("Detecting services and versions...")
-    t_detect = time.time()
-    infra_gen = InfraGenerator(project_name, config, chroma_manager)
-    services = infra_gen._detect_services_and_versions(manifest_files)
-    logger.info(
-        f"Service detection complete. Found {len(services)} service(s). "
-        f"Time taken: {time.time() - t_detect:.1f}s"
-    )
-    if not services:
-        raise RuntimeError(
-            f"Could not detect any services in {source}. Check for manifest "
-            "files (e.g., package.json, requirements.txt)."
+        logger.info(f"Snapshot of {len(snap)} files")
+        return {"snapshot": snap}
+
+    def embed(project_dir: str, project_name: str, snapshot) -> dict:
+        # Embed the project if it's new, or refresh paths git reports as changed
+        if not chroma_manager.has_project(project_name):
+            logger.info(f"Project '{project_name}' not found. Embedding {project_dir}")
+            embedder.embed_project(project_dir, project_name, snapshot=snapshot)
+        elif chroma_manager.get_project_metadata(project_name).get("git_commit"):
+            logger.info(f"Project '{project_name}' already embedded; syncing.")
+            embedder.embed_project(project_dir, project_name, snapshot=snapshot)
+        else:
+            logger.info(f"Project '{project_name}' already embedded.")
+        return {"index_ready": True}
+
+    def ingest(project_dir: str, project_name: str, snapshot) -> dict:
+        if snapshot is not None:
+            summary = snapshot.summary(project_name)
+            logger.info(f"Project summary: {summary}")
+            return {
+                "summary": summary,
+                "tree": snapshot.paths(),
+                "manifest_paths": snapshot.find(MANIFEST_FILENAMES),
+            }
+        ingest_tool = GitIngestTool(
+            exclude_patterns=set(config.get("exclude_patterns", []))
         )
+        ingest_data: Dict[str, Any] = json.loads(ingest_tool.run(project_dir))
+        summary = ingest_data["summary"]
+        logger.info(f"Project summary: {summary}")
+        tree = ingest_data.get("tree") or []
+        # If tree is a string, use LLM to parse it robustly
+        if isinstance(tree, str):
+            tree = llm_parse_tree(tree, config)
+            logger.info(f"LLM parsed {len(tree)} manifest file paths from tree.")
+        return {"summary": summary, "tree": tree, "manifest_paths": tree}
+
+    def detect_services(manifests: list, project_dir: str) -> list:
+        # On the template path, manifests the templates cover are read
+        # directly; only the rest cost an LLM call each.
+        found = [
+            detect_service(mf, project_dir) if use_templates else None
+            for mf in manifests
+        ]
+        rest = [mf for mf, svc in zip(manifests, found) if svc is None]
+        detected = iter(detect_services_and_versions(rest, config) if rest else [])
+        return [svc if svc is not None else next(detected) for svc in found]
+
+    def context(
+        project_dir: str,
+        project_name: str,
+        snapshot,
+        summary: str,
+        tree: list,
+        manifest_paths: list,
+    ) -> dict:
+        # One run-scoped context memoizes manifests, services and retrievals
+        # for every stage below.
+        return {
+            "project_context": ProjectContext(
+                project_name,
+                project_dir,
+                retriever=retriever,
+                summary=summary,
+                tree=tree,
+                manifest_paths=manifest_paths,
+                service_detector=lambda manifests: detect_services(
+                    manifests, project_dir
+                ),
+                snapshot=snapshot,
+            )
+        }
 
-    artifacts: List[Dict[str, Any]] = []
+    def services(project_context: ProjectContext, project_dir: str) -> dict:
+        found = project_context.services
+        logger.info(f"Service detection found {len(found)} service(s).")
+        if not found:
+            raise RuntimeError(
+                f"Could not detect any services in {project_dir}. Check for "
+                "manifest files (e.g., package.json, requirements.txt)."
+            )
+        return {"services": found}
 
-    # 4) Generate Dockerfile for each detected service
-    docker_tool = DockerfileServiceTool()
-    for svc in services:
-        logger.info(f"Preparing to generate Dockerfile for service: '{svc['name']}'")
-        t_docker = time.time()
-        svc_ctx = query_handler.build_context(
+    def from_template(svc: dict, project_dir: str, exists) -> Optional[dict]:
+        rendered = render_dockerfile(svc, project_dir)
+        if rendered is None:
+            return None
+        errors = validate_dockerfile(rendered["content"], svc.get("path", ""), exists)
+        if errors:
+            logger.warning(
+                f"{rendered['stack']} template for '{svc['name']}' failed "
+                f"validation ({'; '.join(errors)}); using the LLM instead."
+            )
+            return None
+        return rendered
+
+    def templates(services: list, project_dir: str, tree: list) -> dict:
+        # Rendered before retrieval so only the services left to the LLM
+        # have their code context looked up.
+        if not use_templates:
+            return {"rendered": {}}
+        exists = tree_checker(tree, config.get("exclude_patterns", []))
+        rendered = {}
+        for svc in services:
+            result = from_template(svc, project_dir, exists)
+            if result is not None:
+                rendered[svc["name"]] = result
+        return {"rendered": rendered}
+
+    def contexts(
+        project_context: ProjectContext,
+        project_name: str,
+        services: list,
+        rendered: dict,
+        index_ready: bool,
+    ) -> dict:
+        # Retrieve code context for every service the LLM generates (and the
+        # compose file) up front. Queries use the embedding model; doing them
+        # first lets the generation calls run back to back on the generation
+        # model, in template order, so Ollama keeps reusing the shared prompt
+        # prefix.
+        # In a sharded project each service searches only its own shard.
+        query_handler = QueryHandler(config, project_context)
+        k = config.get("rag_k", 5)
+        max_chars = config.get("max_code_context_chars", 2000)
+        shards = list(chroma_manager.get_shards(project_name))
+        service_contexts = {}
+        for svc in services:
+            if svc["name"] in rendered:
+                continue
+            service_contexts[svc["name"]] = query_handler.build_context(
+                query=(
+                    f"code snippets for {svc['name']} {svc['language']} service "
+                    "entrypoint, server setup, and dependencies"
+                ),
+                k=k,
+                project=project_name,
+                max_context_length=max_chars,
+                services=(
+                    [service_shard(svc.get("path", ""), shards)] if shards else None
+                ),
+            )
+        repo_context = query_handler.build_context(
             query=(
-                f"code snippets for {svc['name']} {svc['language']} service "
-                "entrypoint, server setup, and dependencies"
+                "top-level configuration, docker-compose examples, "
+                "inter-service communication"
             ),
-            k=config.get("rag_k", 5),
+            k=k,
             project=project_name,
-            max_context_length=config.get("max_code_context_chars", 2000),
+            max_context_length=max_chars,
         )
+        return {"service_contexts": service_contexts, "repo_context": repo_context}
+
+    def dockerfiles(
+        services: list,
+        tree: list,
+        rendered: dict,
+        service_contexts: dict,
+        output_path: str,
+    ) -> dict:
+        docker_tool = DockerfileServiceTool()
+        artifacts = []
+        for svc in services:
+            artifact_path = os.path.join(svc.get("path", ""), "Dockerfile")
+            template = rendered.get(svc["name"])
+            if template is not None:
+                fingerprint = template_fingerprint(
+                    template["stack"], template["content"]
+                )
+            else:
+                # The prompt sees only this service's files, so a change in
+                # another service doesn't regenerate this Dockerfile.
+                svc_summary, svc_tree = service_scope(svc, services, tree)
+                fingerprint = dockerfile_fingerprint(
+                    svc, svc_summary, svc_tree, service_contexts[svc["name"]], config
+                )
+            content = reusable(output_path, artifact_path, fingerprint)
+            if content is not None:
+                logger.info(f"Dockerfile for '{svc['name']}' is up to date; kept.")
+                artifacts.append(
+                    {
+                        "path": artifact_path,
+                        "content": content,
+                        "fingerprint": fingerprint,
+                        "reused": True,
+                    }
+                )
+                continue
+            if template is not None:
+                logger.info(
+                    f"Dockerfile for '{svc['name']}' rendered from the "
+                    f"{template['stack']} template."
+                )
+                artifacts.append(
+                    {
+                        "path": artifact_path,
+                        "content": template["content"],
+                        "fingerprint": fingerprint,
+                    }
+                )
+                continue
+            payload = {
+                "service": svc,
+                "summary": svc_summary,
+                "tree": svc_tree,  # summarized by the tool
+                "repo_tree": tree,  # COPY sources are checked against it
+                "code_context": service_contexts[svc["name"]],
+                "config": config,
+            }
+            with span("dockerfile", cat="generate", service=svc["name"]) as s:
+                artifact = json.loads(docker_tool.run(json.dumps(payload)))
+            artifacts.append({**artifact, "fingerprint": fingerprint})
+            logger.info(
+                f"Dockerfile for '{svc['name']}' generated in {s.duration:.1f}s"
+            )
+        return {"dockerfile_artifacts": artifacts}
 
-        payload = {
-            "service": svc,
+    def compose(
+        project_name: str,
+        services: list,
+        summary: str,
+        tree: list,
+        repo_context,
+        output_path: str,
+    ) -> dict:
+        fingerprint = compose_fingerprint(
+            project_name, services, summary, tree, repo_context, config
+        )
+        content = reusable(output_path, "docker-compose.yml", fingerprint)
+        if content is not None:
+            logger.info("docker-compose.yml is up to date; kept.")
+            return {
+                "compose_artifact": {
+                    "path": "docker-compose.yml",
+                    "content": content,
+                    "fingerprint": fingerprint,
+                    "reused": True,
+                }
+            }
+        comp_payload = {
+            "project_name": project_name,
+            "services": services,
             "summary": summary,
-            "tree": all_file_paths,  # pass the list of file paths, not manifest dicts
-            "tree_list": json.dumps(
-                all_file_paths, indent=2
-            ),  # pretty JSON for LLM prompt
-            "code_context": svc_ctx,
+            "tree": tree,  # summarized by the tool
+            "repo_code_context": repo_context,
             "config": config,
         }
-        art_json = docker_tool.run(json.dumps(payload))
-        artifacts.append(json.loads(art_json))
-        logger.info(
-            f"Dockerfile for '{svc['name']}' generated in {time.time() - t_docker:.1f}s"
-        )
+        artifact = json.loads(ComposeTool().run(json.dumps(comp_payload)))
+        return {"compose_artifact": {**artifact, "fingerprint": fingerprint}}
+
+    def write(
+        output_path: str, dockerfile_artifacts: list, compose_artifact: dict
+    ) -> dict:
+        artifacts = dockerfile_artifacts + [compose_artifact]
+        usage = [a["llm_usage"] for a in artifacts if a.get("llm_usage")]
+        usage += [u for a in artifacts for u in a.get("repair_usage", [])]
+        for line in summarize_usage(usage):
+            logger.info(f"LLM prompt usage: {line}")
+        lock = ArtifactLock(output_path)
+        written = []
+        for art in artifacts:
+            if art.get("validation_errors"):
+                # Written for inspection, but not locked: the next run retries
+                logger.warning(
+                    f"{art['path']} failed validation: "
+                    + "; ".join(art["validation_errors"])
+                )
+                lock.forget(art["path"])
+            elif art.get("fingerprint"):
+                lock.record(art["path"], art["fingerprint"])
+            if art.get("reused"):
+                continue
+            dest = os.path.join(output_path, art["path"])
+            with span("write_file", cat="io", path=dest, bytes=len(art["content"])):
+                os.makedirs(os.path.dirname(dest), exist_ok=True)
+                with open(dest, "w", encoding="utf-8") as f:
+                    f.write(art["content"])
+            logger.info("Wrote %s", dest)
+            written.append(dest)
+        lock.save()
+        return {"written": written}
 
-    # 5) Generate docker-compose.yml for all services
-    logger.info("Preparing to generate docker-compose.yml for all services...")
-    t_compose = time.time()
-    repo_ctx = query_handler.build_context(
-        query=(
-            "top-level configuration, docker-compose examples, "
-            "inter-service communication"
-        ),
-        k=config.get("rag_k", 5),
-        project=project_name,
-        max_context_length=config.get("max_code_context_chars", 2000),
+    return StageGraph(
+        [
+            Stage(
+                "checkout",
+                checkout,
+                inputs=["source", "ref", "output_folder"],
+                outputs=["project_dir", "output_path"],
+                cacheable=False,
+            ),
+            Stage(
+                "snapshot",
+                snapshot,
+                inputs=["project_dir", "output_path"],
+                outputs=["snapshot"],
+                cacheable=False,
+            ),
+            Stage(
+                "embed",
+                embed,
+                inputs=["project_dir", "project_name", "snapshot"],
+                outputs=["index_ready"],
+            ),
+            Stage(
+                "ingest",
+                ingest,
+                inputs=["project_dir", "project_name", "snapshot"],
+                outputs=["summary", "tree", "manifest_paths"],
+            ),
+            Stage(
+                "context",
+                context,
+                inputs=[
+                    "project_dir",
+                    "project_name",
+                    "snapshot",
+                    "summary",
+                    "tree",
+                    "manifest_paths",
+                ],
+                outputs=["project_context"],
+                cacheable=False,
+            ),
+            Stage(
+                "services",
+                services,
+                inputs=["project_context", "project_dir"],
+                outputs=["services"],
+            ),
+            Stage(
+                "templates",
+                templates,
+                inputs=["services", "project_dir", "tree"],
+                outputs=["rendered"],
+            ),
+            Stage(
+                "contexts",
+                contexts,
+                inputs=[
+                    "project_context",
+                    "project_name",
+                    "services",
+                    "rendered",
+                    "index_ready",
+                ],
+                outputs=["service_contexts", "repo_context"],
+            ),
+            Stage(
+                "dockerfiles",
+                dockerfiles,
+                inputs=[
+                    "services",
+                    "tree",
+                    "rendered",
+                    "service_contexts",
+                    "output_path",
+                ],
+                outputs=["dockerfile_artifacts"],
+            ),
+            # Compose goes after the Dockerfiles so requests for one template
+            # stay together and keep the shared prompt prefix warm.
+            Stage(
+                "compose",
+                compose,
+                inputs=[
+                    "project_name",
+                    "services",
+                    "summary",
+                    "tree",
+                    "repo_context",
+                    "output_path",
+                ],
+                outputs=["compose_artifact"],
+                after=["dockerfiles"],
+            ),
+            Stage(
+                "write",
+                write,
+                inputs=["output_path", "dockerfile_artifacts", "compose_artifact"],
+                outputs=["written"],
+                cacheable=False,
+            ),
+        ]
     )
-    compose_tool = ComposeTool()
-    comp_payload = {
-        "project_name": project_name,
-        "services": services,
-        "summary": summary,
-        "tree": all_file_paths,  # pass the list of file paths, not manifest dicts
-        "tree_list": json.dumps(all_file_paths, indent=2),  # pretty JSON for LLM prompt
-        "repo_code_context": repo_ctx,
-        "config": config,
-    }
-    comp_art_json = compose_tool.run(json.dumps(comp_payload))
-    artifacts.append(json.loads(comp_art_json))
-    logger.info(f"docker-compose.yml generated in {time.time() - t_compose:.1f}s")
-
-    # 6) Write all generated artifacts to the specified output folder
-    logger.info("Writing all generated artifacts to disk...")
-    t_write = time.time()
-    output_path = os.path.join(source, output_folder)
-    for art in artifacts:
-        dest = os.path.join(output_path, art["path"])
-        os.makedirs(os.path.dirname(dest), exist_ok=True)
-        with open(dest, "w", encoding="utf-8") as f:
-            f.write(art["content"])
-        logger.info("Wrote %s", dest)
-    logger.info(f"All artifacts written in {time.time() - t_write:.1f}s")
+
+
+def run_infra_pipeline(
+    source: str,
+    output_folder: str,
+    ref: Optional[str] = None,
+    stages: Optional[List[str]] = None,
+    config: Optional[dict] = None,
+    chroma_manager: Optional[ChromaManager] = None,
+    embedder: Optional[Embedder] = None,
+    retriever: Optional[Retriever] = None,
+    regenerate: bool = False,
+    use_llm: bool = False,
+) -> List[str]:
+    """
+    Generate Dockerfiles and docker-compose.yml for ``source`` and return the
+    paths written. With ``stages``, only those stages are rerun; the rest
+    reuse outputs cached by an earlier run of the same project (see
+    ``pipeline.STAGE_NAMES``). Artifacts whose inputs are unchanged since
+    the last run are kept unless ``regenerate`` is set (see
+    ``artifact_lock.py``); ``use_llm`` generates every Dockerfile with the
+    LLM instead of rendering common stacks from templates. ``config``
+    defaults to ``load_config()``; components that aren't passed in (the
+    daemon passes warm ones) are created for this run.
+    """
+    config = config or load_config()
+
+    # --- Setup core components ---
+    chroma_manager = chroma_manager or ChromaManager.from_config(config)
+    embedder = embedder or Embedder(config, chroma_manager)
+    retriever = retriever or Retriever(config, chroma_manager)
+
+    if is_git_url(source):
+        project_name = repo_name_from_url(source)
+    else:
+        project_name = Path(source).stem
+    cache = StageCache(
+        os.path.join(
+            os.path.expanduser(
+                config.get("stage_cache_dir", "~/.cache/infra-generator/stages")
+            ),
+            f"{project_name}.json",
+        )
+    )
+    graph = build_infra_graph(
+        config,
+        chroma_manager,
+        embedder,
+        retriever,
+        regenerate=regenerate,
+        use_llm=use_llm,
+    )
+    with span("generate-infra", cat="pipeline", project=project_name) as s:
+        values = graph.run(
+            {
+                "source": source,
+                "ref": ref,
+                "output_folder": output_folder,
+                "project_name": project_name,
+            },
+            only=stages,
+            cache=cache,
+            max_workers=config.get("pipeline_max_workers", 4),
+        )
     logger.info(
         "Infrastructure generation pipeline finished successfully. "
-        f"Total time: {time.time() - t0:.1f}s"
-<<<<<<< HEAD
-    )
-=======
+        f"Total time: {s.duration:.1f}s"
     )
->>>>>>> main
+    if is_git_url(source):
+        # Once per command rather than per clone; this run's checkout stays
+        clone_cache = CloneCache.from_config(config)
+        clone_cache.gc(keep=[clone_cache.key(source, ref)])
+    return values.get("written", [])
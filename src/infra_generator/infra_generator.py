@@ -3,28 +3,97 @@ import logging
 import os
 import re
 import time
+from typing import Optional
 
 from langchain_core.prompts import (
     ChatPromptTemplate,
     HumanMessagePromptTemplate,
     SystemMessagePromptTemplate,
 )
-from langchain_ollama import ChatOllama
 
 from .chroma_manager import ChromaManager
+from .llm_client import get_chat_model
+from .llm_usage import extract_usage
+from .project_context import ProjectContext, primary_manifest
+from .repo_snapshot import RepoSnapshot
 from .prompt_templates import (
     DOCKER_COMPOSE_SYSTEM_PROMPT,
     DOCKER_COMPOSE_USER_PROMPT,
     DOCKERFILE_SYSTEM_PROMPT,
     DOCKERFILE_USER_PROMPT,
+    REPAIR_SYSTEM_PROMPT,
+    REPAIR_USER_PROMPT,
 )
 from .retriever import Retriever
+from .tracing import span
+from .tree_summary import summarize_tree
+from .validation import (
+    tree_checker,
+    validate_compose,
+    validate_dockerfile,
+    validate_with_repair,
+)
 
 
 class ProjectNotEmbedded(Exception):
     pass
 
 
+def detect_services_and_versions(manifest_files: list, config: dict) -> list:
+    """
+    Ask the LLM for the language, version and service name behind each
+    manifest file. Needs no embedded project, so it can run before or
+    alongside embedding.
+    """
+    logger = logging.getLogger("infra-generator")
+    t0 = time.time()
+    logger.info(f"Received {len(manifest_files)} manifest files for service detection.")
+    services = []
+    for mf in manifest_files:
+        mf_path = mf.get("path")
+        content = mf.get("content", "")
+        llm_prompt = f"""
+        Given the following manifest file content and filename, extract:
+        - The programming language (python, node, go, etc)
+        - The main version (e.g. 3.11 for python, 20 for node, 1.22 for go)
+        - The service name (use the folder name or 'root_service' if at root)
+        Output as JSON: {{\"language\":..., \"version\":..., \"service_name\":...}}
+        Manifest filename: {mf_path}\nContent:\n{content}
+        """
+        print(f"LLM prompt for {mf_path}:\n{llm_prompt}")
+        llm = get_chat_model(config, temperature=0.0)
+        with span("detect_service", cat="llm", manifest=mf_path, model=llm.model) as s:
+            result = llm.invoke(llm_prompt).content.strip()
+        logger.info(f"LLM manifest parse for {mf_path} took {s.duration:.1f}s")
+        try:
+            parsed = json.loads(result)
+        except Exception:
+            parsed = {
+                "language": "unknown",
+                "version": None,
+                "service_name": os.path.basename(os.path.dirname(mf_path))
+                or "root_service",
+            }
+        services.append(
+            {
+                "name": parsed.get(
+                    "service_name",
+                    os.path.basename(os.path.dirname(mf_path)) or "root_service",
+                ),
+                "path": os.path.dirname(mf_path),
+                "language": parsed.get("language", "unknown"),
+                "manifest_path": mf_path,
+                "manifest_content": content,
+                "version": parsed.get("version"),
+            }
+        )
+    logger.info(
+        f"Service/manifest detection for {len(manifest_files)} manifest(s) "
+        f"took {time.time() - t0:.1f}s"
+    )
+    return services
+
+
 class InfraGenerator:
     """
     Generates infrastructure artifacts like Dockerfiles and Docker Compose files
@@ -32,20 +101,26 @@ class InfraGenerator:
     a Retrieval-Augmented Generation (RAG) system.
     """
 
-    def __init__(self, project_name: str, config: dict, chroma_manager: ChromaManager):
+    def __init__(
+        self,
+        project_name: str,
+        config: dict,
+        chroma_manager: ChromaManager,
+        project_context: Optional[ProjectContext] = None,
+    ):
         self.config = config
         self.chroma_manager = chroma_manager
         self.project_name = project_name
         self.project_dir = self._get_project_dir_from_metadata()
         self.dockerfile_path = os.path.join(self.project_dir, "Dockerfile")
         self.compose_path = os.path.join(self.project_dir, "docker-compose.yml")
+        self._project_context = project_context
 
     def _get_project_dir_from_metadata(self) -> str:
         """
         Retrieves the project directory path from the metadata stored in ChromaDB.
         """
-        projects = self.chroma_manager.get_all_projects()
-        if self.project_name not in projects:
+        if not self.chroma_manager.has_project(self.project_name):
             raise ProjectNotEmbedded(
                 f"Project '{self.project_name}' is not embedded. "
                 "Please embed it first."
@@ -55,61 +130,40 @@ class InfraGenerator:
         return md.get("project_dir")
 
     def _detect_services_and_versions(self, manifest_files: list) -> list:
-        logger = logging.getLogger("infra-generator")
-        t0 = time.time()
-        logger.info(
-            f"Received {len(manifest_files)} manifest files for service detection."
-        )
-        services = []
-        for mf in manifest_files:
-            mf_path = mf.get("path")
-            content = mf.get("content", "")
-            llm_prompt = f"""
-            Given the following manifest file content and filename, extract:
-            - The programming language (python, node, go, etc)
-            - The main version (e.g. 3.11 for python, 20 for node, 1.22 for go)
-            - The service name (use the folder name or 'root_service' if at root)
-            Output as JSON: {{\"language\":..., \"version\":..., \"service_name\":...}}
-            Manifest filename: {mf_path}\nContent:\n{content}
-            """
-            print(f"LLM prompt for {mf_path}:\n{llm_prompt}")
-            llm = ChatOllama(
-                base_url=self.config["ollama_base_url"],
-                model=self.config["models"]["qna_model"],
-                temperature=0.0,
-            )
-            t_llm = time.time()
-            result = llm.invoke(llm_prompt).content.strip()
-            logger.info(
-                f"LLM manifest parse for {mf_path} took {time.time() - t_llm:.1f}s"
+        return detect_services_and_versions(manifest_files, self.config)
+
+    def get_project_context(
+        self, retriever: Retriever, summary: str = None, tree: list = None
+    ) -> ProjectContext:
+        """
+        Return the run-scoped ProjectContext, creating it on first use. All
+        artifacts generated through this instance share the same context.
+
+        The prompts here describe a single service, so only the manifest
+        nearest the project root is sent for (LLM) service detection, not
+        every manifest in the tree.
+        """
+        if self._project_context is None:
+            snapshot = None
+            if tree is None and self.project_dir and os.path.isdir(self.project_dir):
+                snapshot = RepoSnapshot.build(
+                    self.project_dir, self.config.get("exclude_patterns", [])
+                )
+            manifest = primary_manifest(
+                snapshot.paths() if snapshot is not None else tree or []
             )
-            try:
-                parsed = json.loads(result)
-            except Exception:
-                parsed = {
-                    "language": "unknown",
-                    "version": None,
-                    "service_name": os.path.basename(os.path.dirname(mf_path))
-                    or "root_service",
-                }
-            services.append(
-                {
-                    "name": parsed.get(
-                        "service_name",
-                        os.path.basename(os.path.dirname(mf_path)) or "root_service",
-                    ),
-                    "path": os.path.dirname(mf_path),
-                    "language": parsed.get("language", "unknown"),
-                    "manifest_path": mf_path,
-                    "manifest_content": content,
-                    "version": parsed.get("version"),
-                }
+            self._project_context = ProjectContext(
+                self.project_name,
+                self.project_dir,
+                retriever=retriever,
+                summary=summary
+                or (snapshot.summary(self.project_name) if snapshot else ""),
+                tree=tree,
+                manifest_paths=[manifest] if manifest else [],
+                service_detector=self._detect_services_and_versions,
+                snapshot=snapshot,
             )
-        logger.info(
-            f"Service/manifest detection for {len(manifest_files)} manifest(s) "
-            f"took {time.time() - t0:.1f}s"
-        )
-        return services
+        return self._project_context
 
     def _gather_context_for_prompt(
         self,
@@ -120,50 +174,34 @@ class InfraGenerator:
     ) -> dict:
         logger = logging.getLogger("infra-generator")
         t0 = time.time()
+        project_context = self.get_project_context(retriever, summary, tree)
         context = {
             "project_name": self.project_name,
             "manifest_content": "",
-            "entrypoint_content": "",
+            "entrypoint_content": project_context.entrypoint_content,
             "other_relevant_snippets": "",
             "detected_language_version": None,
             "language_guess": "unknown",
-            "summary": summary or "",
-            "tree": "\n".join(tree) if tree else "",
-            "tree_list": json.dumps(tree, indent=2) if tree else "[]",
+            "summary": project_context.summary,
         }
-        services = self._detect_services_and_versions(tree or [])
+        services = project_context.services
+        context["tree"] = summarize_tree(
+            project_context.tree,
+            max_tokens=self.config.get("tree_token_budget", 2000),
+            focus=services[0]["path"] if services else None,
+        )
         if services:
             svc = services[0]
             context["manifest_content"] = svc["manifest_content"]
             context["detected_language_version"] = svc["version"]
             context["language_guess"] = svc["language"]
-        entry_candidates = [
-            f
-            for f in (tree or [])
-            if any(
-                x in f
-                for x in ["app.py", "main.py", "server.js", "index.js", "main.go"]
-            )
-        ]
-        if entry_candidates:
-            entry_path = os.path.join(self.project_dir, entry_candidates[0])
-            try:
-                with open(entry_path, "r", encoding="utf-8") as f:
-                    context["entrypoint_content"] = f.read()
-            except Exception:
-                pass
         service_query = (
             "database connection string or redis client or postgres setup or "
             "mongo configuration or environment variables"
         )
-        t_retrieve = time.time()
-        service_results = retriever.retrieve_chunks(
+        service_results = project_context.retrieve_chunks(
             service_query, k=10, project=self.project_name
         )
-        logger.info(
-            f"Retriever query for additional code snippets took "
-            f"{time.time() - t_retrieve:.1f}s"
-        )
         snippets = []
         current_len = 0
         if service_results.get(self.project_name):
@@ -180,15 +218,18 @@ class InfraGenerator:
         return context
 
     def _invoke_llm(
-        self, system_prompt_template: str, user_prompt_template: str, context: dict
+        self,
+        system_prompt_template: str,
+        user_prompt_template: str,
+        context: dict,
+        template: str,
     ) -> str:
+        """
+        Run one prompt. ``template`` names it ("dockerfile", "compose", ...)
+        in traces and usage stats, as the generation tools do.
+        """
         logger = logging.getLogger("infra-generator")
-        t0 = time.time()
-        llm = ChatOllama(
-            base_url=self.config["ollama_base_url"],
-            model=self.config["models"]["qna_model"],
-            temperature=0.05,
-        )
+        llm = get_chat_model(self.config, temperature=0.05)
         chat_prompt_template = ChatPromptTemplate.from_messages(
             [
                 SystemMessagePromptTemplate.from_template(system_prompt_template),
@@ -196,24 +237,26 @@ class InfraGenerator:
             ]
         )
         chain = chat_prompt_template | llm
-        response = chain.invoke(context)
+        with span(template, cat="llm", model=llm.model) as s:
+            response = chain.invoke(context)
+            usage = extract_usage(response, template=template)
+            s.set(**{k: v for k, v in usage.items() if k != "template"})
         content = response.content.strip()
         if content.startswith("```") and content.endswith("```"):
             content = re.sub(r"^```[a-zA-Z]*\n", "", content, 1)
             content = re.sub(r"\n```$", "", content)
         logger.info(
-            f"LLM invocation for prompt '{system_prompt_template[:30]}...' "
-            f"took {time.time() - t0:.1f}s"
+            f"LLM invocation for the '{template}' prompt took {s.duration:.1f}s"
         )
         return content
 
     def _write_file(self, path: str, content: str) -> None:
         logger = logging.getLogger("infra-generator")
-        t0 = time.time()
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            f.write(content)
-        logger.info(f"Wrote file {path} in {time.time() - t0:.1f}s")
+        with span("write_file", cat="io", path=path, bytes=len(content)) as s:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(content)
+        logger.info(f"Wrote file {path} in {s.duration:.1f}s")
 
     def _get_latest_docker_image_tag(
         self, image_name: str, version: str | None = None
@@ -253,6 +296,24 @@ class InfraGenerator:
         content = "\n".join([line for line in content.splitlines() if line.strip()])
         return content
 
+    def _repair(self, artifact_name: str, template: str):
+        """A ``validate_with_repair`` callback that asks the LLM for a fix."""
+
+        def repair(content: str, problems: list) -> str:
+            fixed = self._invoke_llm(
+                REPAIR_SYSTEM_PROMPT,
+                REPAIR_USER_PROMPT,
+                {
+                    "artifact_name": artifact_name,
+                    "content": content,
+                    "problems": "\n".join(f"- {p}" for p in problems),
+                },
+                template=f"{template}_repair",
+            )
+            return self._clean_docker_output(fixed)
+
+        return repair
+
     def generate_dockerfile(
         self, retriever: Retriever, summary: str = None, tree: list = None
     ) -> None:
@@ -264,9 +325,22 @@ class InfraGenerator:
         )
         context["latest_base_image_tag"] = latest_base_image_tag
         dockerfile_content = self._invoke_llm(
-            DOCKERFILE_SYSTEM_PROMPT, DOCKERFILE_USER_PROMPT, context
+            DOCKERFILE_SYSTEM_PROMPT,
+            DOCKERFILE_USER_PROMPT,
+            context,
+            template="dockerfile",
         )
         dockerfile_content = self._clean_docker_output(dockerfile_content)
+        exists = tree_checker(
+            self._project_context.tree, self.config.get("exclude_patterns", [])
+        )
+        dockerfile_content, _, _ = validate_with_repair(
+            dockerfile_content,
+            lambda content: validate_dockerfile(content, exists=exists),
+            self._repair("Dockerfile", "dockerfile"),
+            attempts=self.config.get("repair_attempts", 2),
+            name="Dockerfile",
+        )
         self._write_file(self.dockerfile_path, dockerfile_content)
 
     def generate_docker_compose(
@@ -278,9 +352,19 @@ class InfraGenerator:
         context["postgres_image_tag"] = self._get_latest_docker_image_tag("postgres")
         context["redis_image_tag"] = self._get_latest_docker_image_tag("redis")
         compose_content = self._invoke_llm(
-            DOCKER_COMPOSE_SYSTEM_PROMPT, DOCKER_COMPOSE_USER_PROMPT, context
+            DOCKER_COMPOSE_SYSTEM_PROMPT,
+            DOCKER_COMPOSE_USER_PROMPT,
+            context,
+            template="compose",
         )
         compose_content = self._clean_docker_output(compose_content)
+        compose_content, _, _ = validate_with_repair(
+            compose_content,
+            validate_compose,
+            self._repair("docker-compose.yml", "compose"),
+            attempts=self.config.get("repair_attempts", 2),
+            name="docker-compose.yml",
+        )
         self._write_file(self.compose_path, compose_content)
 
     def generate_generic_infrastructure(
@@ -317,8 +401,6 @@ class InfraGenerator:
         ---
         Based on the user's request and the provided application context, generate the required IaC.
         """
-<<<<<<< HEAD
-        return self._invoke_llm(generic_system_prompt, generic_user_template, context)
-=======
-        return self._invoke_llm(generic_system_prompt, generic_user_template, context)
->>>>>>> main
+        return self._invoke_llm(
+            generic_system_prompt, generic_user_template, context, template="generic"
+        )
@@ -0,0 +1,28 @@
+from functools import lru_cache
+
+
+@lru_cache(maxsize=16)
+def _chat_model(base_url: str, model: str, temperature: float, keep_alive: str):
+    from langchain_ollama import ChatOllama
+
+    return ChatOllama(
+        base_url=base_url,
+        model=model,
+        temperature=temperature,
+        # Keep the model (and its prompt cache) loaded between requests
+        keep_alive=keep_alive,
+    )
+
+
+def get_chat_model(config: dict, temperature: float):
+    """
+    A shared ChatOllama client for the configured generation model. Clients
+    are reused across calls (and across requests in the daemon), so their
+    HTTP connections stay open.
+    """
+    return _chat_model(
+        config["ollama_base_url"],
+        config["models"]["qna_model"],
+        temperature,
+        config.get("ollama_keep_alive", "30m"),
+    )
@@ -0,0 +1,55 @@
+import logging
+from typing import Any, Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Ollama timing/counter fields surfaced by langchain_ollama in response_metadata.
+# Durations are in nanoseconds. prompt_eval_count only counts prompt tokens
+# that were actually evaluated, so it drops when a cached prefix is reused.
+USAGE_FIELDS = (
+    "prompt_eval_count",
+    "prompt_eval_duration",
+    "eval_count",
+    "eval_duration",
+    "load_duration",
+    "total_duration",
+)
+
+
+def extract_usage(response: Any, template: str) -> Dict[str, Any]:
+    """Pull Ollama's prompt/eval counters out of a LangChain chat response."""
+    metadata = getattr(response, "response_metadata", None) or {}
+    usage: Dict[str, Any] = {"template": template}
+    for field in USAGE_FIELDS:
+        if metadata.get(field) is not None:
+            usage[field] = metadata[field]
+    logger.info(
+        f"LLM usage [{template}]: prompt_eval_count="
+        f"{usage.get('prompt_eval_count')} prompt_eval_duration="
+        f"{usage.get('prompt_eval_duration', 0) / 1e9:.2f}s"
+    )
+    return usage
+
+
+def summarize_usage(records: List[Dict[str, Any]]) -> List[str]:
+    """
+    Summarize usage records per template, in call order. A first call that
+    evaluates far more prompt tokens than the calls after it means the shared
+    prefix was served from Ollama's KV cache.
+    """
+    by_template: Dict[str, List[Dict[str, Any]]] = {}
+    for record in records:
+        by_template.setdefault(record.get("template", "unknown"), []).append(record)
+    lines = []
+    for template, calls in by_template.items():
+        counts = [c.get("prompt_eval_count") or 0 for c in calls]
+        seconds = sum(c.get("prompt_eval_duration") or 0 for c in calls) / 1e9
+        line = (
+            f"{template}: {len(calls)} call(s), prompt tokens evaluated "
+            f"{counts}, prompt eval {seconds:.1f}s"
+        )
+        if len(counts) > 1 and counts[0]:
+            later = sum(counts[1:]) / (len(counts) - 1)
+            line += f", later calls evaluated {later / counts[0]:.0%} of the first"
+        lines.append(line)
+    return lines
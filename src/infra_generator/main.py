@@ -1,17 +1,18 @@
 import argparse
 import logging
+import os
 import sys
 import time
 
-from .chroma_manager import ChromaManager
-from .embedder import Embedder
-from .infra_agent import run_infra_pipeline
-from .infra_generator import InfraGenerator, ProjectNotEmbedded
-from .query_handler import QueryHandler
-from .retriever import Retriever
-from .setup_ollama import OllamaSetup
+# Only light modules are imported at load time. chromadb, langchain and the
+# agent stack take seconds to import, so each command imports what it uses.
+from .pipeline import STAGE_NAMES
+from .tracing import TRACER, span
 from .utils import load_config
 
+# Commands that never call the models and need no Ollama server.
+OFFLINE_COMMANDS = {None, "list"}
+
 
 def main():
     logging.basicConfig(
@@ -22,17 +23,43 @@ def main():
     # 3) CLI
     parser = argparse.ArgumentParser(description="Local Codebase Assistant CLI")
     parser.add_argument("--config", help="Path to a custom config.yaml file")
+    parser.add_argument(
+        "--trace",
+        metavar="OUT_JSON",
+        help="Write a Chrome/Perfetto trace of the run to this file",
+    )
+    parser.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Run in this process even if an `infra-gen serve` daemon is running",
+    )
     subparsers = parser.add_subparsers(dest="command")
 
     # Embed
     parser_embed = subparsers.add_parser("embed", help="Embed a project")
     parser_embed.add_argument("project_dir", help="Path to project directory")
     parser_embed.add_argument("--name", help="Optional project name")
+    parser_embed.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-embed every file instead of only those git reports as changed",
+    )
+    parser_embed.add_argument(
+        "--service",
+        action="append",
+        help="With index_sharding enabled, rebuild only this service's shard "
+        "(its directory; repeatable)",
+    )
 
     # Ask (RAG-based)
     parser_ask = subparsers.add_parser("ask", help="Ask a question about a codebase")
     parser_ask.add_argument("question", nargs="+", help="Question to ask")
     parser_ask.add_argument("--project", help="Project name")
+    parser_ask.add_argument(
+        "--service",
+        action="append",
+        help="Search only this service's shard of a sharded project (repeatable)",
+    )
 
     # List
     subparsers.add_parser("list", help="List embedded projects")
@@ -53,29 +80,238 @@ def main():
     )
     parser_infra.add_argument("source", help="Path or Git URL of the project")
     parser_infra.add_argument("-o", "--output", default="infra", help="Output folder")
+    parser_infra.add_argument(
+        "--ref", help="Branch, tag or commit to check out when source is a Git URL"
+    )
+    parser_infra.add_argument(
+        "--stages",
+        help=(
+            "Comma-separated stages to rerun, reusing cached outputs for the "
+            f"rest ({', '.join(STAGE_NAMES)})"
+        ),
+    )
+    parser_infra.add_argument(
+        "--regenerate",
+        action="store_true",
+        help="Regenerate every artifact, even those infra.lock.json shows unchanged",
+    )
+    parser_infra.add_argument(
+        "--llm",
+        action="store_true",
+        help="Generate every Dockerfile with the LLM, even for stacks with a template",
+    )
+
+    parser_proj = subparsers.add_parser(
+        "projection-report",
+        help="Measure recall@k of reduced embedding dimensions for a project",
+    )
+    parser_proj.add_argument("--project", required=True, help="Project name")
+    parser_proj.add_argument(
+        "--dims", default="64,128,256,512", help="Comma-separated dimensions"
+    )
+    parser_proj.add_argument(
+        "--method", choices=["pca", "truncate"], default="pca", help="Projection"
+    )
+    parser_proj.add_argument("--k", type=int, default=10, help="Neighbours compared")
+    parser_proj.add_argument(
+        "--sample", type=int, default=1000, help="Chunks re-embedded for the report"
+    )
+
+    parser_eval = subparsers.add_parser(
+        "eval",
+        help="Score retrieval on a labeled query set for chunking/HNSW settings",
+    )
+    parser_eval.add_argument("project_dir", help="Path to project directory")
+    parser_eval.add_argument(
+        "--queries", required=True, help="YAML/JSON list of {query, relevant}"
+    )
+    parser_eval.add_argument("--k", type=int, default=5, help="Results per query")
+    for flag, help_text in [
+        ("--chunk-size", "chunk sizes in characters"),
+        ("--chunk-overlap", "chunk overlaps in characters"),
+        ("--hnsw-m", "HNSW M values"),
+        ("--construction-ef", "HNSW construction_ef values"),
+        ("--search-ef", "HNSW search_ef values"),
+    ]:
+        parser_eval.add_argument(
+            flag, help=f"Comma-separated {help_text} (default: from config)"
+        )
+    parser_eval.add_argument("--out", help="Also write the results as JSON here")
+
+    parser_batch = subparsers.add_parser(
+        "generate-infra-batch",
+        help="Generate infra for every repo in a manifest, overlapping discovery, "
+        "embedding and generation across repos",
+    )
+    parser_batch.add_argument(
+        "manifest",
+        help="YAML/JSON list of sources (or {source, ref, output, name}), "
+        "or a text file with one source per line",
+    )
+    parser_batch.add_argument(
+        "-o", "--output", default="infra", help="Default output folder"
+    )
+    parser_batch.add_argument(
+        "--report",
+        default="batch_report.json",
+        help="Per-repo status and timing report (JSON)",
+    )
+    parser_batch.add_argument(
+        "--llm-workers", type=int, help="Repos generating concurrently"
+    )
+
+    # Daemon
+    parser_serve = subparsers.add_parser(
+        "serve",
+        help="Run a daemon that keeps models and indexes warm; other commands "
+        "forward to it while it runs",
+    )
+    parser_serve.add_argument("--port", type=int, default=0, help="Local port")
 
     args = parser.parse_args()
 
-    # 1) Ensure Ollama is running
-    logger.info("Checking Ollama setup...")
-    OllamaSetup().setup()
-    logger.info("Ollama is ready.")
-    # 2) Core components
-    logger.info("Loading config and initializing core components...")
+    logger.info("Loading config...")
     config = load_config(args.config)
-    chroma_manager = ChromaManager(config["chroma_db_dir"])
-    embedder = Embedder(config, chroma_manager)
-    retriever = Retriever(config, chroma_manager)
-    query_handler = QueryHandler(config, retriever)
+    if not args.no_daemon and not args.trace:
+        _forward_to_daemon(args, config, logger)
+    # Ensure Ollama is running with the configured models; a recent
+    # successful check is reused from a stamp file.
+    if args.command not in OFFLINE_COMMANDS:
+        from .setup_ollama import OllamaSetup
+
+        logger.info("Checking Ollama setup...")
+        OllamaSetup.from_config(config).setup()
+        logger.info("Ollama is ready.")
+
+    try:
+        with span(args.command or "help", cat="command"):
+            _run_command(args, parser, config, logger)
+    finally:
+        if TRACER.spans:
+            logger.info("Trace summary:")
+            for line in TRACER.summary():
+                logger.info(line)
+        if args.trace:
+            TRACER.write_chrome_trace(args.trace)
+            logger.info(f"Trace written to {args.trace}")
+
+
+def _forward_to_daemon(args, config, logger):
+    """Hand the command to a running daemon and exit with its status."""
+    from .clone_cache import is_git_url
+    from .server import FORWARDED_COMMANDS, find_daemon
+
+    if args.command not in FORWARDED_COMMANDS:
+        return
+    client = find_daemon(config, args.config)
+    if client is None:
+        return
+    payload = {
+        k: v
+        for k, v in vars(args).items()
+        if k not in ("config", "trace", "no_daemon", "command")
+    }
+    # The daemon has its own working directory.
+    if payload.get("project_dir"):
+        payload["project_dir"] = os.path.abspath(payload["project_dir"])
+    if payload.get("source") and os.path.exists(payload["source"]):
+        payload["source"] = os.path.abspath(payload["source"])
+    # Output for a Git URL is relative to the caller, not to the source
+    if payload.get("output") and is_git_url(payload.get("source") or ""):
+        payload["output"] = os.path.abspath(payload["output"])
+    logger.info(f"Forwarding '{args.command}' to the infra-gen daemon")
+    response = client.run(args.command, payload)
+    for line in response.get("lines", []):
+        print(line)
+    if not response.get("ok"):
+        print(f"Error: {response.get('error')}", file=sys.stderr)
+        sys.exit(response.get("exit_code", 1))
+    sys.exit(0)
+
+
+def _run_command(args, parser, config, logger):
+    if args.command == "serve":
+        from .server import serve
+
+        serve(config, args.config, port=args.port)
+        return
+
+    if args.command == "list":
+        from .chroma_manager import list_collection_names
+
+        logger.info("Listing all embedded projects...")
+        for p in list_collection_names(config["chroma_db_dir"]):
+            print(p)
+        return
+
+    if args.command == "generate-infra":
+        from .infra_agent import run_infra_pipeline
+
+        logger.info(
+            f"Starting full infra generation for source: {args.source} "
+            f"(output={args.output})"
+        )
+        t0 = time.time()
+        try:
+            stages = args.stages.split(",") if args.stages else None
+            run_infra_pipeline(
+                args.source,
+                args.output,
+                ref=args.ref,
+                stages=stages,
+                config=config,
+                regenerate=args.regenerate,
+                use_llm=args.llm,
+            )
+            logger.info(f"Full infra generation completed in {time.time() - t0:.1f}s")
+        except Exception as e:
+            print(f"Error: {e}", file=sys.stderr)
+            logger.error(f"Infra generation failed: {e}")
+            sys.exit(2)
+        return
+
+    if args.command == "generate-infra-batch":
+        from .batch import BatchRunner, format_report, load_batch_manifest, write_report
+
+        entries = load_batch_manifest(args.manifest, args.output)
+        logger.info(f"Starting batch infra generation for {len(entries)} source(s)")
+        records = BatchRunner(config, llm_workers=args.llm_workers).run(entries)
+        write_report(records, args.report)
+        for line in format_report(records):
+            print(line)
+        logger.info(f"Batch report written to {args.report}")
+        if any(r["status"] != "ok" for r in records):
+            sys.exit(2)
+        return
+
+    if args.command == "eval":
+        _run_eval(args, config, logger)
+        return
+
+    if args.command is None:
+        parser.print_help()
+        return
+
+    from .chroma_manager import ChromaManager
+
+    chroma_manager = ChromaManager.from_config(config)
     logger.info("Core components initialized.")
 
     if args.command == "embed":
+        from .embedder import Embedder
+
         logger.info(f"Embedding project: {args.project_dir} (name={args.name})")
         t0 = time.time()
-        embedder.embed_project(args.project_dir, args.name)
+        embedder = Embedder(config, chroma_manager)
+        embedder.embed_project(
+            args.project_dir, args.name, full=args.full, services=args.service
+        )
         logger.info(f"Embedding complete. Time taken: {time.time() - t0:.1f}s")
 
     elif args.command == "ask":
+        from .query_handler import QueryHandler
+        from .retriever import Retriever
+
         projects = chroma_manager.get_all_projects()
         proj = args.project or (projects[0] if len(projects) == 1 else None)
         if not proj or proj not in projects:
@@ -83,64 +319,89 @@ def main():
             sys.exit(1)
         logger.info(f"Answering question for project: {proj}")
         t0 = time.time()
-        answer = query_handler.ask(" ".join(args.question), project=proj)
+        query_handler = QueryHandler(config, Retriever(config, chroma_manager))
+        answer = query_handler.ask(
+            " ".join(args.question), project=proj, services=args.service
+        )
         logger.info(f"Answer generated in {time.time() - t0:.1f}s")
         print(answer)
 
-    elif args.command == "list":
-        logger.info("Listing all embedded projects...")
-        for p in chroma_manager.get_all_projects():
-            print(p)
+    elif args.command == "projection-report":
+        from .embedder import Embedder
+        from .projection import project_recall_report
 
-    elif args.command == "generate-docker":
-        projects = chroma_manager.get_all_projects()
-        if args.project not in projects:
-            print("Available:", projects)
+        if not chroma_manager.has_project(args.project):
+            print("Available:", chroma_manager.get_all_projects())
             sys.exit(1)
-        try:
-            logger.info(f"Generating Dockerfile for project: {args.project}")
-            t0 = time.time()
-            infra = InfraGenerator(args.project, config, chroma_manager)
-            infra.generate_dockerfile(retriever)
-            logger.info(f"Dockerfile generated in {time.time() - t0:.1f}s")
-        except ProjectNotEmbedded as e:
-            print(e)
+        rows = project_recall_report(
+            chroma_manager,
+            Embedder(config, chroma_manager),
+            args.project,
+            [int(d) for d in args.dims.split(",")],
+            k=args.k,
+            sample=args.sample,
+            method=args.method,
+        )
+        print(f"{'dim':>6}  {'recall@' + str(args.k):>10}  {'size':>6}")
+        for row in rows:
+            print(
+                f"{row['dim']:>6}  {row['recall_at_k']:>10.3f}  "
+                f"{row['size_ratio']:>6.0%}"
+            )
+
+    elif args.command in ("generate-docker", "generate-compose"):
+        from .infra_generator import InfraGenerator, ProjectNotEmbedded
+        from .retriever import Retriever
 
-    elif args.command == "generate-compose":
         projects = chroma_manager.get_all_projects()
         if args.project not in projects:
             print("Available:", projects)
             sys.exit(1)
+        retriever = Retriever(config, chroma_manager)
         try:
-            logger.info(f"Generating docker-compose.yml for project: {args.project}")
-            t0 = time.time()
             infra = InfraGenerator(args.project, config, chroma_manager)
-            infra.generate_docker_compose(retriever)
-            logger.info(f"docker-compose.yml generated in {time.time() - t0:.1f}s")
+            t0 = time.time()
+            if args.command == "generate-docker":
+                logger.info(f"Generating Dockerfile for project: {args.project}")
+                infra.generate_dockerfile(retriever)
+                logger.info(f"Dockerfile generated in {time.time() - t0:.1f}s")
+            else:
+                logger.info(
+                    f"Generating docker-compose.yml for project: {args.project}"
+                )
+                infra.generate_docker_compose(retriever)
+                logger.info(f"docker-compose.yml generated in {time.time() - t0:.1f}s")
         except ProjectNotEmbedded as e:
             print(e)
 
-    elif args.command == "generate-infra":
-        logger.info(
-            f"Starting full infra generation for source: {args.source} "
-            f"(output={args.output})"
-        )
-        t0 = time.time()
-        try:
-            run_infra_pipeline(args.source, args.output)
-            logger.info(f"Full infra generation completed in {time.time() - t0:.1f}s")
-        except Exception as e:
-            print(f"Error: {e}", file=sys.stderr)
-            logger.error(f"Infra generation failed: {e}")
-            sys.exit(2)
 
-    else:
-        parser.print_help()
+def _run_eval(args, config, logger):
+    import json
+
+    from .embedder import chunking_settings
+    from .evaluation import evaluate, format_results, load_query_set, parameter_grid
+
+    def values(arg, default):
+        return [int(v) for v in arg.split(",")] if arg else [default]
+
+    chunking = chunking_settings(config)
+    hnsw = config.get("hnsw") or {}
+    grid = parameter_grid(
+        values(args.chunk_size, chunking["code_chunk_size"]),
+        values(args.chunk_overlap, chunking["code_chunk_overlap"]),
+        values(args.hnsw_m, hnsw.get("M", 16)),
+        values(args.construction_ef, hnsw.get("construction_ef", 100)),
+        values(args.search_ef, hnsw.get("search_ef", 100)),
+    )
+    queries = load_query_set(args.queries)
+    logger.info(f"Evaluating {len(grid)} setting(s) on {len(queries)} queries")
+    rows = evaluate(config, args.project_dir, queries, grid, k=args.k)
+    for line in format_results(rows):
+        print(line)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
 
 
 if __name__ == "__main__":
-<<<<<<< HEAD
-    main()
-=======
     main()
->>>>>>> main
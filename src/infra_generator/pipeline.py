@@ -0,0 +1,203 @@
+import json
+import logging
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from .tracing import Span, current_span, span
+
+logger = logging.getLogger(__name__)
+
+# Stages of the generate-infra graph (infra_agent.build_infra_graph), kept here
+# so the CLI can list them without importing the agent stack.
+STAGE_NAMES = [
+    "checkout",
+    "snapshot",
+    "embed",
+    "ingest",
+    "context",
+    "services",
+    "templates",
+    "contexts",
+    "dockerfiles",
+    "compose",
+    "write",
+]
+
+
+class Stage:
+    """
+    One step of a pipeline. ``func`` is called with the declared ``inputs`` as
+    keyword arguments and must return a dict containing every name in
+    ``outputs``. ``after`` lists stages that must finish first without
+    passing data (used to keep LLM requests of one template together).
+    Outputs of ``cacheable`` stages must be JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[..., Dict[str, Any]],
+        inputs: Iterable[str] = (),
+        outputs: Iterable[str] = (),
+        after: Iterable[str] = (),
+        cacheable: bool = True,
+    ):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.after = tuple(after)
+        self.cacheable = cacheable
+
+
+class StageCache:
+    """Stage outputs persisted as JSON between runs, one file per project."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._data: Dict[str, Any] = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    self._data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable stage cache {self.path}: {e}")
+
+    def load(self, stage: Stage) -> Optional[Dict[str, Any]]:
+        entry = self._data.get(stage.name)
+        if not entry or not all(o in entry["outputs"] for o in stage.outputs):
+            return None
+        return entry["outputs"]
+
+    def save(self, stage: Stage, outputs: Dict[str, Any]) -> None:
+        self._data[stage.name] = {
+            "outputs": {o: outputs[o] for o in stage.outputs},
+            "updated": time.time(),
+        }
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._data, f)
+        os.replace(tmp, self.path)
+
+
+class StageGraph:
+    """
+    A small DAG of stages wired together by the names of their inputs and
+    outputs. Stages whose inputs are available run concurrently on a thread
+    pool.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.stages = {s.name: s for s in stages}
+        self.producers: Dict[str, str] = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in self.producers:
+                    raise ValueError(
+                        f"'{output}' is produced by both '{self.producers[output]}' "
+                        f"and '{stage.name}'"
+                    )
+                self.producers[output] = stage.name
+
+    def _required(
+        self, targets: Set[str], available: Set[str], skipped: Set[str]
+    ) -> Set[str]:
+        """Targets plus every stage that produces an input nobody else has."""
+        needed: Set[str] = set()
+        todo = list(targets)
+        while todo:
+            name = todo.pop()
+            if name in needed:
+                continue
+            needed.add(name)
+            for value in self.stages[name].inputs:
+                producer = self.producers.get(value)
+                if value in available or producer is None:
+                    continue
+                if producer in skipped:
+                    continue
+                todo.append(producer)
+        return needed
+
+    @staticmethod
+    def _run_stage(stage: Stage, parent: Optional[Span], kwargs: dict) -> tuple:
+        with span(stage.name, cat="stage", parent=parent) as stage_span:
+            outputs = stage.func(**kwargs)
+        return outputs, stage_span.duration
+
+    def run(
+        self,
+        values: Dict[str, Any],
+        only: Optional[Iterable[str]] = None,
+        cache: Optional[StageCache] = None,
+        max_workers: int = 4,
+    ) -> Dict[str, Any]:
+        """
+        Run the graph starting from ``values`` and return all values. With
+        ``only``, just those stages are rerun: other cacheable stages take
+        their outputs from ``cache``, and any stage whose outputs are still
+        missing runs as well.
+        """
+        values = dict(values)
+        if only is None:
+            targets = set(self.stages)
+        else:
+            targets = set(only)
+            unknown = targets - set(self.stages)
+            if unknown:
+                raise ValueError(
+                    f"Unknown stage(s): {', '.join(sorted(unknown))}. "
+                    f"Available: {', '.join(self.stages)}"
+                )
+            for name, stage in self.stages.items():
+                if name in targets or not stage.cacheable or cache is None:
+                    continue
+                cached = cache.load(stage)
+                if cached is not None:
+                    logger.info(f"Stage '{name}': using cached outputs")
+                    values.update(cached)
+        loaded = {
+            name
+            for name, stage in self.stages.items()
+            if name not in targets
+            and stage.outputs
+            and all(o in values for o in stage.outputs)
+        }
+        pending = self._required(targets, set(values), loaded) - loaded
+
+        parent = current_span()
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            running = {}
+            while pending or running:
+                active = pending | set(running.values())
+                for name in sorted(pending):
+                    stage = self.stages[name]
+                    blocked = [a for a in stage.after if a in active]
+                    missing = [i for i in stage.inputs if i not in values]
+                    if blocked or missing:
+                        continue
+                    logger.info(f"Stage '{name}' started")
+                    kwargs = {i: values[i] for i in stage.inputs}
+                    future = pool.submit(self._run_stage, stage, parent, kwargs)
+                    running[future] = name
+                    pending.discard(name)
+                if not running:
+                    raise RuntimeError(
+                        f"Stages {sorted(pending)} cannot run: missing inputs"
+                    )
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    outputs, duration = future.result()
+                    missing = [o for o in stage.outputs if o not in outputs]
+                    if missing:
+                        raise RuntimeError(f"Stage '{name}' did not return {missing}")
+                    values.update(outputs)
+                    if stage.cacheable and cache is not None:
+                        cache.save(stage, outputs)
+                    logger.info(f"Stage '{name}' finished in {duration:.1f}s")
+        return values
@@ -0,0 +1,165 @@
+import logging
+import os
+import time
+from functools import cached_property
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from .repo_snapshot import RepoSnapshot
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAMES = [
+    "package.json",
+    "requirements.txt",
+    "pyproject.toml",
+    "Pipfile",
+    "environment.yml",
+    "setup.py",
+    "poetry.lock",
+    "yarn.lock",
+    "Dockerfile",
+    "go.mod",
+    "go.sum",
+    "Gemfile",
+    "composer.json",
+    "Cargo.toml",
+    "Cargo.lock",
+    "build.gradle",
+    "pom.xml",
+]
+
+ENTRYPOINT_FILENAMES = ["app.py", "main.py", "server.js", "index.js", "main.go"]
+
+
+def primary_manifest(paths: Iterable[str]) -> Optional[str]:
+    """
+    The manifest closest to the root of ``paths`` (ties go to the earlier
+    name in ``MANIFEST_FILENAMES``), or None if there is none.
+    """
+    manifests = [p for p in paths if os.path.basename(p) in MANIFEST_FILENAMES]
+    if not manifests:
+        return None
+    return min(
+        manifests,
+        key=lambda p: (
+            p.count("/"),
+            MANIFEST_FILENAMES.index(os.path.basename(p)),
+            p,
+        ),
+    )
+
+
+class ProjectContext:
+    """
+    Run-scoped view of a project shared by every artifact generator in a run.
+
+    Each piece of context (file tree, manifests, detected services, entrypoint
+    content, retrieval results) is computed on first use and memoized, so
+    generating a Dockerfile and then a compose file from the same context
+    pays for service detection and vector queries only once.
+
+    When a RepoSnapshot is given, the tree, manifests and entrypoint are read
+    through it rather than from disk again.
+
+    The object also exposes ``retrieve_chunks`` with the same signature as
+    ``Retriever.retrieve_chunks``, so it can be handed to ``QueryHandler`` or
+    ``InfraGenerator`` wherever a retriever is expected.
+    """
+
+    def __init__(
+        self,
+        project_name: str,
+        project_dir: str,
+        retriever=None,
+        summary: str = "",
+        tree: Optional[List[str]] = None,
+        manifest_paths: Optional[List[str]] = None,
+        service_detector: Optional[Callable[[list], list]] = None,
+        snapshot: Optional[RepoSnapshot] = None,
+    ):
+        self.project_name = project_name
+        self.project_dir = project_dir
+        self.retriever = retriever
+        self.summary = summary or ""
+        self._tree = tree
+        self._manifest_paths = manifest_paths
+        self._service_detector = service_detector
+        self.snapshot = snapshot
+        self._retrievals: Dict[tuple, Dict[str, List[Dict[str, Any]]]] = {}
+
+    @cached_property
+    def tree(self) -> List[str]:
+        if self._tree is None and self.snapshot is not None:
+            return self.snapshot.paths()
+        return list(self._tree or [])
+
+    @cached_property
+    def manifests(self) -> List[Dict[str, str]]:
+        """Manifest files found in the tree, as ``{"path", "content"}`` dicts."""
+        if self._manifest_paths is not None:
+            paths = self._manifest_paths
+        else:
+            paths = [p for p in self.tree if os.path.basename(p) in MANIFEST_FILENAMES]
+        manifests = []
+        for fpath in paths:
+            if self.snapshot is not None and self.snapshot.get(fpath) is not None:
+                content = self.snapshot.read_text(fpath)
+                manifests.append({"path": fpath, "content": content})
+                continue
+            abs_path = os.path.join(self.project_dir, fpath)
+            try:
+                with open(abs_path, "r", encoding="utf-8") as mf:
+                    content = mf.read()
+            except Exception as e:
+                logger.warning(f"Could not read manifest {abs_path}: {e}")
+                content = ""
+            manifests.append({"path": fpath, "content": content})
+        return manifests
+
+    @cached_property
+    def services(self) -> List[Dict[str, Any]]:
+        if self._service_detector is None or not self.manifests:
+            return []
+        return self._service_detector(self.manifests)
+
+    @cached_property
+    def entrypoint_path(self) -> Optional[str]:
+        for f in self.tree:
+            if any(x in f for x in ENTRYPOINT_FILENAMES):
+                return f
+        return None
+
+    @cached_property
+    def entrypoint_content(self) -> str:
+        if not self.entrypoint_path:
+            return ""
+        if self.snapshot is not None and self.snapshot.get(self.entrypoint_path):
+            return self.snapshot.read_text(self.entrypoint_path)
+        try:
+            with open(
+                os.path.join(self.project_dir, self.entrypoint_path),
+                "r",
+                encoding="utf-8",
+            ) as f:
+                return f.read()
+        except Exception:
+            return ""
+
+    def retrieve_chunks(self, query, k=5, project=None, services=None):
+        """
+        Memoized ``Retriever.retrieve_chunks``; repeated queries hit the cache.
+        Each call gets its own lists, so trimming them doesn't change what
+        later callers see.
+        """
+        key = (query, k, project, tuple(services or ()))
+        if key not in self._retrievals:
+            t0 = time.time()
+            if services:
+                result = self.retriever.retrieve_chunks(
+                    query, k=k, project=project, services=services
+                )
+            else:
+                result = self.retriever.retrieve_chunks(query, k=k, project=project)
+            self._retrievals[key] = result
+            logger.info(f"Retriever query took {time.time() - t0:.1f}s")
+        return {p: list(hits) for p, hits in self._retrievals[key].items()}
@@ -0,0 +1,194 @@
+"""
+Optional dimensionality reduction for stored embeddings.
+
+A project's index can keep reduced vectors instead of the model's full ones:
+either the leading ``dim`` components of a PCA fitted on that project's
+chunks, or the first ``dim`` coordinates (for Matryoshka-trained models whose
+prefixes are embeddings in their own right). The same projection is applied
+to queries. ``recall_report`` measures what a given dimension costs in
+recall@k against exact search over the full vectors.
+"""
+
+import os
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+METHODS = ("none", "pca", "truncate")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class Projection:
+    def __init__(
+        self,
+        method: str,
+        dim: int,
+        components: Optional[np.ndarray] = None,
+    ):
+        if method not in ("pca", "truncate"):
+            raise ValueError(f"Unknown projection method: {method}")
+        self.method = method
+        self.dim = dim
+        self.components = components
+
+    @classmethod
+    def truncate(cls, dim: int) -> "Projection":
+        return cls("truncate", dim)
+
+    @classmethod
+    def fit_pca(cls, vectors, dim: int) -> "Projection":
+        """
+        Fit on ``vectors`` (one per row). With fewer samples than ``dim``
+        the missing components are zero, so the output width is always
+        ``dim``.
+        """
+        x = np.asarray(vectors, dtype=np.float64)
+        _, _, vt = np.linalg.svd(x - x.mean(axis=0), full_matrices=False)
+        components = np.zeros((dim, x.shape[1]))
+        rank = min(dim, vt.shape[0])
+        components[:rank] = vt[:rank]
+        return cls("pca", dim, components.astype(np.float32))
+
+    def describe(self) -> str:
+        return f"{self.method}:{self.dim}"
+
+    def apply(self, vectors) -> np.ndarray:
+        """Project and re-normalize; rows in, rows out."""
+        x = np.asarray(vectors, dtype=np.float32)
+        if self.method == "truncate":
+            out = x[:, : self.dim]
+        else:
+            # Vectors are not centered: cosine similarity is measured from the
+            # origin, and projecting onto the principal directions keeps the
+            # part of each vector that varies across the project.
+            out = x @ self.components.T
+        return _normalize(out)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        arrays = {"method": np.array(self.method), "dim": np.array(self.dim)}
+        if self.method == "pca":
+            arrays["components"] = self.components
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Projection":
+        with np.load(path) as data:
+            method = str(data["method"])
+            components = data["components"] if method == "pca" else None
+            return cls(method, int(data["dim"]), components)
+
+
+def describe_config(config: dict) -> str:
+    """The projection ``embedding_projection`` asks for, e.g. "pca:256"."""
+    settings = config.get("embedding_projection") or {}
+    method = settings.get("method", "none")
+    if method not in METHODS:
+        raise ValueError(f"embedding_projection.method must be one of {METHODS}")
+    return "none" if method == "none" else f"{method}:{settings.get('dim', 256)}"
+
+
+class ProjectionStore:
+    """Per-project projections saved beside the Chroma index."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._loaded: Dict[str, tuple] = {}
+
+    def path(self, project: str) -> str:
+        return os.path.join(self.directory, f"{project}.npz")
+
+    def save(self, project: str, projection: Projection) -> None:
+        projection.save(self.path(project))
+
+    def load(self, project: str) -> Optional[Projection]:
+        """The project's projection, or None if it stores full vectors."""
+        path = self.path(project)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+        cached = self._loaded.get(project)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, Projection.load(path))
+            self._loaded[project] = cached
+        return cached[1]
+
+    def remove(self, project: str) -> None:
+        self._loaded.pop(project, None)
+        try:
+            os.remove(self.path(project))
+        except FileNotFoundError:
+            pass
+
+
+def _top_k(queries: np.ndarray, corpus: np.ndarray, k: int, skip: int) -> np.ndarray:
+    # Queries are the first rows of the corpus; a chunk never retrieves itself.
+    scores = _normalize(queries) @ _normalize(corpus).T
+    scores[np.arange(skip), np.arange(skip)] = -np.inf
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def recall_report(
+    vectors,
+    dims: Iterable[int],
+    k: int = 10,
+    method: str = "pca",
+    n_queries: int = 100,
+) -> List[Dict[str, float]]:
+    """
+    recall@k of each reduced dimension against exact search over the full
+    ``vectors``. The first ``n_queries`` rows are used as queries against
+    the whole sample, never matching themselves.
+    """
+    full = np.asarray(vectors, dtype=np.float32)
+    n_queries = min(n_queries, len(full))
+    k = min(k, len(full) - 1)
+    truth = _top_k(full[:n_queries], full, k, n_queries)
+    rows = []
+    for dim in dims:
+        if method == "pca":
+            projection = Projection.fit_pca(full, dim)
+        else:
+            projection = Projection.truncate(dim)
+        reduced = projection.apply(full)
+        found = _top_k(reduced[:n_queries], reduced, k, n_queries)
+        hits = sum(len(set(a) & set(b)) for a, b in zip(truth, found))
+        rows.append(
+            {
+                "dim": dim,
+                "recall_at_k": hits / (n_queries * k),
+                "size_ratio": min(dim, full.shape[1]) / full.shape[1],
+            }
+        )
+    return rows
+
+
+def project_recall_report(
+    chroma_manager,
+    embedder,
+    project: str,
+    dims: Iterable[int],
+    k: int = 10,
+    sample: int = 1000,
+    method: str = "pca",
+) -> List[Dict[str, float]]:
+    """
+    ``recall_report`` for a stored project: up to ``sample`` of its chunks
+    are re-embedded at full dimension, whatever the index itself stores.
+    """
+    collection = chroma_manager.get_collection(project)
+    documents = collection.get(limit=sample, include=["documents"])["documents"]
+    if len(documents) < 2:
+        raise ValueError(f"Project '{project}' has too few chunks to evaluate")
+    batch_size = embedder.config.get("embed_batch_size", 32)
+    vectors = []
+    for i in range(0, len(documents), batch_size):
+        vectors.extend(embedder.embed_batch(documents[i : i + batch_size]))
+    return recall_report(vectors, dims, k=k, method=method)
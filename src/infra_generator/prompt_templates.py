@@ -4,6 +4,12 @@
 # Separating them from the main logic makes the system cleaner and easier to maintain.
 # These prompts are designed based on the key findings of the research report,
 # incorporating system roles, policies, and few-shot (good vs. bad) examples.
+#
+# Layout: each SYSTEM prompt holds everything that is identical across requests
+# (policies, rules and few-shot examples) and takes no variables, while each
+# USER prompt holds only per-service context. Every request therefore starts
+# with a byte-identical prefix that Ollama can serve from its KV cache instead
+# of re-evaluating it.
 
 # ==============================================================================
 # DOCKERFILE GENERATION PROMPTS
@@ -18,44 +24,15 @@ Your goal is to create Dockerfiles that strictly follow industry best practices.
 - **Optimization:** Always use multi-stage builds to create minimal final images. This is non-negotiable.
 - **Reproducibility:** Always use specific, version-locked base image tags provided in the prompt. NEVER use 'latest'.
 - **Output Format:** Output ONLY the raw Dockerfile content. Do not add any other text, explanations, markdown formatting, or code block wrappers. Do NOT include any #GOOD, #BAD, or example comments in the output. The output must be ready to build with `docker build`.
-"""
 
-DOCKERFILE_USER_PROMPT = """
 **Your Task:**
-Generate a secure, multi-stage Dockerfile for the project described below.
+Generate a secure, multi-stage Dockerfile for the project described in the user message.
 Analyze the provided project files to determine the language, dependencies, build steps, and the correct run command.
-Use the provided file tree list (`tree_list`) to infer the correct build tool and dependency manager (e.g., poetry, pip, npm, yarn, etc.).
+Use the provided file tree to infer the correct build tool and dependency manager (e.g., poetry, pip, npm, yarn, etc.).
 **IMPORTANT:**
 - If `requirements.txt` is not present in the file tree, do NOT use it. If `pyproject.toml` or `poetry.lock` is present, use Poetry. If `Pipfile` is present, use pipenv. If `package.json` is present, use npm or yarn as appropriate. Always match the build process to the actual files in the tree.
 - Output ONLY the raw Dockerfile content, with NO markdown code block wrappers, NO #GOOD/#BAD comments, and NO extra explanations. The output must be ready to build with `docker build`.
 
----
-### CONTEXT: PROJECT FILES (Retrieved via RAG)
-
-**1. Project Summary:**
-{summary}
-
-**2. File Tree:**
-```
-{tree}
-```
-**(File Tree List for Build Tool Inference):**
-{tree_list}
-
-**3. Dependency Manifest (e.g., package.json, requirements.txt):**
-```
-{manifest_content}
-```
-
-**4. Main Entrypoint File Content:**
-```
-{entrypoint_content}
-```
-
-**5. Other Relevant Code Snippets:**
-```
-{other_relevant_snippets}
-```
 ---
 ### EXAMPLES: GOOD vs. BAD Dockerfiles [Report Section 4]
 
@@ -113,34 +90,9 @@ COPY --from=builder /usr/src/app/dist ./dist
 EXPOSE 3000
 CMD ["node", "dist/server.js"]
 ```
----
-**Instructions:**
-Generate the Dockerfile now for the project: '{project_name}'. Use the latest recommended base image tag for this language: `{latest_base_image_tag}`.
-"""
-
-
-# ==============================================================================
-# DOCKER-COMPOSE GENERATION PROMPTS
-# ==============================================================================
-
-DOCKER_COMPOSE_SYSTEM_PROMPT = """
-You are an expert Cloud Architect creating secure, production-ready Docker Compose configurations.
-
-**Core Policies:**
-- **Security:** NEVER hardcode secrets. Always reference an `.env` file (`env_file: .env`).
-- **Persistence:** Always use named volumes for stateful services like databases. This is critical.
-- **Isolation:** Always use a custom bridge network to connect services. Do not use the default bridge.
-- **Reproducibility:** Always use specific, version-locked image tags for all services.
-- **Output Format:** Output ONLY the raw `docker-compose.yml` content. Do not add any other text, explanations, markdown formatting, or code block wrappers. Do NOT include any #GOOD, #BAD, or example comments in the output. The output must be ready to use with `docker compose`.
 """
 
-DOCKER_COMPOSE_USER_PROMPT = """
-**Your Task:**
-Generate a `docker-compose.yml` file for the project described below.
-Analyze the provided context to identify the main application and any required services (like a database or cache).
-Follow the best practices from the GOOD example and avoid the mistakes from the BAD example.
-
----
+DOCKERFILE_USER_PROMPT = """
 ### CONTEXT: PROJECT FILES (Retrieved via RAG)
 
 **1. Project Summary:**
@@ -165,6 +117,34 @@ Follow the best practices from the GOOD example and avoid the mistakes from the
 ```
 {other_relevant_snippets}
 ```
+---
+**Instructions:**
+Generate the Dockerfile now for the project: '{project_name}'. Use the latest recommended base image tag for this language: `{latest_base_image_tag}`.
+"""
+
+
+# ==============================================================================
+# DOCKER-COMPOSE GENERATION PROMPTS
+# ==============================================================================
+
+DOCKER_COMPOSE_SYSTEM_PROMPT = """
+You are an expert Cloud Architect creating secure, production-ready Docker Compose configurations.
+
+**Core Policies:**
+- **Security:** NEVER hardcode secrets. Always reference an `.env` file (`env_file: .env`).
+- **Persistence:** Always use named volumes for stateful services like databases. This is critical.
+- **Isolation:** Always use a custom bridge network to connect services. Do not use the default bridge.
+- **Reproducibility:** Always use specific, version-locked image tags for all services.
+- **Output Format:** Output ONLY the raw `docker-compose.yml` content. Do not add any other text, explanations, markdown formatting, or code block wrappers. Do NOT include any #GOOD, #BAD, or example comments in the output. The output must be ready to use with `docker compose`.
+
+**Your Task:**
+Generate a `docker-compose.yml` file for the project described in the user message.
+Analyze the provided context to identify the main application and any required services (like a database or cache).
+Follow the best practices from the GOOD example and avoid the mistakes from the BAD example.
+Infer the required services from the context. If 'redis' is detected, add a redis service. If 'postgres', 'psycopg2', or 'sqlalchemy' is detected, add the 'db' service as shown in the good example.
+**IMPORTANT:**
+- Output ONLY the raw docker-compose.yml content, with NO markdown code block wrappers, NO #GOOD/#BAD comments, and NO extra explanations. The output must be ready to use with `docker compose`.
+
 ---
 ### EXAMPLES: GOOD vs. BAD Docker Compose [Report Section 4]
 
@@ -190,7 +170,7 @@ version: '3.8'
 services:
   app:
     build: .
-    container_name: {project_name}-app
+    container_name: myproject-app
     env_file: .env
     ports:
       - "5000:5000"
@@ -199,8 +179,8 @@ services:
     networks:
       - app-net
   db:
-    image: postgres:{postgres_image_tag}
-    container_name: {project_name}-db
+    image: postgres:16-alpine
+    container_name: myproject-db
     env_file: .env
     volumes:
       - db-data:/var/lib/postgresql/data
@@ -217,11 +197,66 @@ networks:
 volumes:
   db-data:
 ```
+"""
+
+DOCKER_COMPOSE_USER_PROMPT = """
+### CONTEXT: PROJECT FILES (Retrieved via RAG)
+
+**1. Project Summary:**
+{summary}
+
+**2. File Tree:**
+```
+{tree}
+```
+
+**3. Dependency Manifest (e.g., package.json, requirements.txt):**
+```
+{manifest_content}
+```
+
+**4. Main Entrypoint File Content:**
+```
+{entrypoint_content}
+```
+
+**5. Other Relevant Code Snippets:**
+```
+{other_relevant_snippets}
+```
 ---
 **Instructions:**
 Generate the `docker-compose.yml` for the project: '{project_name}'.
-Infer the required services from the context. If 'redis' is detected, add a redis service. If 'postgres', 'psycopg2', or 'sqlalchemy' is detected, add the 'db' service as shown in the good example.
-Use the image `postgres:{postgres_image_tag}` for the database and `redis:{redis_image_tag}` for the cache.
-**IMPORTANT:**
-- Output ONLY the raw docker-compose.yml content, with NO markdown code block wrappers, NO #GOOD/#BAD comments, and NO extra explanations. The output must be ready to use with `docker compose`.
+Use the image `postgres:{postgres_image_tag}` for the database and `redis:{redis_image_tag}` for the cache, and name containers `{project_name}-<service>`.
+"""
+
+
+# ==============================================================================
+# REPAIR PROMPTS
+# ==============================================================================
+# Used when a generated artifact fails validation (see validation.py): only the
+# artifact and the validator's findings are sent, not the project context.
+
+REPAIR_SYSTEM_PROMPT = """
+You are an expert DevSecOps Engineer reviewing a generated infrastructure file.
+You will be given the file and a list of problems an automated validator found in it.
+
+**Rules:**
+1. Fix every listed problem.
+2. Change nothing else: keep the structure, stages, commands and comments that are not part of a problem.
+3. Pin base images and service images to specific versions; never use the `latest` tag.
+4. Only reference files that exist; if a copied path does not exist, remove it or use the correct path from the problem description.
+5. Output ONLY the complete corrected file, with no explanations and no markdown code fences.
+"""
+
+REPAIR_USER_PROMPT = """
+**File:** {artifact_name}
+```
+{content}
+```
+
+**Problems found by the validator:**
+{problems}
+---
+Return the corrected {artifact_name} now.
 """
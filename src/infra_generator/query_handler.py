@@ -5,19 +5,29 @@ class QueryHandler:
     def __init__(self, config, retriever):
         self.config = config
         self.retriever = retriever
+        self.session = requests.Session()
 
-    def build_context(self, query, k=5, project=None, max_context_length=3000):
+    def build_context(
+        self, query, k=5, project=None, max_context_length=3000, services=None
+    ):
         """
         Build a context string from retrieved code chunks, with clear delimiters and context length management.
         """
-        chunks_by_project = self.retriever.retrieve_chunks(query, k, project)
+        if services:
+            chunks_by_project = self.retriever.retrieve_chunks(
+                query, k, project, services=services
+            )
+        else:
+            chunks_by_project = self.retriever.retrieve_chunks(query, k, project)
         context_chunks = []
         total_length = 0
         for proj, chunks in chunks_by_project.items():
             for chunk in chunks:
+                copies = [o["file_path"] for o in chunk.get("occurrences", [])[1:]]
+                also = f"# Also in: {', '.join(copies[:3])}\n" if copies else ""
                 chunk_text = (
                     f"-----\n# Project: {proj}\n# File: {chunk['file_path']} [{chunk['start_line']}:{chunk['end_line']}]\n"
-                    f"{chunk['code']}\n-----\n"
+                    f"{also}{chunk['code']}\n-----\n"
                 )
                 chunk_len = len(chunk_text)
                 if total_length + chunk_len > max_context_length:
@@ -26,8 +36,8 @@ class QueryHandler:
                 total_length += chunk_len
         return "\n".join(context_chunks)
 
-    def ask(self, query, k=5, project=None):
-        context = self.build_context(query, k, project)
+    def ask(self, query, k=5, project=None, services=None):
+        context = self.build_context(query, k, project, services=services)
         prompt = (
             "You are a codebase assistant. Use ONLY the provided code context to answer the question. "
             "If the answer is not present, reply: 'Not found in context.'\n\n"
@@ -43,7 +53,7 @@ class QueryHandler:
             "prompt": prompt,
             "stream": False,
         }
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
         resp.raise_for_status()
         print(f"Received response from Ollama: {resp.json()['response']}")
         return resp.json()["response"]
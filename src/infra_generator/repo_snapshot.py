@@ -0,0 +1,160 @@
+import fnmatch
+import hashlib
+import mmap
+import os
+from typing import Dict, Iterable, Iterator, List, Optional
+
+
+def is_excluded(rel_path: str, patterns: Iterable[str], is_dir: bool = False) -> bool:
+    """
+    Match a path against gitingest-style exclude patterns. Patterns ending in
+    "/" (e.g. "node_modules/") match directory names; all other patterns are
+    matched against the basename and the full relative path.
+    """
+    name = os.path.basename(rel_path)
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            if is_dir and fnmatch.fnmatch(name, pattern.rstrip("/")):
+                return True
+        elif fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern):
+            return True
+    return False
+
+
+class SnapshotFile:
+    """One file in a RepoSnapshot. Contents and hash are loaded on demand."""
+
+    __slots__ = ("path", "abs_path", "size", "mtime", "_sha1")
+
+    def __init__(self, path: str, abs_path: str, size: int, mtime: float):
+        self.path = path
+        self.abs_path = abs_path
+        self.size = size
+        self.mtime = mtime
+        self._sha1: Optional[str] = None
+
+    def read_bytes(self) -> bytes:
+        if self.size == 0:
+            return b""
+        with open(self.abs_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return mapped[:]
+
+    def read_text(self) -> str:
+        """Decode the file as UTF-8; raises UnicodeDecodeError for binaries."""
+        return self.read_bytes().decode("utf-8")
+
+    @property
+    def sha1(self) -> str:
+        if self._sha1 is None:
+            digest = hashlib.sha1()
+            if self.size:
+                with open(self.abs_path, "rb") as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        digest.update(mapped)
+            self._sha1 = digest.hexdigest()
+        return self._sha1
+
+
+class RepoSnapshot:
+    """
+    A repository listing built in a single directory traversal.
+
+    Holds every non-excluded file's relative path, size and mtime; contents
+    are memory-mapped and hashes computed only when asked for. The embedder,
+    the summary/tree builder, manifest reading and entrypoint lookup all
+    share one snapshot instead of walking and reading the repo separately.
+    """
+
+    def __init__(self, root: str, files: Dict[str, SnapshotFile]):
+        self.root = os.path.abspath(root)
+        self.files = files
+
+    @classmethod
+    def build(
+        cls,
+        root: str,
+        exclude_patterns: Optional[Iterable[str]] = None,
+        skip_paths: Optional[Iterable[str]] = None,
+    ) -> "RepoSnapshot":
+        """
+        Walk ``root`` once. ``skip_paths`` are relative files or directories
+        left out entirely, such as generated output inside the tree.
+        """
+        root = os.path.abspath(root)
+        patterns = list(exclude_patterns or [])
+        skip = set(skip_paths or ())
+        files: Dict[str, SnapshotFile] = {}
+        stack = [(root, "")]
+        while stack:
+            abs_dir, rel_dir = stack.pop()
+            try:
+                entries = list(os.scandir(abs_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if rel_path in skip:
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not is_excluded(rel_path, patterns, is_dir=True):
+                            stack.append((entry.path, rel_path))
+                    elif entry.is_file():
+                        if not is_excluded(rel_path, patterns):
+                            st = entry.stat()
+                            files[rel_path] = SnapshotFile(
+                                rel_path, entry.path, st.st_size, st.st_mtime
+                            )
+                except OSError:
+                    continue
+        return cls(root, dict(sorted(files.items())))
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __iter__(self) -> Iterator[SnapshotFile]:
+        return iter(self.files.values())
+
+    def paths(self) -> List[str]:
+        return list(self.files)
+
+    def get(self, path: str) -> Optional[SnapshotFile]:
+        return self.files.get(path)
+
+    def read_text(self, path: str, default: str = "") -> str:
+        entry = self.files.get(path)
+        if entry is None:
+            return default
+        try:
+            return entry.read_text()
+        except (OSError, UnicodeDecodeError):
+            return default
+
+    def with_extensions(self, extensions: Iterable[str]) -> List[SnapshotFile]:
+        exts = tuple(extensions)
+        return [f for f in self.files.values() if f.path.endswith(exts)]
+
+    def find(self, filenames: Iterable[str]) -> List[str]:
+        """Relative paths of all files whose basename is in ``filenames``."""
+        names = set(filenames)
+        return [p for p in self.files if os.path.basename(p) in names]
+
+    @property
+    def total_size(self) -> int:
+        return sum(f.size for f in self.files.values())
+
+    def summary(self, name: Optional[str] = None) -> str:
+        """A gitingest-style summary computed from sizes, without reading files."""
+        tokens = self.total_size // 4
+        if tokens >= 1_000_000:
+            estimate = f"{tokens / 1_000_000:.1f}M"
+        elif tokens >= 1_000:
+            estimate = f"{tokens / 1_000:.1f}k"
+        else:
+            estimate = str(tokens)
+        return (
+            f"Directory: {name or os.path.basename(self.root)}\n"
+            f"Files analyzed: {len(self.files)}\n\n"
+            f"Estimated tokens: {estimate}"
+        )
@@ -1,39 +1,106 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
+from .shards import ROOT_SERVICE
+from .tracing import span
+
 
 class Retriever:
     def __init__(self, config: dict, chroma_manager):
         self.config = config
         self.chroma_manager = chroma_manager
+        self.session = requests.Session()
 
     def embed_query(self, query: str):
         url = f"{self.config['ollama_base_url']}/api/embeddings"
         payload = {"model": self.config["models"]["embed_model"], "prompt": query}
-        resp = requests.post(url, json=payload)
+        resp = self.session.post(url, json=payload)
         resp.raise_for_status()
         return resp.json()["embedding"]
 
-    def retrieve_chunks(self, query, k=5, project=None):
+    def retrieve_chunks(self, query, k=5, project=None, services=None):
+        """
+        Top ``k`` chunks for ``query`` in each project (or just ``project``).
+        Sharded projects are searched across all their shards, or only the
+        shards of ``services`` if given (``ROOT_SERVICE`` being the project's
+        own collection).
+        """
         results = {}
         projects = [project] if project else self.chroma_manager.get_all_projects()
         if not projects:
             print("No embedded projects found.")
             return results
         for proj in projects:
-            collection = self.chroma_manager.get_collection(proj)
-            vector = self.embed_query(query)
-            res = collection.query(query_embeddings=[vector], n_results=k)
-            hits = []
-            for doc, meta in zip(res["documents"][0], res["metadatas"][0]):
-                hits.append(
-                    {
-                        "code": doc,
-                        "file_path": meta["file_path"],
-                        "start_line": meta.get("start_line", -1),
-                        "end_line": meta.get("end_line", -1),
-                        "language": meta["language"],
-                        "project": meta.get("project", proj),
-                    }
-                )
-            results[proj] = hits
+            with span("embed_query", cat="retrieval", project=proj):
+                vector = self.embed_query(query)
+            results[proj] = self.search_project(proj, vector, k, services)
         return results
+
+    def search_project(self, project: str, vector, k=5, services=None):
+        """
+        ``search`` over a project's collection and its service shards, run in
+        parallel and merged into one top ``k`` by distance.
+        """
+        shards = self.chroma_manager.get_shards(project)
+        if services:
+            # ROOT_SERVICE is the project's own collection
+            unknown = set(services) - set(shards) - {ROOT_SERVICE}
+            if unknown:
+                raise ValueError(
+                    f"Unknown service(s) {sorted(unknown)} in '{project}'; "
+                    f"shards: {sorted(shards)}"
+                )
+            indexes = {s or None: shards.get(s, project) for s in services}
+        elif shards:
+            indexes = {None: project, **shards}
+        else:
+            return self.search(project, vector, k)
+
+        workers = (self.config.get("index_sharding") or {}).get("search_workers", 8)
+        with ThreadPoolExecutor(max_workers=min(workers, len(indexes))) as pool:
+            futures = {
+                service: pool.submit(self.search, name, vector, k)
+                for service, name in indexes.items()
+            }
+            hits = []
+            for service, future in futures.items():
+                for hit in future.result():
+                    hits.append({**hit, "project": project, "service": service})
+        hits.sort(key=lambda hit: hit["distance"])
+        return hits[:k]
+
+    def search(self, project: str, vector, k=5):
+        """Nearest chunks to an already embedded query in one project."""
+        collection = self.chroma_manager.get_collection(project)
+        # Projects stored with reduced vectors get the same projection
+        projection = self.chroma_manager.projections.load(project)
+        if projection is not None:
+            vector = projection.apply([vector])[0].tolist()
+        with span("vector_query", cat="retrieval", project=project, k=k) as s:
+            res = collection.query(query_embeddings=[vector], n_results=k)
+            s.set(hits=len(res["documents"][0]))
+        # Identical chunks are stored once; list every place each occurs.
+        occurrences = self.chroma_manager.occurrences.lookup(project, res["ids"][0])
+        hits = []
+        for chunk_id, doc, meta, distance in zip(
+            res["ids"][0], res["documents"][0], res["metadatas"][0], res["distances"][0]
+        ):
+            where = occurrences.get(chunk_id) or [
+                {
+                    "file_path": meta["file_path"],
+                    "start_line": meta.get("start_line", -1),
+                    "end_line": meta.get("end_line", -1),
+                }
+            ]
+            hits.append(
+                {
+                    "code": doc,
+                    **where[0],
+                    "occurrences": where,
+                    "language": meta["language"],
+                    "project": meta.get("project", project),
+                    "distance": distance,
+                }
+            )
+        return hits
@@ -0,0 +1,269 @@
+"""
+`infra-gen serve`: a long-running daemon that keeps Chroma handles, LLM
+clients and the imported LangChain stack warm, and a thin client the CLI uses
+to forward commands to it when it is running.
+
+The daemon listens on 127.0.0.1 and records its URL, pid, config path and a
+random token in an address file (mode 0600) under the cache directory. The
+client reads that file and only forwards when the daemon was started with the
+same --config. This module imports nothing heavy at load time so the client
+side stays fast.
+"""
+
+import json
+import logging
+import os
+import secrets
+import threading
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADDRESS_FILE = "~/.cache/infra-generator/server.json"
+
+# CLI commands the daemon can run on the client's behalf.
+FORWARDED_COMMANDS = {
+    "embed",
+    "ask",
+    "list",
+    "generate-docker",
+    "generate-compose",
+    "generate-infra",
+}
+
+
+class CommandError(Exception):
+    def __init__(self, message: str, exit_code: int = 1):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+def address_file(config: dict) -> str:
+    return os.path.expanduser(config.get("server_address_file", DEFAULT_ADDRESS_FILE))
+
+
+class InfraService:
+    """Warm components shared by every request the daemon serves."""
+
+    def __init__(self, config: dict):
+        from .chroma_manager import ChromaManager
+        from .embedder import Embedder
+        from .query_handler import QueryHandler
+        from .retriever import Retriever
+
+        self.config = config
+        self.chroma_manager = ChromaManager.from_config(config)
+        self.embedder = Embedder(config, self.chroma_manager)
+        self.retriever = Retriever(config, self.chroma_manager)
+        self.query_handler = QueryHandler(config, self.retriever)
+        # Commands that write to the index or to disk run one at a time;
+        # questions are answered concurrently.
+        self._write_lock = threading.Lock()
+
+    def _require_project(self, project: Optional[str]) -> str:
+        projects = self.chroma_manager.get_all_projects()
+        proj = project or (projects[0] if len(projects) == 1 else None)
+        if not proj or proj not in projects:
+            raise CommandError(f"Specify --project from: {projects}")
+        return proj
+
+    def run(self, command: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        if command == "list":
+            return {"lines": self.chroma_manager.get_all_projects()}
+        if command == "ask":
+            proj = self._require_project(args.get("project"))
+            answer = self.query_handler.ask(
+                " ".join(args["question"]), project=proj, services=args.get("service")
+            )
+            return {"lines": [answer]}
+        with self._write_lock:
+            if command == "embed":
+                self.embedder.embed_project(
+                    args["project_dir"],
+                    args.get("name"),
+                    full=args.get("full", False),
+                    services=args.get("service"),
+                )
+                return {"lines": []}
+            if command in ("generate-docker", "generate-compose"):
+                from .infra_generator import InfraGenerator, ProjectNotEmbedded
+
+                proj = self._require_project(args["project"])
+                infra = InfraGenerator(proj, self.config, self.chroma_manager)
+                try:
+                    if command == "generate-docker":
+                        infra.generate_dockerfile(self.retriever)
+                    else:
+                        infra.generate_docker_compose(self.retriever)
+                except ProjectNotEmbedded as e:
+                    return {"lines": [str(e)]}
+                return {"lines": []}
+            if command == "generate-infra":
+                from .infra_agent import run_infra_pipeline
+
+                stages = args.get("stages")
+                written = run_infra_pipeline(
+                    args["source"],
+                    args["output"],
+                    ref=args.get("ref"),
+                    stages=stages.split(",") if stages else None,
+                    config=self.config,
+                    chroma_manager=self.chroma_manager,
+                    embedder=self.embedder,
+                    retriever=self.retriever,
+                    regenerate=args.get("regenerate", False),
+                    use_llm=args.get("llm", False),
+                )
+                return {"lines": [f"Wrote {path}" for path in written]}
+        raise CommandError(f"Unknown command: {command}", exit_code=2)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _reply(self, status: int, body: dict) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _authorized(self) -> bool:
+        token = self.headers.get("Authorization", "")
+        return secrets.compare_digest(token, f"Bearer {self.server.token}")
+
+    def do_GET(self):
+        if not self._authorized():
+            self._reply(403, {"error": "forbidden"})
+        elif self.path == "/v1/health":
+            self._reply(200, {"ok": True, "pid": os.getpid()})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            self._reply(403, {"error": "forbidden"})
+            return
+        command = self.path.rsplit("/", 1)[-1]
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            args = json.loads(self.rfile.read(length) or b"{}")
+            logger.info(f"Serving '{command}'")
+            result = self.server.service.run(command, args)
+            self._reply(200, {"ok": True, **result})
+        except CommandError as e:
+            self._reply(400, {"ok": False, "error": str(e), "exit_code": e.exit_code})
+        except Exception as e:
+            logger.exception(f"'{command}' failed")
+            self._reply(500, {"ok": False, "error": str(e), "exit_code": 2})
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    service: InfraService
+    token: str
+    url: str
+    address_file: str
+
+
+def start_server(
+    config: dict, config_path: Optional[str] = None, host="127.0.0.1", port=0
+) -> _Server:
+    """Bind the daemon and publish its address file; call serve_forever next."""
+    httpd = _Server((host, port), _Handler)
+    httpd.service = InfraService(config)
+    httpd.token = secrets.token_hex(16)
+    httpd.url = f"http://{host}:{httpd.server_address[1]}"
+    httpd.address_file = address_file(config)
+    os.makedirs(os.path.dirname(httpd.address_file), exist_ok=True)
+    fd = os.open(httpd.address_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "url": httpd.url,
+                "pid": os.getpid(),
+                "token": httpd.token,
+                "config": os.path.abspath(config_path) if config_path else None,
+            },
+            f,
+        )
+    return httpd
+
+
+def stop_server(httpd: _Server) -> None:
+    httpd.server_close()
+    try:
+        with open(httpd.address_file, encoding="utf-8") as f:
+            if json.load(f).get("token") == httpd.token:
+                os.remove(httpd.address_file)
+    except (OSError, ValueError):
+        pass
+
+
+def serve(
+    config: dict, config_path: Optional[str] = None, host="127.0.0.1", port=0
+) -> None:
+    """Run the daemon in the foreground until interrupted."""
+    httpd = start_server(config, config_path, host, port)
+    logger.info(
+        f"infra-gen daemon listening on {httpd.url} "
+        f"(address file {httpd.address_file})"
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_server(httpd)
+
+
+class DaemonClient:
+    def __init__(self, url: str, token: str):
+        self.url = url
+        self.token = token
+
+    def _request(self, path: str, body: Optional[dict] = None, timeout=None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        request = urllib.request.Request(
+            f"{self.url}{path}",
+            data=data,
+            headers={
+                "Authorization": f"Bearer {self.token}",
+                "Content-Type": "application/json",
+            },
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as resp:
+                return json.load(resp)
+        except urllib.error.HTTPError as e:
+            return json.load(e)
+
+    def healthy(self) -> bool:
+        try:
+            return bool(self._request("/v1/health", timeout=0.5).get("ok"))
+        except (OSError, ValueError):
+            return False
+
+    def run(self, command: str, args: Dict[str, Any]) -> Dict[str, Any]:
+        return self._request(f"/v1/{command}", args)
+
+
+def find_daemon(config: dict, config_path: Optional[str] = None):
+    """A client for a running daemon started with the same config, or None."""
+    try:
+        with open(address_file(config), encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    wanted = os.path.abspath(config_path) if config_path else None
+    if info.get("config") != wanted:
+        return None
+    client = DaemonClient(info["url"], info["token"])
+    return client if client.healthy() else None
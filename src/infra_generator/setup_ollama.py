@@ -1,57 +1,98 @@
+import json
+import os
 import shutil
 import subprocess
 import sys
 import time
+from typing import List, Optional, Set
 
 import requests
 
 
 class OllamaSetup:
-    def __init__(self, required_models=None, host="http://localhost:11434"):
-        self.host = host
+    """
+    Makes sure an Ollama server is reachable and has the required models.
+
+    A single ``/api/tags`` request answers both questions. A successful check
+    is recorded in a stamp file and trusted for ``ttl`` seconds, so back to
+    back commands skip the probe entirely.
+    """
+
+    def __init__(
+        self,
+        required_models=None,
+        host="http://localhost:11434",
+        stamp_path: Optional[str] = "~/.cache/infra-generator/ollama_ready.json",
+        ttl: float = 300,
+        start_timeout: float = 15,
+    ):
+        self.host = host.rstrip("/")
         self.required_models = required_models or [
             "manutic/nomic-embed-code:7b-Q4_K_M",
             "codestral:22b-v0.1-q2_K",
         ]
+        self.stamp_path = os.path.expanduser(stamp_path) if stamp_path else None
+        self.ttl = ttl
+        self.start_timeout = start_timeout
+
+    @classmethod
+    def from_config(cls, config: dict) -> "OllamaSetup":
+        models = config.get("models", {})
+        return cls(
+            required_models=[m for m in models.values() if m] or None,
+            host=config.get("ollama_base_url", "http://localhost:11434"),
+            stamp_path=config.get(
+                "ollama_check_stamp", "~/.cache/infra-generator/ollama_ready.json"
+            ),
+            ttl=config.get("ollama_check_ttl", 300),
+            start_timeout=config.get("ollama_start_timeout", 15),
+        )
 
     def is_installed(self):
         return shutil.which("ollama") is not None
 
-    def is_running(self):
+    def available_models(self) -> Optional[Set[str]]:
+        """Model names the server has, or None if it isn't reachable."""
         try:
             resp = requests.get(f"{self.host}/api/tags", timeout=2)
-            return resp.status_code == 200
+            resp.raise_for_status()
         except Exception:
-            return False
+            return None
+        return {m.get("name") or m.get("model") for m in resp.json().get("models", [])}
+
+    def is_running(self):
+        return self.available_models() is not None
+
+    def missing_models(self, available: Set[str]) -> List[str]:
+        # Untagged names resolve to ":latest", as in `ollama pull`.
+        return [
+            m
+            for m in self.required_models
+            if m not in available and f"{m}:latest" not in available
+        ]
 
-    def start(self):
+    def start(self) -> bool:
+        """Start `ollama serve` and poll with backoff until it answers."""
         try:
             subprocess.Popen(
                 ["ollama", "serve"],
                 stdout=subprocess.DEVNULL,
                 stderr=subprocess.DEVNULL,
             )
-            time.sleep(3)
         except Exception as e:
             print(f"Could not start Ollama: {e}")
-
-    def model_present(self, model_name):
-        try:
-            result = subprocess.run(
-                ["ollama", "list"], capture_output=True, text=True, check=True
-            )
-            # Model list is just the "short" name, i.e. "codestral", "nomic-embed-code"
-            short_name = model_name.split(":")[0]
-            return short_name in result.stdout
-        except Exception:
             return False
+        deadline = time.monotonic() + self.start_timeout
+        delay = 0.05
+        while time.monotonic() < deadline:
+            if self.is_running():
+                return True
+            time.sleep(min(delay, max(deadline - time.monotonic(), 0)))
+            delay = min(delay * 2, 1.0)
+        return self.is_running()
 
-    def download_models(self):
-        for model in self.required_models:
-            print(f"Checking model {model}...")
-            if self.model_present(model):
-                print(f"Model {model} already present.")
-                continue
+    def download_models(self, missing: List[str]):
+        for model in missing:
             print(f"Pulling model {model}...")
             code = subprocess.call(["ollama", "pull", model])
             if code != 0:
@@ -59,18 +100,57 @@ class OllamaSetup:
                 sys.exit(1)
         print("All models ready.")
 
-    def setup(self):
-        if not self.is_installed():
-            print(
-                "Ollama is not installed. Please install Ollama from https://ollama.com/download and re-run."
+    def _stamp_valid(self) -> bool:
+        if not self.stamp_path:
+            return False
+        try:
+            with open(self.stamp_path, encoding="utf-8") as f:
+                stamp = json.load(f)
+        except (OSError, ValueError):
+            return False
+        return (
+            stamp.get("host") == self.host
+            and set(self.required_models) <= set(stamp.get("models", []))
+            and time.time() - stamp.get("checked_at", 0) < self.ttl
+        )
+
+    def _write_stamp(self) -> None:
+        if not self.stamp_path:
+            return
+        os.makedirs(os.path.dirname(self.stamp_path), exist_ok=True)
+        tmp = f"{self.stamp_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "host": self.host,
+                    "models": self.required_models,
+                    "checked_at": time.time(),
+                },
+                f,
             )
-            sys.exit(1)
-        if not self.is_running():
+        os.replace(tmp, self.stamp_path)
+
+    def setup(self):
+        if self._stamp_valid():
+            return
+        available = self.available_models()
+        if available is None:
+            if not self.is_installed():
+                print(
+                    "Ollama is not installed. Please install Ollama from https://ollama.com/download and re-run."
+                )
+                sys.exit(1)
             print("Starting Ollama server...")
-            self.start()
-            if not self.is_running():
+            if not self.start():
                 print(
                     "Ollama server did not start. Please run 'ollama serve' manually and retry."
                 )
                 sys.exit(1)
-        self.download_models()
+            available = self.available_models() or set()
+        missing = self.missing_models(available)
+        if missing:
+            if not self.is_installed():
+                print(f"Missing models {missing} and no local `ollama` to pull them.")
+                sys.exit(1)
+            self.download_models(missing)
+        self._write_stamp()
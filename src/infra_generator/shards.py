@@ -0,0 +1,85 @@
+"""
+Per-service sub-indexes for monorepos.
+
+With ``index_sharding.enabled``, a project's chunks are split by service: a
+service is a directory (other than the repository root) holding a manifest
+file such as ``package.json`` or ``go.mod``. Each service gets its own
+collection named ``<project>__<service>``; files outside every service stay
+in the project's own collection, whose metadata lists the shards. A file
+belongs to the deepest service directory containing it.
+
+Shards are embedded and updated independently (a change in one service only
+touches its shard) and searched in parallel with one merged top-k, or
+just the shard of one service, as generate-infra does for each Dockerfile.
+Sharding can't be combined with a PCA ``embedding_projection``: each shard
+would be fitted separately and distances from different shards couldn't be
+merged.
+"""
+
+import os
+import re
+from typing import Dict, Iterable, List
+
+from .project_context import MANIFEST_FILENAMES
+
+SHARD_SEPARATOR = "__"
+
+# The project's own collection, holding files outside every service.
+ROOT_SERVICE = ""
+
+
+def service_dirs(paths: Iterable[str]) -> List[str]:
+    """Directories (other than the root) that contain a manifest file."""
+    manifests = set(MANIFEST_FILENAMES)
+    return sorted(
+        {
+            os.path.dirname(p)
+            for p in paths
+            if os.path.basename(p) in manifests and os.path.dirname(p)
+        }
+    )
+
+
+def owning_service(path: str, services: List[str]) -> str:
+    """The deepest of ``services`` containing ``path``, or ``ROOT_SERVICE``."""
+    best = ROOT_SERVICE
+    for service in services:
+        if path.startswith(service + "/") and len(service) > len(best):
+            best = service
+    return best
+
+
+def service_shard(path: str, shards: Iterable[str]) -> str:
+    """
+    The shard searched for a service at directory ``path``: its own, or the
+    one around it if it was folded in, or ``ROOT_SERVICE``.
+    """
+    shards = list(shards)
+    return path if path in shards else owning_service(path, shards)
+
+
+def plan_shards(
+    paths: Iterable[str], services: List[str], min_files: int = 1
+) -> Dict[str, List[str]]:
+    """
+    Group ``paths`` by owning service. Services with fewer than
+    ``min_files`` of them are folded into the service (or root) around them.
+    The root group is always present.
+    """
+    paths = list(paths)
+    while True:
+        groups: Dict[str, List[str]] = {ROOT_SERVICE: []}
+        for path in paths:
+            groups.setdefault(owning_service(path, services), []).append(path)
+        small = [s for s in services if len(groups.get(s, [])) < min_files]
+        if not small:
+            return groups
+        services = [s for s in services if s not in small]
+
+
+def shard_name(project: str, service: str) -> str:
+    """Collection name of a service's shard, e.g. ``shop__services.cart``."""
+    if service == ROOT_SERVICE:
+        return project
+    slug = re.sub(r"[^a-zA-Z0-9._-]", "-", service.replace("/", "."))
+    return f"{project}{SHARD_SEPARATOR}{slug.strip('._-') or 'service'}"[:512]
@@ -0,0 +1,390 @@
+"""
+Dockerfiles for well-understood stacks, rendered without the LLM.
+
+Python (pip, Poetry, uv), Node (npm, yarn, pnpm) and Go modules services
+get a vetted multi-stage template filled from their manifest and the files
+beside it: lock files decide the install command, the manifest's declared
+runtime version picks the base image tag (``_get_latest_docker_image_tag``)
+and the entry point comes from the start script, ``main`` field or the
+usual entry files. Anything the templates can't be sure about (another
+language, a Pipfile, Yarn Berry, cgo, no obvious entry point) renders to
+None and is left to the LLM. The same manifests give each service's
+language and version (``detect_service``) without an LLM call.
+"""
+
+import json
+import logging
+import os
+import re
+import tomllib
+from typing import Callable, Dict, List, Optional
+
+from .tools.infra_tools import _get_latest_docker_image_tag
+
+logger = logging.getLogger(__name__)
+
+PYTHON_MANIFESTS = {"requirements.txt", "pyproject.toml", "setup.py", "poetry.lock"}
+NODE_MANIFESTS = {"package.json", "yarn.lock"}
+GO_MANIFESTS = {"go.mod", "go.sum"}
+
+PYTHON_WEB_PORT = 8000
+NODE_WEB_PORT = 3000
+NODE_WEB_FRAMEWORKS = {"express", "fastify", "koa", "next", "@nestjs/core", "hapi"}
+
+# Go modules that need cgo, which the static distroless image can't run
+CGO_MODULES = ("github.com/mattn/go-sqlite3", "gopkg.in/gographics")
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+def _lines(*parts: Optional[str]) -> str:
+    return "\n".join(p for p in parts if p is not None) + "\n"
+
+
+def _exec_form(args: List[str]) -> str:
+    return json.dumps(args)
+
+
+# --- Python ---
+
+
+def _requirement_name(spec: str) -> str:
+    return re.split(r"[\s\[<>=!~;@(]", spec.strip(), maxsplit=1)[0].lower()
+
+
+def _python_dependencies(service_dir: str, pyproject: dict) -> set:
+    names = set(pyproject.get("project", {}).get("dependencies", []))
+    names = {_requirement_name(d) for d in names}
+    poetry = pyproject.get("tool", {}).get("poetry", {})
+    names |= {n.lower() for n in poetry.get("dependencies", {}) if n != "python"}
+    requirements = _read(os.path.join(service_dir, "requirements.txt")) or ""
+    for line in requirements.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line and not line.startswith("-"):
+            names.add(_requirement_name(line))
+    return names
+
+
+def _python_version(pyproject: dict) -> Optional[str]:
+    poetry_python = (
+        pyproject.get("tool", {}).get("poetry", {}).get("dependencies", {})
+    ).get("python")
+    version = pyproject.get("project", {}).get("requires-python") or poetry_python
+    return version if isinstance(version, str) else None
+
+
+def _python_command(service_dir: str, dependencies: set) -> Optional[List[str]]:
+    """Server command for the service's entry point, or None if there's none."""
+    for entry in ("main.py", "app.py", "app/main.py"):
+        source = _read(os.path.join(service_dir, entry))
+        if source is None:
+            continue
+        module = entry[: -len(".py")].replace("/", ".")
+        fastapi = re.search(r"^(\w+)\s*=\s*FastAPI\(", source, re.MULTILINE)
+        if fastapi and "uvicorn" in dependencies:
+            return [
+                "uvicorn",
+                f"{module}:{fastapi.group(1)}",
+                "--host",
+                "0.0.0.0",
+                "--port",
+                str(PYTHON_WEB_PORT),
+            ]
+        flask = re.search(r"^(\w+)\s*=\s*Flask\(", source, re.MULTILINE)
+        if flask and "gunicorn" in dependencies:
+            return [
+                "gunicorn",
+                "--bind",
+                f"0.0.0.0:{PYTHON_WEB_PORT}",
+                f"{module}:{flask.group(1)}",
+            ]
+        if "/" not in entry:
+            return ["python", entry]
+    return None
+
+
+def render_python(svc: dict, service_dir: str) -> Optional[Dict[str, str]]:
+    def exists(name: str) -> bool:
+        return os.path.isfile(os.path.join(service_dir, name))
+
+    pyproject = {}
+    if exists("pyproject.toml"):
+        try:
+            pyproject = tomllib.loads(
+                _read(os.path.join(service_dir, "pyproject.toml"))
+            )
+        except (TypeError, tomllib.TOMLDecodeError):
+            return None
+
+    if exists("uv.lock"):
+        stack = "python-uv"
+        install = [
+            "RUN pip install uv",
+            "ENV UV_PROJECT_ENVIRONMENT=/app/.venv",
+            "COPY pyproject.toml uv.lock ./",
+            "RUN uv sync --frozen --no-dev --no-install-project",
+        ]
+    elif exists("poetry.lock") or "poetry" in pyproject.get("tool", {}):
+        stack = "python-poetry"
+        lock = " poetry.lock" if exists("poetry.lock") else ""
+        install = [
+            'RUN pip install "poetry>=1.8"',
+            "ENV POETRY_VIRTUALENVS_IN_PROJECT=1 POETRY_NO_INTERACTION=1",
+            f"COPY pyproject.toml{lock} ./",
+            "RUN poetry install --only main --no-root",
+        ]
+    elif exists("requirements.txt"):
+        stack = "python-pip"
+        install = [
+            "RUN python -m venv /app/.venv",
+            'ENV PATH="/app/.venv/bin:$PATH"',
+            "COPY requirements.txt ./",
+            "RUN pip install -r requirements.txt",
+        ]
+    elif "project" in pyproject or exists("setup.py"):
+        stack = "python-pip"
+        install = [
+            "RUN python -m venv /app/.venv",
+            'ENV PATH="/app/.venv/bin:$PATH"',
+            # Outside /app, so a host .venv in the context can't replace ours
+            "COPY . /src",
+            "RUN pip install /src",
+        ]
+    else:
+        return None
+
+    dependencies = _python_dependencies(service_dir, pyproject)
+    command = _python_command(service_dir, dependencies)
+    if command is None:
+        return None
+    image = "python:" + _get_latest_docker_image_tag(
+        "python", _python_version(pyproject) or svc.get("version")
+    )
+    content = _lines(
+        f"FROM {image} AS build",
+        "WORKDIR /app",
+        "ENV PIP_NO_CACHE_DIR=1 PIP_DISABLE_PIP_VERSION_CHECK=1",
+        *install,
+        "",
+        f"FROM {image}",
+        "WORKDIR /app",
+        'ENV PATH="/app/.venv/bin:$PATH" PYTHONUNBUFFERED=1 PYTHONDONTWRITEBYTECODE=1',
+        "RUN useradd --create-home --uid 10001 app",
+        # Sources first: the venv built above wins over any host .venv
+        "COPY --chown=app:app . .",
+        "COPY --from=build /app/.venv /app/.venv",
+        "USER app",
+        f"EXPOSE {PYTHON_WEB_PORT}" if command[0] != "python" else None,
+        f"CMD {_exec_form(command)}",
+    )
+    return {"stack": stack, "content": content}
+
+
+# --- Node ---
+
+
+def _node_command(service_dir: str, package: dict) -> Optional[List[str]]:
+    start = (package.get("scripts") or {}).get("start")
+    if isinstance(start, str):
+        match = re.fullmatch(r"node\s+([\w./-]+)", start.strip())
+        return ["node", match.group(1)] if match else ["npm", "start"]
+    candidates = [package.get("main"), "server.js", "index.js"]
+    for entry in candidates:
+        if isinstance(entry, str) and os.path.isfile(os.path.join(service_dir, entry)):
+            return ["node", entry]
+    return None
+
+
+def render_node(svc: dict, service_dir: str) -> Optional[Dict[str, str]]:
+    def exists(name: str) -> bool:
+        return os.path.isfile(os.path.join(service_dir, name))
+
+    try:
+        package = json.loads(_read(os.path.join(service_dir, "package.json")))
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(package, dict):
+        return None
+
+    if exists("pnpm-lock.yaml"):
+        manager, lock = "pnpm", "pnpm-lock.yaml"
+        install = "pnpm install --frozen-lockfile"
+        prune = "pnpm prune --prod"
+    elif exists("yarn.lock"):
+        if exists(".yarnrc.yml"):
+            return None  # Yarn Berry: plugins and PnP vary too much per project
+        manager, lock = "yarn", "yarn.lock"
+        install = "yarn install --frozen-lockfile"
+        prune = "yarn install --frozen-lockfile --production --ignore-scripts"
+    elif exists("package-lock.json"):
+        manager, lock = "npm", "package-lock.json"
+        install, prune = "npm ci", "npm prune --omit=dev"
+    else:
+        manager, lock = "npm", None
+        install, prune = "npm install", "npm prune --omit=dev"
+
+    command = _node_command(service_dir, package)
+    if command is None:
+        return None
+    build = "build" in (package.get("scripts") or {})
+    dependencies = set(package.get("dependencies") or {})
+    image = "node:" + _get_latest_docker_image_tag(
+        "node", (package.get("engines") or {}).get("node") or svc.get("version")
+    )
+    # Every stage starts from this one, so pnpm (via corepack) is on the PATH
+    # wherever it is called.
+    content = _lines(
+        f"FROM {image} AS base",
+        "WORKDIR /app",
+        "RUN corepack enable" if manager == "pnpm" else None,
+        "",
+        "FROM base AS deps",
+        f"COPY package.json {lock} ./" if lock else "COPY package.json ./",
+        f"RUN {install}",
+        "",
+        "FROM base AS build",
+        # Sources first: the installed node_modules win over any host copy
+        "COPY . .",
+        "COPY --from=deps /app/node_modules ./node_modules",
+        f"RUN {manager} run build" if build else None,
+        f"RUN {prune}",
+        "",
+        "FROM base",
+        "ENV NODE_ENV=production",
+        "COPY --from=build --chown=node:node /app ./",
+        "USER node",
+        f"EXPOSE {NODE_WEB_PORT}" if dependencies & NODE_WEB_FRAMEWORKS else None,
+        f"CMD {_exec_form(command)}",
+    )
+    return {"stack": f"node-{manager}", "content": content}
+
+
+# --- Go ---
+
+
+def _go_package(service_dir: str) -> Optional[str]:
+    """The main package to build: the module root or a single ``cmd/*``."""
+    if os.path.isfile(os.path.join(service_dir, "main.go")):
+        return "."
+    cmd_dir = os.path.join(service_dir, "cmd")
+    commands = (
+        [
+            d
+            for d in sorted(os.listdir(cmd_dir))
+            if os.path.isfile(os.path.join(cmd_dir, d, "main.go"))
+        ]
+        if os.path.isdir(cmd_dir)
+        else []
+    )
+    return f"./cmd/{commands[0]}" if len(commands) == 1 else None
+
+
+def render_go(svc: dict, service_dir: str) -> Optional[Dict[str, str]]:
+    go_mod = _read(os.path.join(service_dir, "go.mod"))
+    if go_mod is None or any(m in go_mod for m in CGO_MODULES):
+        return None
+    package = _go_package(service_dir)
+    if package is None:
+        return None
+    declared = re.search(r"^go\s+(\d+\.\d+)", go_mod, re.MULTILINE)
+    image = "golang:" + _get_latest_docker_image_tag(
+        "golang", declared.group(1) if declared else svc.get("version")
+    )
+    has_sum = os.path.isfile(os.path.join(service_dir, "go.sum"))
+    content = _lines(
+        f"FROM {image} AS build",
+        "WORKDIR /src",
+        "COPY go.mod go.sum ./" if has_sum else "COPY go.mod ./",
+        "RUN go mod download",
+        "COPY . .",
+        'RUN CGO_ENABLED=0 go build -trimpath -ldflags="-s -w" '
+        f"-o /out/app {package}",
+        "",
+        "FROM gcr.io/distroless/static-debian12:nonroot",
+        "COPY --from=build /out/app /app",
+        "USER nonroot:nonroot",
+        'ENTRYPOINT ["/app"]',
+    )
+    return {"stack": "go", "content": content}
+
+
+RENDERERS: Dict[str, Callable[[dict, str], Optional[Dict[str, str]]]] = {
+    **{name: render_python for name in PYTHON_MANIFESTS},
+    **{name: render_node for name in NODE_MANIFESTS},
+    **{name: render_go for name in GO_MANIFESTS},
+}
+
+
+def _declared_version(language: str, service_dir: str) -> Optional[str]:
+    """The runtime version the service's own manifest declares, if any."""
+    if language == "python":
+        try:
+            pyproject = tomllib.loads(
+                _read(os.path.join(service_dir, "pyproject.toml")) or ""
+            )
+        except tomllib.TOMLDecodeError:
+            return None
+        return _python_version(pyproject)
+    if language == "node":
+        try:
+            package = json.loads(_read(os.path.join(service_dir, "package.json")))
+        except (TypeError, ValueError):
+            return None
+        engines = package.get("engines") if isinstance(package, dict) else None
+        version = (engines or {}).get("node") if isinstance(engines, dict) else None
+        return version if isinstance(version, str) else None
+    declared = re.search(
+        r"^go\s+(\d+\.\d+)",
+        _read(os.path.join(service_dir, "go.mod")) or "",
+        re.MULTILINE,
+    )
+    return declared.group(1) if declared else None
+
+
+def detect_service(manifest: dict, project_dir: str) -> Optional[dict]:
+    """
+    The service behind a manifest the templates cover, in the shape
+    ``detect_services_and_versions`` returns, read from the manifests
+    themselves rather than asked of the LLM. None for other manifests.
+    """
+    path = manifest.get("path") or ""
+    filename = os.path.basename(path)
+    if filename in PYTHON_MANIFESTS:
+        language = "python"
+    elif filename in NODE_MANIFESTS:
+        language = "node"
+    elif filename in GO_MANIFESTS:
+        language = "go"
+    else:
+        return None
+    service_path = os.path.dirname(path)
+    return {
+        "name": os.path.basename(service_path) or "root_service",
+        "path": service_path,
+        "language": language,
+        "manifest_path": path,
+        "manifest_content": manifest.get("content", ""),
+        "version": _declared_version(language, os.path.join(project_dir, service_path)),
+    }
+
+
+def render_dockerfile(svc: dict, project_dir: str) -> Optional[Dict[str, str]]:
+    """
+    ``{"stack", "content"}`` of a template Dockerfile for ``svc``, or None
+    if its stack isn't one the templates cover.
+    """
+    manifest = os.path.basename(svc.get("manifest_path") or "")
+    renderer = RENDERERS.get(manifest)
+    if renderer is None:
+        return None
+    service_dir = os.path.join(project_dir, svc.get("path", ""))
+    rendered = renderer(svc, service_dir)
+    if rendered is None:
+        logger.info(f"No template matches '{svc.get('name')}' ({manifest}).")
+    return rendered
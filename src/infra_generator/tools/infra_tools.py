@@ -1,7 +1,8 @@
 import json
 import logging
 import os
-from typing import Any, Dict
+import re
+from typing import Any, Dict, List, Tuple
 
 # Langchain and LLM components
 from langchain.tools import BaseTool
@@ -10,7 +11,6 @@ from langchain_core.prompts import (
     HumanMessagePromptTemplate,
     SystemMessagePromptTemplate,
 )
-from langchain_ollama import ChatOllama
 
 # Import the structured prompt templates we created
 from ..prompt_templates import (
@@ -18,19 +18,60 @@ from ..prompt_templates import (
     DOCKER_COMPOSE_USER_PROMPT,
     DOCKERFILE_SYSTEM_PROMPT,
     DOCKERFILE_USER_PROMPT,
+    REPAIR_SYSTEM_PROMPT,
+    REPAIR_USER_PROMPT,
+)
+from ..llm_client import get_chat_model
+from ..llm_usage import extract_usage
+from ..tracing import span
+from ..tree_summary import summarize_tree
+from ..validation import (
+    strip_code_fences,
+    tree_checker,
+    validate_compose,
+    validate_dockerfile,
+    validate_with_repair,
 )
 
 logger = logging.getLogger(__name__)
 
 # --- Helper Functions ---
 
+# Official base image for each detected service language.
+LANGUAGE_IMAGES = {
+    "python": "python",
+    "node": "node",
+    "javascript": "node",
+    "typescript": "node",
+    "go": "golang",
+    "golang": "golang",
+}
+
 
-def _get_latest_docker_image_tag(image_name: str) -> str:
+def _get_latest_docker_image_tag(image_name: str, version: str = None) -> str:
     """
-    Helper to get a default stable tag for common service images.
-    In a real system, this could be expanded to parse versions from service context.
+    Helper to get a default stable tag for common service images. Language
+    images take the project's version when one was detected (e.g. "3.11"
+    for python, "20" for node) and it pins one: a bare version or an
+    ``==``, ``~=``, ``^`` or ``~`` constraint. Lower bounds such as
+    ``>=3.8`` (and ranges) get the default tag, not an end-of-life image.
     """
+    match = re.fullmatch(
+        r"\s*(?:==|~=|\^|~|=)?\s*v?(\d+(?:\.\d+)?)(?:\.[\dx*]+)*\s*",
+        str(version or ""),
+    )
+    if match:
+        version = match.group(1)
+        if image_name == "python" and "." in version:
+            return f"{version}-slim"
+        if image_name == "node":
+            return f"{version.split('.')[0]}-alpine"
+        if image_name == "golang" and "." in version:
+            return f"{version}-alpine"
     latest_tags = {
+        "python": "3.12-slim",
+        "node": "20-alpine",
+        "golang": "1.22-alpine",
         "postgres": "16-alpine",
         "redis": "7-alpine",
         "mysql": "8.0",
@@ -39,19 +80,23 @@ def _get_latest_docker_image_tag(image_name: str) -> str:
     return latest_tags.get(image_name, "latest")
 
 
+def _base_image(svc: dict) -> str:
+    """Pinned base image for a service, e.g. "python:3.11-slim"."""
+    language = str(svc.get("language") or "generic").lower()
+    image = LANGUAGE_IMAGES.get(language, language)
+    return f"{image}:{_get_latest_docker_image_tag(image, svc.get('version'))}"
+
+
 def _invoke_llm(
-    system_prompt: str, user_prompt: str, context: dict, config: dict
-) -> str:
+    system_prompt: str, user_prompt: str, context: dict, config: dict, template: str
+) -> Tuple[str, Dict[str, Any]]:
     """
     A standardized function to invoke the language model, passing templates
-    and context separately to avoid formatting errors.
+    and context separately to avoid formatting errors. Returns the content and
+    Ollama's usage counters for the call.
     """
     logger.info("Invoking LLM for infrastructure generation...")
-    llm = ChatOllama(
-        base_url=config["ollama_base_url"],
-        model=config["models"]["qna_model"],
-        temperature=config.get("temperature", 0.05),
-    )
+    llm = get_chat_model(config, temperature=config.get("temperature", 0.05))
 
     chat_prompt = ChatPromptTemplate.from_messages(
         [
@@ -63,10 +108,48 @@ def _invoke_llm(
     chain = chat_prompt | llm
 
     # Safely invoke the chain with the context dictionary
-    response = chain.invoke(context)
+    with span(template, cat="llm", model=config["models"]["qna_model"]) as s:
+        response = chain.invoke(context)
+        usage = extract_usage(response, template)
+        s.set(**{k: v for k, v in usage.items() if k != "template"})
 
     logger.info("LLM invocation complete.")
-    return response.content.strip()
+    return response.content.strip(), usage
+
+
+def _validate_and_repair(
+    content: str, validate, artifact_name: str, config: dict, template: str
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Strip markdown fences, validate, and send the artifact back with just the
+    validator's findings for up to ``repair_attempts`` short repair calls.
+    Returns the content and the artifact fields describing the outcome.
+    """
+    usages = []
+
+    def repair(current: str, problems: List[str]) -> str:
+        fixed, usage = _invoke_llm(
+            REPAIR_SYSTEM_PROMPT,
+            REPAIR_USER_PROMPT,
+            {
+                "artifact_name": artifact_name,
+                "content": current,
+                "problems": "\n".join(f"- {p}" for p in problems),
+            },
+            config,
+            template=f"{template}_repair",
+        )
+        usages.append(usage)
+        return strip_code_fences(fixed)
+
+    content, problems, _ = validate_with_repair(
+        strip_code_fences(content),
+        validate,
+        repair,
+        attempts=config.get("repair_attempts", 2),
+        name=artifact_name,
+    )
+    return content, {"validation_errors": problems, "repair_usage": usages}
 
 
 # --- Refactored Tools ---
@@ -76,7 +159,8 @@ class DockerfileServiceTool(BaseTool):
     name: str = "generate_service_dockerfile"
     description: str = (
         "Generate a production-ready Dockerfile for one service using RAG context and best-practice templates. "
-        "Input JSON must include keys: service, summary, tree, code_context, config."
+        "Input JSON must include keys: service, summary, tree, code_context, config; "
+        "optionally repo_tree, the full file list COPY sources are checked against."
     )
 
     def _run(self, input_json: str) -> str:
@@ -91,26 +175,48 @@ class DockerfileServiceTool(BaseTool):
         context = {
             "project_name": svc.get("name", "unknown-service"),
             "summary": data.get("summary", "No summary provided."),
-            "tree": "\n".join(data.get("tree", [])),
-            "tree_list": data.get("tree_list", "[]"),
+            # Compact, budgeted tree centred on this service's directory
+            "tree": summarize_tree(
+                data.get("tree", []),
+                max_tokens=data["config"].get("tree_token_budget", 2000),
+                focus=svc.get("path"),
+            ),
             "manifest_content": svc.get("manifest_content", "Manifest not found."),
             # Assuming the agent provides these context keys
             "entrypoint_content": data.get("code_context", ""),
             "other_relevant_snippets": "",  # Can be enriched by the agent if needed
-            # Use a default tag, as service-specific version detection is complex
-            "latest_base_image_tag": f"{svc.get('language', 'generic')}:latest",
+            "latest_base_image_tag": _base_image(svc),
         }
 
         # 2. Invoke the LLM using the helper and our templates
-        dockerfile = _invoke_llm(
-            DOCKERFILE_SYSTEM_PROMPT, DOCKERFILE_USER_PROMPT, context, data["config"]
+        dockerfile, usage = _invoke_llm(
+            DOCKERFILE_SYSTEM_PROMPT,
+            DOCKERFILE_USER_PROMPT,
+            context,
+            data["config"],
+            template="dockerfile",
         )
 
-        # 3. Format the output artifact
+        # 3. Check it locally; only the problems go back for repair
         service_path = svc.get("path", "")
+        exists = tree_checker(
+            data.get("repo_tree") or data.get("tree", []),
+            data["config"].get("exclude_patterns", []),
+        )
+        dockerfile, outcome = _validate_and_repair(
+            dockerfile,
+            lambda content: validate_dockerfile(content, service_path, exists),
+            os.path.join(service_path, "Dockerfile"),
+            data["config"],
+            template="dockerfile",
+        )
+
+        # 4. Format the output artifact
         artifact = {
             "path": os.path.join(service_path, "Dockerfile"),
             "content": dockerfile,
+            "llm_usage": usage,
+            **outcome,
         }
         return json.dumps(artifact)
 
@@ -136,13 +242,16 @@ class ComposeTool(BaseTool):
         context = {
             "project_name": data.get("project_name", "multi-service-project"),
             "summary": data.get("summary", "No summary provided."),
-            "tree": "\n".join(data.get("tree", [])),
+            "tree": summarize_tree(
+                data.get("tree", []),
+                max_tokens=data["config"].get("tree_token_budget", 2000),
+            ),
             # Pass the manifest/entrypoint content of the *first* service as a representative example
-            "manifest_content": data["services"][0].get(
-                "manifest_content", "Manifest not found."
-            )
-            if data.get("services")
-            else "",
+            "manifest_content": (
+                data["services"][0].get("manifest_content", "Manifest not found.")
+                if data.get("services")
+                else ""
+            ),
             "entrypoint_content": data.get("repo_code_context", ""),
             "other_relevant_snippets": "",
             # Provide fresh tags for common services
@@ -151,15 +260,30 @@ class ComposeTool(BaseTool):
         }
 
         # 2. Invoke the LLM with the compose templates
-        compose_yml = _invoke_llm(
+        compose_yml, usage = _invoke_llm(
             DOCKER_COMPOSE_SYSTEM_PROMPT,
             DOCKER_COMPOSE_USER_PROMPT,
             context,
             data["config"],
+            template="compose",
+        )
+
+        # 3. Check it locally; only the problems go back for repair
+        compose_yml, outcome = _validate_and_repair(
+            compose_yml,
+            validate_compose,
+            "docker-compose.yml",
+            data["config"],
+            template="compose",
         )
 
-        # 3. Format the output artifact
-        artifact = {"path": "docker-compose.yml", "content": compose_yml}
+        # 4. Format the output artifact
+        artifact = {
+            "path": "docker-compose.yml",
+            "content": compose_yml,
+            "llm_usage": usage,
+            **outcome,
+        }
         return json.dumps(artifact)
 
     async def _arun(self, input_json: str) -> str:
@@ -0,0 +1,175 @@
+import itertools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class Span:
+    """A timed operation with attributes. Times are perf_counter nanoseconds."""
+
+    __slots__ = (
+        "id",
+        "parent_id",
+        "name",
+        "cat",
+        "attrs",
+        "start_ns",
+        "end_ns",
+        "thread_id",
+        "thread_name",
+    )
+
+    def __init__(
+        self, span_id: int, parent_id: Optional[int], name: str, cat: str, attrs: dict
+    ):
+        self.id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.cat = cat
+        self.attrs = attrs
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: Optional[int] = None
+        thread = threading.current_thread()
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self) -> float:
+        end = self.end_ns if self.end_ns is not None else time.perf_counter_ns()
+        return (end - self.start_ns) / 1e9
+
+
+class Tracer:
+    """
+    Collects nested spans in memory. Each thread keeps its own stack of open
+    spans, so a span's parent is whatever span was open on the same thread;
+    work handed to another thread can pass ``parent`` explicitly.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+        self.spans: List[Span] = []
+        self.epoch_ns = time.perf_counter_ns()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spans = []
+            self.epoch_ns = time.perf_counter_ns()
+
+    def _stack(self) -> List[Span]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self) -> Optional[Span]:
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def span(
+        self, name: str, cat: str = "app", parent: Optional[Span] = None, **attrs: Any
+    ) -> Iterator[Span]:
+        stack = self._stack()
+        if parent is None and stack:
+            parent = stack[-1]
+        span = Span(
+            next(self._ids), parent.id if parent else None, name, cat, dict(attrs)
+        )
+        stack.append(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attrs["error"] = repr(e)
+            raise
+        finally:
+            span.end_ns = time.perf_counter_ns()
+            stack.pop()
+            with self._lock:
+                self.spans.append(span)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Finished spans as Chrome trace events (chrome://tracing, Perfetto)."""
+        pid = os.getpid()
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.start_ns)
+        events: List[Dict[str, Any]] = []
+        threads = {}
+        for span in spans:
+            threads.setdefault(span.thread_id, span.thread_name)
+            args = dict(span.attrs)
+            args["span_id"] = span.id
+            if span.parent_id is not None:
+                args["parent_id"] = span.parent_id
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.cat,
+                    "ph": "X",
+                    "ts": (span.start_ns - self.epoch_ns) / 1000,
+                    "dur": (span.end_ns - span.start_ns) / 1000,
+                    "pid": pid,
+                    "tid": span.thread_id,
+                    "args": args,
+                }
+            )
+        for tid, thread_name in threads.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": thread_name},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    def summary(self) -> List[str]:
+        """
+        A fixed-width table of span count and total/mean/max seconds per
+        (category, name), stages first, then by total time.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        groups: Dict[tuple, List[float]] = {}
+        for span in spans:
+            groups.setdefault((span.cat, span.name), []).append(span.duration)
+        rows = sorted(
+            groups.items(), key=lambda item: (item[0][0] != "stage", -sum(item[1]))
+        )
+        width = max([len(f"{cat}:{name}") for cat, name in groups] + [4])
+        lines = [
+            f"{'span':<{width}}  {'count':>6}  {'total':>8}  {'mean':>8}  {'max':>8}"
+        ]
+        for (cat, name), durations in rows:
+            total = sum(durations)
+            lines.append(
+                f"{cat + ':' + name:<{width}}  {len(durations):>6}  {total:>7.2f}s  "
+                f"{total / len(durations):>7.2f}s  {max(durations):>7.2f}s"
+            )
+        return lines
+
+
+TRACER = Tracer()
+
+
+def span(name: str, cat: str = "app", parent: Optional[Span] = None, **attrs: Any):
+    """Open a span on the process-wide tracer."""
+    return TRACER.span(name, cat=cat, parent=parent, **attrs)
+
+
+def current_span() -> Optional[Span]:
+    return TRACER.current()
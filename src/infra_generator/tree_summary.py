@@ -0,0 +1,238 @@
+import heapq
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .project_context import ENTRYPOINT_FILENAMES, MANIFEST_FILENAMES
+from .shards import owning_service
+
+# Files that decide how a service is built and run. They are always surfaced,
+# even inside collapsed directories.
+BUILD_FILENAMES = (
+    set(MANIFEST_FILENAMES)
+    | set(ENTRYPOINT_FILENAMES)
+    | {
+        "Dockerfile",
+        "docker-compose.yml",
+        "docker-compose.yaml",
+        ".dockerignore",
+        "Makefile",
+        "Procfile",
+        "Pipfile.lock",
+        "uv.lock",
+        "package-lock.json",
+        "pnpm-lock.yaml",
+        "tsconfig.json",
+        ".python-version",
+        ".nvmrc",
+    }
+)
+
+MAX_FILES_PER_DIR = 20
+MAX_FILES_IN_FOCUS = 50
+MAX_PINNED_HINTS = 3
+# Stop trying to expand directories after this many consecutive misses.
+MAX_FAILED_EXPANSIONS = 50
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) used for prompt budgets."""
+    return len(text) // 4 + 1
+
+
+class _Dir:
+    __slots__ = ("name", "path", "depth", "dirs", "files", "file_count", "pinned")
+
+    def __init__(self, name: str, path: str, depth: int):
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.dirs: Dict[str, "_Dir"] = {}
+        self.files: List[str] = []
+        self.file_count = 0
+        self.pinned: List[str] = []
+
+
+def _build(paths: Iterable[str]) -> _Dir:
+    root = _Dir("", "", 0)
+    for raw in paths:
+        parts = [p for p in raw.replace("\\", "/").split("/") if p and p != "."]
+        if not parts:
+            continue
+        node = root
+        for part in parts[:-1]:
+            child = node.dirs.get(part)
+            if child is None:
+                path = f"{node.path}/{part}" if node.path else part
+                child = _Dir(part, path, node.depth + 1)
+                node.dirs[part] = child
+            node = child
+        node.files.append(parts[-1])
+    _count(root)
+    return root
+
+
+def _count(node: _Dir) -> None:
+    node.files.sort()
+    pinned = [f for f in node.files if f in BUILD_FILENAMES]
+    count = len(node.files)
+    for name in sorted(node.dirs):
+        child = node.dirs[name]
+        _count(child)
+        count += child.file_count
+        pinned.extend(f"{name}/{p}" for p in child.pinned)
+    node.file_count = count
+    # Shallow build files first; they are the most informative hints.
+    node.pinned = sorted(pinned, key=lambda p: (p.count("/"), p))[:MAX_PINNED_HINTS]
+
+
+def _on_focus_path(path: str, focus: str) -> bool:
+    """True for ``focus`` itself, its ancestors and its descendants."""
+    return bool(focus) and (
+        path == focus or path.startswith(focus + "/") or focus.startswith(path + "/")
+    )
+
+
+def _render(root: _Dir, expanded: set, partial: set, focus: str) -> str:
+    lines: List[str] = []
+
+    def walk(node: _Dir, indent: str) -> None:
+        hidden_dirs = hidden_files = 0
+        for name in sorted(node.dirs):
+            child = node.dirs[name]
+            if node.path in partial and not _on_focus_path(child.path, focus):
+                hidden_dirs += 1
+                hidden_files += child.file_count
+            elif child.path in expanded:
+                lines.append(f"{indent}{name}/")
+                walk(child, indent + "  ")
+            else:
+                hint = f"{child.file_count} files"
+                if child.pinned:
+                    hint += "; " + ", ".join(child.pinned)
+                lines.append(f"{indent}{name}/ ({hint})")
+        limit = (
+            MAX_FILES_IN_FOCUS if focus and node.path == focus else MAX_FILES_PER_DIR
+        )
+        if node.path not in partial and len(node.files) <= limit:
+            lines.extend(f"{indent}{f}" for f in node.files)
+        else:
+            shown = [f for f in node.files if f in BUILD_FILENAMES]
+            lines.extend(f"{indent}{f}" for f in shown)
+            hidden_files += len(node.files) - len(shown)
+        if hidden_dirs:
+            lines.append(
+                f"{indent}... ({hidden_dirs} more dirs, {hidden_files} more files)"
+            )
+        elif hidden_files:
+            lines.append(f"{indent}... ({hidden_files} more files)")
+
+    walk(root, "")
+    return "\n".join(lines)
+
+
+def _find(root: _Dir, path: str) -> List[_Dir]:
+    """Return the chain of nodes from ``root`` down to ``path`` (empty if absent)."""
+    chain = [root]
+    for part in path.split("/"):
+        child = chain[-1].dirs.get(part)
+        if child is None:
+            return []
+        chain.append(child)
+    return chain
+
+
+def summarize_tree(
+    paths: Iterable[str], max_tokens: int = 2000, focus: Optional[str] = None
+) -> str:
+    """
+    Render a compact, indented file tree that fits in ``max_tokens``.
+
+    Directories start collapsed to a single ``name/ (N files; hints)`` line and
+    are expanded greedily: first ``focus`` (the service being built) and its
+    subtree, then the siblings along the path to it, then directories holding
+    build-relevant files, then the rest, shallowest first. Build files such as
+    manifests, lockfiles and entrypoints stay visible as hints even when their
+    directory is collapsed.
+    """
+    root = _build(paths)
+    focus = (focus or "").strip("/")
+    chain = _find(root, focus) if focus not in ("", ".") else []
+    if not chain:
+        focus = ""
+
+    def priority(node: _Dir) -> tuple:
+        rank = 0 if _on_focus_path(node.path, focus) else (2 if node.pinned else 3)
+        return (rank, node.depth, node.file_count, node.path)
+
+    def worth_expanding(node: _Dir) -> bool:
+        # A leaf directory with more files than we would list (and no build
+        # files to show) renders as "... (N more files)", which says less than
+        # its collapsed line.
+        limit = MAX_FILES_IN_FOCUS if node.path == focus else MAX_FILES_PER_DIR
+        return bool(node.dirs) or bool(node.pinned) or len(node.files) <= limit
+
+    expanded: set = set()
+    # Ancestors of the focus list only the branch leading to it until the
+    # budget allows listing their other entries too.
+    partial: set = set()
+    heap: list = []
+    if focus:
+        for ancestor in chain[:-1]:
+            expanded.add(ancestor.path)
+            partial.add(ancestor.path)
+            heap.append(((1, ancestor.depth, 0, ancestor.path), "full", ancestor))
+        heap.append((priority(chain[-1]), "expand", chain[-1]))
+    else:
+        heap.extend((priority(d), "expand", d) for d in root.dirs.values())
+    heapq.heapify(heap)
+
+    rendered = _render(root, expanded, partial, focus)
+    failures = 0
+    while heap and failures < MAX_FAILED_EXPANSIONS:
+        _, kind, node = heapq.heappop(heap)
+        if kind == "full":
+            partial.discard(node.path)
+        elif worth_expanding(node):
+            expanded.add(node.path)
+        else:
+            continue
+        candidate = _render(root, expanded, partial, focus)
+        if estimate_tokens(candidate) > max_tokens:
+            if kind == "full":
+                partial.add(node.path)
+            else:
+                expanded.discard(node.path)
+            failures += 1
+            continue
+        failures = 0
+        rendered = candidate
+        for child in node.dirs.values():
+            if kind == "expand" or not _on_focus_path(child.path, focus):
+                heapq.heappush(heap, (priority(child), "expand", child))
+
+    if estimate_tokens(rendered) > max_tokens:
+        # Even the most collapsed view is too large; keep the head of it.
+        rendered = rendered[: max_tokens * 4].rsplit("\n", 1)[0]
+        rendered += "\n... (tree truncated)"
+    return rendered
+
+
+def service_scope(
+    service: dict, services: Iterable[dict], paths: Iterable[str]
+) -> Tuple[str, List[str]]:
+    """
+    The summary and file list a service's Dockerfile prompt is built from:
+    the files under the service's directory, less those of services nested
+    in it. Files elsewhere in the repository don't show up, so changing them
+    leaves the prompt (and its fingerprint) as it was.
+    """
+    own = service.get("path") or ""
+    dirs = [s.get("path") for s in services if s.get("path")]
+    if own and own not in dirs:
+        dirs.append(own)
+    files = [p for p in paths if owning_service(p, dirs) == own]
+    summary = (
+        f"Service: {service.get('name')}\n"
+        f"Directory: {own or '.'}\n"
+        f"Files analyzed: {len(files)}"
+    )
+    return summary, files
@@ -0,0 +1,132 @@
+import math
+import mmap
+import os
+from collections import Counter
+from typing import Optional
+
+from .repo_snapshot import SnapshotFile
+
+# Basename suffixes of files emitted by code generators and bundlers.
+GENERATED_SUFFIXES = (
+    "_pb2.py",
+    "_pb2_grpc.py",
+    ".pb.go",
+    "_grpc.pb.go",
+    "_pb.js",
+    "_pb.ts",
+    "_grpc_pb.js",
+    ".gen.go",
+    ".generated.ts",
+    ".generated.js",
+    ".min.js",
+    ".bundle.js",
+)
+
+# Header comments generators leave in the first lines of their output
+# (lowercase).
+GENERATED_MARKERS = (
+    b"code generated by",
+    b"@generated",
+    b"this file was automatically generated",
+    b"this file is auto-generated",
+    b"autogenerated file",
+    b"generated by the protocol buffer compiler",
+    b"openapi-generator",
+    b"swagger-codegen",
+)
+
+# Bytes expected in text files: printable ASCII, whitespace and anything
+# above 0x7f (UTF-8 sequences).
+_TEXT_BYTES = bytes(range(32, 127)) + b"\n\r\t\f\b" + bytes(range(128, 256))
+
+
+def shannon_entropy(data: bytes) -> float:
+    """Bits per byte; source code is typically 4-5.5, encoded blobs near 6+."""
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(n / total * math.log2(n / total) for n in Counter(data).values())
+
+
+def text_entropy(text: str) -> float:
+    """
+    Bits per character, counting every non-ASCII character as one symbol:
+    encoded blobs are ASCII, while UTF-8 prose (CJK docs and strings) would
+    otherwise look random.
+    """
+    return shannon_entropy(text.encode("ascii", errors="replace"))
+
+
+class FileTriage:
+    """
+    Decides, before a file is read in full, whether it is worth chunking and
+    embedding. Files over ``max_file_bytes`` are skipped from their size
+    alone; otherwise only the first ``sniff_bytes`` (binary check) and
+    ``sample_bytes`` (generated/minified checks) are looked at through a
+    memory map. ``check`` returns the reason to skip a file, or None.
+
+    The minified and entropy rules look at the decoded sample and only apply
+    to samples of at least ``min_rule_chars`` characters (the entropy rule
+    also needs ``min_entropy_lines`` lines), so short one-line configs and
+    ``.env`` files aren't skipped.
+    """
+
+    def __init__(
+        self,
+        max_file_bytes: int = 1_000_000,
+        sniff_bytes: int = 1024,
+        sample_bytes: int = 16384,
+        max_mean_line_length: float = 200,
+        max_entropy: float = 5.9,
+        min_rule_chars: int = 1024,
+        min_entropy_lines: int = 10,
+    ):
+        self.max_file_bytes = max_file_bytes
+        self.sniff_bytes = sniff_bytes
+        self.sample_bytes = sample_bytes
+        self.max_mean_line_length = max_mean_line_length
+        self.max_entropy = max_entropy
+        self.min_rule_chars = min_rule_chars
+        self.min_entropy_lines = min_entropy_lines
+
+    @classmethod
+    def from_config(cls, config: dict) -> "FileTriage":
+        triage = config.get("triage", {})
+        return cls(
+            max_file_bytes=triage.get("max_file_bytes", 1_000_000),
+            sniff_bytes=triage.get("sniff_bytes", 1024),
+            sample_bytes=triage.get("sample_bytes", 16384),
+            max_mean_line_length=triage.get("max_mean_line_length", 200),
+            max_entropy=triage.get("max_entropy", 5.9),
+            min_rule_chars=triage.get("min_rule_chars", 1024),
+            min_entropy_lines=triage.get("min_entropy_lines", 10),
+        )
+
+    def check(self, source_file: SnapshotFile) -> Optional[str]:
+        if source_file.size > self.max_file_bytes:
+            return "too large"
+        if os.path.basename(source_file.path).lower().endswith(GENERATED_SUFFIXES):
+            return "generated"
+        if source_file.size == 0:
+            return None
+        try:
+            with open(source_file.abs_path, "rb") as f:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    head = mapped[: self.sniff_bytes]
+                    sample = mapped[: self.sample_bytes]
+        except (OSError, ValueError):
+            return "unreadable"
+        if b"\0" in head or len(head.translate(None, _TEXT_BYTES)) > len(head) * 0.3:
+            return "binary"
+        if any(marker in sample[:512].lower() for marker in GENERATED_MARKERS):
+            return "generated"
+        # The sample may end inside a multi-byte character
+        text = sample.decode("utf-8", errors="ignore")
+        if len(text) < self.min_rule_chars:
+            return None
+        lines = text.count("\n") + 1
+        if len(text) / lines > self.max_mean_line_length:
+            return "minified"
+        if lines >= self.min_entropy_lines and text_entropy(text) > self.max_entropy:
+            return "high entropy"
+        return None
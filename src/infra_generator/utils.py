@@ -1,8 +1,9 @@
 # utils.py
 import os
+import sys
+from importlib import resources
 from typing import Optional
 
-import pkg_resources
 import yaml
 
 
@@ -25,24 +26,18 @@ def load_config(custom_config_path: Optional[str] = None) -> dict:
         with open(user_config_path, "r") as f:
             return yaml.safe_load(f)
 
-    # Path 3: Default package config
+    # Path 3: Default package config, read via importlib.resources (works for
+    # installed packages and source checkouts alike)
     try:
-        # This reads the config bundled with the package
-        default_config_str = pkg_resources.resource_string(
-            "infra_generator", "config.yaml"
+        default_config_str = (
+            resources.files("infra_generator").joinpath("config.yaml").read_text()
         )
-        return yaml.safe_load(default_config_str)
-    except (pkg_resources.DistributionNotFound, FileNotFoundError):
-        # Fallback for when the package is not installed (e.g., during development)
-        dev_config_path = os.path.join(os.path.dirname(__file__), "config.yaml")
-        if os.path.exists(dev_config_path):
-            with open(dev_config_path, "r") as f:
-                return yaml.safe_load(f)
-        else:
-            raise FileNotFoundError(
-                "Could not find the default config.yaml. "
-                "Ensure it's in the same directory as this script or the package is installed correctly."
-            )
+    except FileNotFoundError as e:
+        raise FileNotFoundError(
+            "Could not find the default config.yaml. "
+            "Ensure it's in the same directory as this script or the package is installed correctly."
+        ) from e
+    return yaml.safe_load(default_config_str)
 
 
 def list_source_files(directory: str, extensions: list) -> list:
@@ -67,6 +62,17 @@ def get_project_name(project_dir: str) -> str:
     return os.path.basename(os.path.abspath(project_dir))
 
 
+def peak_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process in MB, where the OS reports it."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
 def ensure_dir_exists(path: str):
     if not os.path.exists(path):
         os.makedirs(path)
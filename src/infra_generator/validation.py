@@ -0,0 +1,318 @@
+"""
+In-process checks for generated Dockerfiles and compose files.
+
+Each validator returns a list of human-readable problems (empty when the
+artifact looks fine), phrased so they can be handed back to the model
+verbatim: ``validate_with_repair`` sends just those problems and the
+artifact for a short repair call, a bounded number of times, instead of
+regenerating from scratch.
+"""
+
+import fnmatch
+import json
+import logging
+import posixpath
+import re
+from typing import Callable, Iterable, List, Optional, Tuple
+
+import yaml
+
+from .repo_snapshot import is_excluded
+
+logger = logging.getLogger(__name__)
+
+DOCKERFILE_INSTRUCTIONS = {
+    "ADD",
+    "ARG",
+    "CMD",
+    "COPY",
+    "ENTRYPOINT",
+    "ENV",
+    "EXPOSE",
+    "FROM",
+    "HEALTHCHECK",
+    "LABEL",
+    "MAINTAINER",
+    "ONBUILD",
+    "RUN",
+    "SHELL",
+    "STOPSIGNAL",
+    "USER",
+    "VOLUME",
+    "WORKDIR",
+}
+
+# Instructions whose arguments may be a JSON array (exec form)
+EXEC_FORM = {"CMD", "ENTRYPOINT", "RUN", "SHELL", "VOLUME"}
+
+COMPOSE_TOP_LEVEL_KEYS = {
+    "version",
+    "name",
+    "services",
+    "volumes",
+    "networks",
+    "configs",
+    "secrets",
+}
+
+_PORT = re.compile(
+    r"^(?:(?:\[[0-9a-fA-F:.]+\]|[\d.]+):)?"  # optional host IP
+    r"(?:\d+(?:-\d+)?:)?\d+(?:-\d+)?(?:/(?:tcp|udp|sctp))?$"
+)
+
+
+def strip_code_fences(content: str) -> str:
+    """The text inside a markdown code block, if the model wrapped it in one."""
+    content = content.strip()
+    match = re.match(r"^```[\w.+-]*[ \t]*\n(.*?)\n?```$", content, re.DOTALL)
+    return match.group(1).strip() + "\n" if match else content + "\n"
+
+
+def _unpinned(image: str) -> Optional[str]:
+    """Why ``image`` isn't pinned, or None if it has a tag or digest."""
+    if "@" in image:
+        return None
+    name, _, tag = image.rpartition(":")
+    if not name or "/" in tag:
+        # No colon, or the colon belongs to a registry host:port
+        return "has no tag"
+    if tag == "latest":
+        return "uses the 'latest' tag"
+    return None
+
+
+def _instructions(content: str) -> List[Tuple[int, str, str]]:
+    """``(line number, INSTRUCTION, arguments)``, continuations joined."""
+    result = []
+    pending, start = "", 0
+    for number, raw in enumerate(content.splitlines(), start=1):
+        line = raw.strip()
+        if not pending and (not line or line.startswith("#")):
+            continue
+        if pending and line.startswith("#"):
+            continue
+        if not pending:
+            start = number
+        if line.endswith("\\"):
+            pending += line[:-1] + " "
+            continue
+        pending += line
+        keyword, _, args = pending.partition(" ")
+        result.append((start, keyword.upper(), args.strip()))
+        pending = ""
+    if pending:
+        keyword, _, args = pending.partition(" ")
+        result.append((start, keyword.upper(), args.strip()))
+    return result
+
+
+def tree_checker(
+    tree: Iterable[str], exclude_patterns: Iterable[str] = ()
+) -> Callable[[str], bool]:
+    """
+    A ``path -> exists`` test against the project's file tree. Paths the
+    tree can't know about (excluded ones such as lock files or
+    ``node_modules/``) count as existing.
+    """
+    files = set(tree)
+    dirs = {posixpath.dirname(p) for p in files}
+    for d in list(dirs):
+        while d:
+            d = posixpath.dirname(d)
+            dirs.add(d)
+    patterns = list(exclude_patterns)
+
+    def excluded(path: str) -> bool:
+        parts = path.split("/")
+        for i in range(1, len(parts)):
+            if is_excluded("/".join(parts[:i]), patterns, is_dir=True):
+                return True
+        return is_excluded(path, patterns)
+
+    def exists(path: str) -> bool:
+        path = posixpath.normpath(path)
+        if path in ("", "."):
+            return True
+        if any(c in path for c in "*?["):
+            return any(fnmatch.fnmatch(p, path) for p in files | dirs)
+        return path in files or path in dirs or excluded(path)
+
+    return exists
+
+
+def validate_dockerfile(
+    content: str,
+    context_dir: str = "",
+    exists: Optional[Callable[[str], bool]] = None,
+) -> List[str]:
+    """
+    Problems in a Dockerfile. ``exists`` checks COPY/ADD sources, resolved
+    against ``context_dir`` (the service's directory, relative to the
+    project) or the project root.
+    """
+    instructions = _instructions(content)
+    if not instructions:
+        return ["The Dockerfile is empty."]
+    errors = []
+    stages = set()
+    seen_from = False
+    for number, keyword, args in instructions:
+        where = f"Line {number}"
+        if keyword not in DOCKERFILE_INSTRUCTIONS:
+            errors.append(f"{where}: unknown instruction '{keyword}'.")
+            continue
+        if not seen_from and keyword not in ("FROM", "ARG"):
+            errors.append(f"{where}: {keyword} before the first FROM.")
+        if not args:
+            errors.append(f"{where}: {keyword} has no arguments.")
+            continue
+        if keyword == "FROM":
+            seen_from = True
+            words = [w for w in args.split() if not w.startswith("--")]
+            image = words[0] if words else ""
+            if len(words) >= 3 and words[1].upper() == "AS":
+                stages.add(words[2].lower())
+            if image.lower() in stages or image == "scratch" or "$" in image:
+                continue
+            reason = _unpinned(image)
+            if reason:
+                errors.append(
+                    f"{where}: base image '{image}' {reason}; pin a specific version."
+                )
+        elif keyword in EXEC_FORM and args.startswith("["):
+            try:
+                parsed = json.loads(args)
+            except ValueError:
+                parsed = None
+            if not isinstance(parsed, list) or not all(
+                isinstance(a, str) for a in parsed
+            ):
+                errors.append(
+                    f"{where}: {keyword} exec form must be a JSON array of strings."
+                )
+        elif keyword in ("COPY", "ADD"):
+            errors.extend(_check_sources(where, keyword, args, context_dir, exists))
+    if not seen_from:
+        errors.append("The Dockerfile has no FROM instruction.")
+    return errors
+
+
+def _check_sources(where, keyword, args, context_dir, exists) -> List[str]:
+    words = args.split()
+    if any(w.startswith("--from") for w in words):
+        return []  # copied from another stage or image
+    words = [w for w in words if not w.startswith("--")]
+    if args.lstrip().startswith("["):
+        try:
+            words = json.loads(args)
+        except ValueError:
+            return [f"{where}: {keyword} exec form must be a JSON array of strings."]
+    if len(words) < 2:
+        return [f"{where}: {keyword} needs a source and a destination."]
+    errors = []
+    for source in words[:-1]:
+        if "://" in source or "$" in source:
+            continue
+        path = posixpath.normpath(posixpath.join(context_dir, source))
+        if path == ".." or path.startswith("../"):
+            errors.append(
+                f"{where}: {keyword} source '{source}' is outside the build context."
+            )
+        # The service may also be built with the repository root as context.
+        elif exists is not None and not (
+            exists(path) or exists(posixpath.normpath(source.lstrip("/")))
+        ):
+            errors.append(
+                f"{where}: {keyword} source '{source}' does not exist in the "
+                f"project (looked for '{path}')."
+            )
+    return errors
+
+
+def validate_compose(content: str) -> List[str]:
+    """Problems in a docker-compose file: YAML syntax and basic schema."""
+    try:
+        data = yaml.safe_load(content)
+    except yaml.YAMLError as e:
+        mark = getattr(e, "problem_mark", None)
+        where = f" at line {mark.line + 1}" if mark else ""
+        problem = getattr(e, "problem", None) or str(e)
+        return [f"Invalid YAML{where}: {problem}."]
+    if not isinstance(data, dict):
+        return ["The compose file must be a YAML mapping with a 'services' key."]
+    errors = [
+        f"Unknown top-level key '{key}'."
+        for key in data
+        if key not in COMPOSE_TOP_LEVEL_KEYS and not str(key).startswith("x-")
+    ]
+    services = data.get("services")
+    if not isinstance(services, dict) or not services:
+        return errors + ["'services' must be a non-empty mapping."]
+    declared_volumes = data.get("volumes") or {}
+    for name, service in services.items():
+        where = f"Service '{name}'"
+        if not isinstance(service, dict):
+            errors.append(f"{where} must be a mapping.")
+            continue
+        if "image" not in service and "build" not in service:
+            errors.append(f"{where} has neither 'image' nor 'build'.")
+        image = service.get("image")
+        if isinstance(image, str) and "build" not in service and "$" not in image:
+            reason = _unpinned(image)
+            if reason:
+                errors.append(
+                    f"{where}: image '{image}' {reason}; pin a specific version."
+                )
+        for port in service.get("ports") or []:
+            if isinstance(port, dict) or "$" in str(port):
+                continue
+            if not _PORT.match(str(port)):
+                errors.append(f"{where}: invalid port mapping '{port}'.")
+        depends_on = service.get("depends_on") or []
+        for dependency in depends_on:
+            if dependency not in services:
+                errors.append(f"{where} depends on undefined service '{dependency}'.")
+        for volume in service.get("volumes") or []:
+            if not isinstance(volume, str) or ":" not in volume:
+                continue
+            source = volume.split(":", 1)[0]
+            if source and not source.startswith((".", "/", "~", "$")):
+                if source not in declared_volumes:
+                    errors.append(
+                        f"{where} uses named volume '{source}', which is not "
+                        "declared under top-level 'volumes'."
+                    )
+        environment = service.get("environment")
+        if environment is not None and not isinstance(environment, (dict, list)):
+            errors.append(f"{where}: 'environment' must be a mapping or a list.")
+    return errors
+
+
+def validate_with_repair(
+    content: str,
+    validate: Callable[[str], List[str]],
+    repair: Callable[[str, List[str]], str],
+    attempts: int = 2,
+    name: str = "artifact",
+) -> Tuple[str, List[str], int]:
+    """
+    Validate ``content`` and, while problems remain, ask ``repair`` (given
+    the artifact and its problems) for a fixed version, at most ``attempts``
+    times. Returns the final content, its remaining problems and the number
+    of repair calls made.
+    """
+    errors = validate(content)
+    repairs = 0
+    while errors and repairs < attempts:
+        logger.info(
+            f"{name}: {len(errors)} problem(s) found; repair attempt {repairs + 1}"
+        )
+        content = repair(content, errors)
+        repairs += 1
+        errors = validate(content)
+    if errors:
+        logger.warning(
+            f"{name} still has {len(errors)} problem(s) after {repairs} repair "
+            f"attempt(s): {'; '.join(errors)}"
+        )
+    return content, errors, repairs
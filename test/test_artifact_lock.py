@@ -0,0 +1,138 @@
+import json
+import os
+from collections import Counter
+
+from benchmarks.fake_ollama import FakeOllama, default_reply
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.artifact_lock import (
+    LOCK_FILENAME,
+    compose_fingerprint,
+    dockerfile_fingerprint,
+)
+from infra_generator.infra_agent import run_infra_pipeline
+from infra_generator.utils import load_config
+
+
+def test_unchanged_artifacts_are_not_regenerated(tmp_path):
+    generated = Counter()
+
+    def responder(prompt):
+        reply = default_reply(prompt)
+        if "Manifest filename:" not in prompt:
+            generated["compose" if reply.startswith("services:") else "docker"] += 1
+        return reply
+
+    repo = generate_repo(str(tmp_path / "repo"), files=30, services=2, seed=1)
+    out = str(tmp_path / "infra")
+    with FakeOllama(dim=16, responder=responder) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "chroma_db_dir": str(tmp_path / "chroma"),
+                "stage_cache_dir": str(tmp_path / "stages"),
+            }
+        )
+
+        def run(**kwargs):
+            generated.clear()
+            return run_infra_pipeline(
+                repo["root"], out, config=config, use_llm=True, **kwargs
+            )
+
+        written = run()
+        assert generated == {"docker": 2, "compose": 1}
+        assert len(written) == 3
+        with open(os.path.join(out, LOCK_FILENAME)) as f:
+            lock = json.load(f)["artifacts"]
+        assert set(lock) == {os.path.relpath(p, out) for p in written}
+
+        assert run() == []
+        assert not generated
+
+        # Only the service whose manifest changed is regenerated
+        service = repo["services"][1]
+        with open(os.path.join(repo["root"], service["manifest"]), "a") as f:
+            f.write("\n")
+        written = run()
+        assert generated == {"docker": 1}
+        assert written == [os.path.join(out, service["path"], "Dockerfile")]
+
+        # A deleted artifact is generated again
+        os.remove(written[0])
+        assert run() == written
+
+        # A change the prompt's file tree shows (same size and file count, so
+        # the summary and the embedded code are unchanged) regenerates too
+        service_dir = os.path.join(repo["root"], service["path"])
+        os.rename(
+            os.path.join(service_dir, ".env.example"),
+            os.path.join(service_dir, ".env.sample"),
+        )
+        assert os.path.join(out, service["path"], "Dockerfile") in run()
+
+        # A new file in one service changes the project summary and tree, but
+        # only that service's Dockerfile (and the compose file) is regenerated
+        other = repo["services"][0]
+        with open(os.path.join(repo["root"], other["path"], "NOTES.md"), "w") as f:
+            f.write("notes\n")
+        assert run() == [
+            os.path.join(out, other["path"], "Dockerfile"),
+            os.path.join(out, "docker-compose.yml"),
+        ]
+        assert generated == {"docker": 1, "compose": 1}
+
+        run(regenerate=True)
+        assert generated == {"docker": 2, "compose": 1}
+
+
+def test_rerun_with_output_inside_the_project_regenerates_nothing(tmp_path):
+    generated = Counter()
+
+    def responder(prompt):
+        reply = default_reply(prompt)
+        generated["detect" if "Manifest filename:" in prompt else "generate"] += 1
+        return reply
+
+    repo = generate_repo(str(tmp_path / "repo"), files=30, services=2, seed=1)
+    with FakeOllama(dim=16, responder=responder) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "chroma_db_dir": str(tmp_path / "chroma"),
+                "stage_cache_dir": str(tmp_path / "stages"),
+            }
+        )
+        written = run_infra_pipeline(repo["root"], "infra", config=config, use_llm=True)
+        assert len(written) == 3
+        detected = generated["detect"]
+
+        generated.clear()
+        assert (
+            run_infra_pipeline(repo["root"], "infra", config=config, use_llm=True) == []
+        )
+        # The generated Dockerfiles weren't picked up as new services
+        assert generated == {"detect": detected}
+        assert not os.path.exists(os.path.join(repo["root"], "infra", "infra"))
+
+
+def test_fingerprints_follow_the_prompt_tree_and_summary():
+    config = load_config()
+    service = {"name": "web", "path": "web", "language": "node", "version": "20"}
+    tree = ["web/package.json", "web/server.js", "api/go.mod"]
+    summary = "Directory: shop\nFiles analyzed: 3"
+
+    def fingerprints(tree, summary):
+        return (
+            dockerfile_fingerprint(service, summary, tree, "ctx", config),
+            compose_fingerprint("shop", [service], summary, tree, "ctx", config),
+        )
+
+    base = fingerprints(tree, summary)
+    assert fingerprints(list(tree), summary) == base
+    # Only the tree changes: a new lock file beside the manifest
+    for changed in fingerprints(tree + ["web/pnpm-lock.yaml"], summary):
+        assert changed not in base
+    for changed in fingerprints(tree, summary.replace("3", "4")):
+        assert changed not in base
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.batch import (
+    BatchRunner,
+    format_report,
+    load_batch_manifest,
+    write_report,
+)
+from infra_generator.utils import load_config
+
+
+def test_load_batch_manifest_formats(tmp_path):
+    listing = tmp_path / "repos.txt"
+    listing.write_text("# nightly\n/srv/a\n\n/srv/b\n")
+    assert [e["source"] for e in load_batch_manifest(str(listing))] == [
+        "/srv/a",
+        "/srv/b",
+    ]
+    manifest = tmp_path / "repos.yaml"
+    manifest.write_text(
+        "- /srv/a\n- source: https://x/y.git\n  ref: v1\n  output: out\n"
+    )
+    entries = load_batch_manifest(str(manifest), output_folder="infra")
+    assert entries[0] == {
+        "source": "/srv/a",
+        "ref": None,
+        "output": "infra",
+        "name": "a",
+    }
+    assert entries[1]["ref"] == "v1" and entries[1]["output"] == "out"
+
+
+def test_batch_manifest_keeps_repositories_apart(tmp_path):
+    manifest = tmp_path / "repos.txt"
+    manifest.write_text(
+        "https://github.com/acme/api.git\nhttps://github.com/other/api.git\n"
+        "https://github.com/acme/web.git\n"
+    )
+    entries = load_batch_manifest(str(manifest), output_folder="out")
+    names = [e["name"] for e in entries]
+    assert len(set(names)) == 3 and names[2] == "web"
+    assert all(n.startswith("api-") for n in names[:2])
+    assert [e["output"] for e in entries] == [os.path.join("out", n) for n in names]
+    # Derived names are stable from run to run
+    assert [e["name"] for e in load_batch_manifest(str(manifest))] == names
+
+    manifest.write_text(
+        "- source: /srv/a\n  name: shop\n- source: /srv/b\n  name: shop\n"
+    )
+    with pytest.raises(ValueError, match="shop"):
+        load_batch_manifest(str(manifest))
+
+
+class _SlowGeneration(BatchRunner):
+    """Generation that only sleeps, counting repositories in flight."""
+
+    def __init__(self, config, **kwargs):
+        super().__init__(config, **kwargs)
+        self.lock = threading.Lock()
+        self.in_flight = self.max_in_flight = 0
+
+    def _run_stages(self, values, stages):
+        if stages == ["embed"]:
+            with self.lock:
+                self.in_flight += 1
+                self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            return values
+        time.sleep(0.2)
+        with self.lock:
+            self.in_flight -= 1
+        return {**values, "services": [], "written": []}
+
+
+def test_batch_limits_repositories_in_flight(tmp_path):
+    config = load_config()
+    config["chroma_db_dir"] = str(tmp_path / "chroma")
+    entries = []
+    for i in range(6):
+        (tmp_path / f"repo{i}").mkdir()
+        (tmp_path / f"repo{i}" / "main.py").write_text("print('hi')\n")
+        entries.append({"source": str(tmp_path / f"repo{i}"), "output": "infra"})
+    runner = _SlowGeneration(
+        config, discovery_workers=4, embed_workers=4, llm_workers=1, queue_size=1
+    )
+    records = runner.run(entries)
+    assert [r["status"] for r in records] == ["ok"] * 6
+    assert runner.max_in_flight <= 2
+
+
+def test_batch_generates_each_repo_and_reports_failures(tmp_path):
+    with FakeOllama(dim=16) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "chroma_db_dir": str(tmp_path / "chroma"),
+            }
+        )
+        repos = [
+            generate_repo(str(tmp_path / name), files=30, services=2, seed=i)
+            for i, name in enumerate(["alpha", "beta"])
+        ]
+        entries = [{"source": r["root"], "output": "infra"} for r in repos]
+        entries.append({"source": str(tmp_path / "missing"), "output": "infra"})
+        records = BatchRunner(config, discovery_workers=2).run(entries)
+
+    assert [r["status"] for r in records] == ["ok", "ok", "failed"]
+    for record in records[:2]:
+        assert record["written"] and all(
+            p.startswith(record["source"]) for p in record["written"]
+        )
+        assert set(record["timings"]) == {
+            "discover_s",
+            "embed_s",
+            "queue_wait_s",
+            "generate_s",
+        }
+    assert "FileNotFoundError" in records[2]["error"]
+
+    report = tmp_path / "report.json"
+    write_report(records, str(report))
+    assert len(json.loads(report.read_text())["repositories"]) == 3
+    assert format_report(records)[-1] == "2/3 succeeded"
@@ -0,0 +1,33 @@
+from infra_generator.chroma_manager import ChromaManager
+
+
+def test_registry_serves_lookups_without_listing_again(tmp_path):
+    manager = ChromaManager(str(tmp_path))
+    calls = []
+    list_collections = manager.client.list_collections
+    manager.client.list_collections = lambda: calls.append(1) or list_collections()
+
+    manager.get_collection("alpha", project_dir=str(tmp_path))
+    manager.set_project_metadata("alpha", {"project_dir": "/src/alpha", "v": 2})
+    for _ in range(50):
+        assert manager.get_all_projects() == ["alpha"]
+        assert manager.has_project("alpha") and not manager.has_project("beta")
+        assert manager.get_project_metadata("alpha")["v"] == 2
+        manager.get_collection("alpha")
+    assert len(calls) == 1
+    assert manager.get_project_metadata("beta") == {}
+    assert not manager.has_project("beta")
+
+
+def test_registry_sees_other_writers_and_deletes(tmp_path):
+    manager = ChromaManager(str(tmp_path))
+    manager.get_collection("alpha")
+    other = ChromaManager(str(tmp_path))
+    other.get_collection("beta")
+    other.set_project_metadata("alpha", {"project_dir": "/elsewhere"})
+
+    assert sorted(manager.get_all_projects()) == ["alpha", "beta"]
+    assert manager.get_project_metadata("alpha") == {"project_dir": "/elsewhere"}
+    manager.delete_project("beta")
+    assert manager.get_all_projects() == ["alpha"]
+    assert other.get_all_projects() == ["alpha"]
@@ -0,0 +1,80 @@
+import subprocess
+
+from benchmarks.fake_ollama import FakeOllama
+from infra_generator.chroma_manager import ChromaManager
+from infra_generator.chunk_occurrences import ChunkOccurrences, chunk_content_id
+from infra_generator.embedder import Embedder
+from infra_generator.retriever import Retriever
+from infra_generator.utils import load_config
+
+LICENSE = "# Copyright (c) Example Corp.\n# Licensed under the Apache License 2.0.\n"
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_content_ids_ignore_trailing_whitespace():
+    assert chunk_content_id("def f():  \n    pass\n\n") == chunk_content_id(
+        "def f():\n    pass"
+    )
+    assert chunk_content_id("a = 1") != chunk_content_id("a = 2")
+
+
+def test_remove_paths_reports_only_orphaned_chunks(tmp_path):
+    occ = ChunkOccurrences(str(tmp_path / "occ.sqlite3"))
+    occ.add("p", [("shared", "a.py", 1, 2), ("shared", "b.py", 1, 2)])
+    occ.add("p", [("only_a", "a.py", 3, 9)])
+    occ.add("other", [("only_a", "a.py", 3, 9)])
+    assert occ.remove_paths("p", ["a.py"]) == ["only_a"]
+    assert occ.lookup("p", ["shared", "only_a"]) == {
+        "shared": [{"file_path": "b.py", "start_line": 1, "end_line": 2}]
+    }
+    assert "only_a" in occ.lookup("other", ["only_a"])
+
+
+def test_duplicate_files_are_embedded_once(tmp_path):
+    repo = tmp_path / "repo"
+    util = (
+        LICENSE + "\n\ndef slugify(text):\n    return text.lower().replace(' ', '-')\n"
+    )
+    for path in ["svc_a/util.py", "svc_b/util.py", "shared/util.py"]:
+        (repo / path).parent.mkdir(parents=True, exist_ok=True)
+        (repo / path).write_text(util)
+    (repo / "svc_a/app.py").write_text("def handler(event):\n    return event\n")
+    _git(repo, "init", "-q", "-b", "main")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "init")
+
+    with FakeOllama(dim=16) as ollama:
+        config = load_config()
+        config["ollama_base_url"] = ollama.url
+        chroma_manager = ChromaManager(str(tmp_path / "chroma"))
+        embedder = Embedder(config, chroma_manager)
+        report = embedder.embed_project(str(repo), "mono")
+        collection = chroma_manager.get_collection("mono")
+        assert report["chunks"] == 4
+        assert report["new_chunks"] == collection.count() == 2
+
+        hits = Retriever(config, chroma_manager).retrieve_chunks(
+            "slugify", k=2, project="mono"
+        )["mono"]
+        copies = next(h for h in hits if "slugify" in h["code"])["occurrences"]
+        assert [o["file_path"] for o in copies] == [
+            "shared/util.py",
+            "svc_a/util.py",
+            "svc_b/util.py",
+        ]
+
+        # Changing one copy keeps the shared chunk for the others
+        (repo / "shared/util.py").write_text("VENDORED = True\n")
+        _git(repo, "commit", "-q", "-am", "drop vendored copy")
+        report = embedder.embed_project(str(repo), "mono")
+        assert report["files"] == 1 and report["new_chunks"] == 1
+        assert collection.count() == 3
+        shared = chunk_content_id(util)
+        assert len(chroma_manager.occurrences.lookup("mono", [shared])[shared]) == 2
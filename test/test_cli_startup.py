@@ -0,0 +1,14 @@
+from benchmarks.startup import import_profile
+from infra_generator.chroma_manager import ChromaManager, list_collection_names
+
+
+def test_cli_module_does_not_import_heavy_dependencies():
+    assert import_profile()["heavy_modules_loaded"] == []
+
+
+def test_list_collection_names_reads_chroma_catalog(tmp_path):
+    assert list_collection_names(str(tmp_path / "missing")) == []
+    manager = ChromaManager(str(tmp_path))
+    manager.get_collection("alpha")
+    manager.get_collection("beta")
+    assert sorted(list_collection_names(str(tmp_path))) == ["alpha", "beta"]
@@ -0,0 +1,113 @@
+import json
+import os
+import subprocess
+
+from infra_generator.clone_cache import CloneCache, is_git_url, repo_name_from_url
+
+
+def _git(cwd, *args):
+    out = subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    return out.stdout.strip()
+
+
+def _commit(work, name, content):
+    (work / name).write_text(content)
+    _git(work, "add", ".")
+    _git(work, "commit", "-q", "-m", name)
+    _git(work, "push", "-q", "origin", "main")
+    return _git(work, "rev-parse", "HEAD")
+
+
+def _bare_repo(tmp_path):
+    bare = tmp_path / "origin.git"
+    _git(tmp_path, "init", "-q", "--bare", "-b", "main", str(bare))
+    work = tmp_path / "work"
+    _git(tmp_path, "clone", "-q", str(bare), str(work))
+    _git(work, "checkout", "-q", "-b", "main")
+    return bare, work
+
+
+def test_url_helpers(tmp_path):
+    bare, _ = _bare_repo(tmp_path)
+    assert is_git_url("https://github.com/org/repo.git")
+    assert is_git_url("git@github.com:org/repo.git")
+    assert is_git_url(str(bare))
+    assert not is_git_url(str(tmp_path / "work"))
+    assert repo_name_from_url("git@github.com:org/repo.git") == "repo"
+
+
+def test_clone_reuse_and_refresh(tmp_path):
+    bare, work = _bare_repo(tmp_path)
+    first = _commit(work, "a.py", "a = 1\n")
+    url = f"file://{bare}"
+    cache = CloneCache(str(tmp_path / "cache"))
+
+    path = cache.get(url)
+    assert os.path.dirname(path) == str(tmp_path / "cache")
+    assert open(os.path.join(path, "a.py")).read() == "a = 1\n"
+    assert _git(path, "rev-parse", "--is-shallow-repository") == "true"
+
+    second = _commit(work, "b.py", "b = 1\n")
+    assert cache.get(url) == path
+    assert _git(path, "rev-parse", "HEAD") == second
+
+    pinned = cache.get(url, ref=first)
+    assert pinned != path
+    assert not os.path.exists(os.path.join(pinned, "b.py"))
+    assert {e["commit"] for e in cache.entries()} == {first, second}
+
+
+def test_gc_evicts_stale_and_oversized_entries(tmp_path):
+    bare, work = _bare_repo(tmp_path)
+    first = _commit(work, "a.py", "a = 1\n")
+    url = f"file://{bare}"
+    cache = CloneCache(str(tmp_path / "cache"), max_age_days=1)
+    old = cache.get(url, ref=first)
+    stamp = old + ".json"
+    data = json.load(open(stamp))
+    data["last_used"] -= 2 * 86400
+    json.dump(data, open(stamp, "w"))
+
+    fresh = cache.get(url)
+    assert os.path.exists(old)  # GC runs once per command, not per clone
+    assert cache.gc() == [cache.key(url, first)]
+    assert not os.path.exists(old)
+    assert os.path.exists(fresh)
+
+    tiny = CloneCache(str(tmp_path / "cache"), max_size_mb=0)
+    other = tiny.get(url, ref="main")
+    assert all(e["size"] > 0 for e in tiny.entries())
+    # Recently used clones may still be in use elsewhere
+    assert tiny.gc() == []
+    tiny.gc(keep=[tiny.key(url, "main")], min_idle_s=0)
+    assert os.path.exists(other) and not os.path.exists(fresh)
+
+
+def test_concurrent_clone_of_the_same_url(tmp_path, monkeypatch):
+    bare, work = _bare_repo(tmp_path)
+    _commit(work, "a.py", "a = 1\n")
+    url = f"file://{bare}"
+    winner = CloneCache(str(tmp_path / "cache"))
+    path = winner.get(url)
+
+    # A second process that started cloning before the first one finished
+    # finds the destination taken when it renames its clone into place.
+    loser = CloneCache(str(tmp_path / "cache"))
+    real_isdir = os.path.isdir
+    checks = []
+
+    def isdir(p):
+        if p == os.path.join(path, ".git") and not checks:
+            checks.append(p)
+            return False
+        return real_isdir(p)
+
+    monkeypatch.setattr(os.path, "isdir", isdir)
+    assert loser.get(url) == path
+    assert open(os.path.join(path, "a.py")).read() == "a = 1\n"
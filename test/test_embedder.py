@@ -0,0 +1,81 @@
+import math
+import threading
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.chroma_manager import ChromaManager
+from infra_generator.embedder import (
+    DEFAULT_CHUNKING,
+    Embedder,
+    batched,
+    chunking_settings,
+    prefetch,
+)
+from infra_generator.utils import load_config
+
+
+def test_prefetch_stays_within_depth_and_reraises():
+    produced = []
+    ahead = []
+
+    def items():
+        for i in range(50):
+            produced.append(i)
+            yield i
+
+    for i in prefetch(items(), depth=3):
+        ahead.append(len(produced) - i)
+    # queue depth, plus one item in the producer's hand and one being consumed
+    assert max(ahead) <= 5
+
+    def failing():
+        yield 1
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        list(prefetch(failing(), depth=2))
+    assert not [t for t in threading.enumerate() if t.name == "embed-prefetch"]
+
+
+def test_embed_project_streams_batches(tmp_path):
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    with FakeOllama(dim=16) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "embed_batch_size": 8,
+                "embed_queue_depth": 2,
+            }
+        )
+        repo = generate_repo(str(tmp_path / "repo"), files=40, services=2)
+        (tmp_path / "repo" / "model.py").write_bytes(b"\x00\x01weights" * 100)
+        chroma_manager = ChromaManager(str(tmp_path / "chroma"))
+        report = Embedder(config, chroma_manager).embed_project(
+            repo["root"], "mono", full=True
+        )
+        requests = dict(ollama.requests)
+
+    assert report["chunks"] == chroma_manager.get_collection("mono").count() > 0
+    assert report["batches"] == math.ceil(report["chunks"] / 8)
+    assert requests.get("/api/embed") == report["batches"]
+    assert "/api/embeddings" not in requests
+    assert report["peak_rss_mb"] > 0
+    assert report["skipped"] == {"binary": 1}
+    assert report["skipped_files"] == [{"path": "model.py", "reason": "binary"}]
+    metadata = chroma_manager.get_collection("mono").get(limit=1)["metadatas"][0]
+    assert (
+        metadata["start_line"] >= 1 and metadata["end_line"] >= metadata["start_line"]
+    )
+
+
+def test_legacy_chunk_size_maps_onto_chunking():
+    assert "embedding_chunk_size" not in load_config()
+    assert chunking_settings({}) == DEFAULT_CHUNKING
+    legacy = chunking_settings({"embedding_chunk_size": 1500})
+    assert legacy["text_chunk_size"] == 1500
+    assert legacy["code_chunk_size"] == DEFAULT_CHUNKING["code_chunk_size"]
+    explicit = {"embedding_chunk_size": 1500, "chunking": {"text_chunk_size": 800}}
+    assert chunking_settings(explicit)["text_chunk_size"] == 800
@@ -0,0 +1,56 @@
+import json
+
+from benchmarks.fake_ollama import FakeOllama
+from infra_generator.evaluation import (
+    evaluate,
+    format_results,
+    load_query_set,
+    parameter_grid,
+)
+from infra_generator.utils import load_config
+
+FILES = {
+    "cache/client.py": "import redis\n\nclient = redis.Redis(host='cache')\n",
+    "api/server.js": "const express = require('express');\nexpress().listen(3000);\n",
+    "worker/main.go": 'package main\n\nfunc main() { runQueue("jobs") }\n',
+}
+
+
+def test_parameter_grid_skips_invalid_overlaps():
+    grid = parameter_grid([100, 500], [50, 200], [16], [100], [10, 50])
+    assert len(grid) == 6
+    assert {(g["chunk_size"], g["chunk_overlap"]) for g in grid} == {
+        (100, 50),
+        (500, 50),
+        (500, 200),
+    }
+
+
+def test_evaluate_scores_each_setting(tmp_path):
+    repo = tmp_path / "repo"
+    for path, text in FILES.items():
+        (repo / path).parent.mkdir(parents=True, exist_ok=True)
+        (repo / path).write_text(text)
+    # With the fake server a query equal to a chunk's text embeds identically
+    queries_file = tmp_path / "queries.yaml"
+    queries_file.write_text(
+        "".join(
+            f"- query: {json.dumps(text.strip())}\n  relevant: [{path}]\n"
+            for path, text in FILES.items()
+        )
+    )
+    queries = load_query_set(str(queries_file))
+
+    with FakeOllama(dim=16) as ollama:
+        config = load_config()
+        config["ollama_base_url"] = ollama.url
+        grid = parameter_grid([500], [50], [8, 16], [100], [10])
+        rows = evaluate(config, str(repo), queries, grid, k=2, work_dir=str(tmp_path))
+
+    assert [r["M"] for r in rows] == [8, 16]
+    for row in rows:
+        assert row["recall_at_k"] == 1.0 and row["mrr"] == 1.0
+        assert row["chunks"] == 3 and row["index_mb"] > 0
+        assert row["p95_ms"] >= row["p50_ms"] > 0
+    assert rows[0]["embed_s"] == rows[1]["embed_s"]
+    assert len(format_results(rows)) == 3
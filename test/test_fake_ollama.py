@@ -0,0 +1,32 @@
+import requests
+from langchain_ollama import ChatOllama
+
+from benchmarks.fake_ollama import FakeOllama
+
+
+def test_fake_ollama_endpoints():
+    with FakeOllama(dim=8) as server:
+        tags = requests.get(f"{server.url}/api/tags").json()
+        assert tags["models"]
+
+        single = requests.post(
+            f"{server.url}/api/embeddings", json={"model": "m", "prompt": "abc"}
+        ).json()["embedding"]
+        batch = requests.post(
+            f"{server.url}/api/embed", json={"model": "m", "input": ["abc", "xyz"]}
+        ).json()["embeddings"]
+        assert len(single) == 8
+        assert batch[0] == single
+        assert batch[1] != single
+
+        llm = ChatOllama(base_url=server.url, model="m")
+        response = llm.invoke("Manifest filename: api/package.json\nContent:\n{}")
+        assert '"service_name": "api"' in response.content
+        assert response.response_metadata["prompt_eval_count"] > 0
+
+        generated = requests.post(
+            f"{server.url}/api/generate",
+            json={"model": "m", "prompt": "hi", "stream": False},
+        ).json()
+        assert generated["done"] and generated["response"]
+        assert server.requests["/api/chat"] == 1
@@ -0,0 +1,55 @@
+import subprocess
+
+from infra_generator.git_changes import changed_since, git_state
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_outside_git_returns_none(tmp_path):
+    assert git_state(str(tmp_path)) is None
+
+
+def test_changes_cover_dirty_tree_and_branch_switch(tmp_path):
+    _git(tmp_path, "init", "-q", "-b", "main")
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "b.py").write_text("b = 1\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "init")
+
+    (tmp_path / "a.py").write_text("a = 2\n")
+    (tmp_path / "new.py").write_text("n = 1\n")
+    embedded = git_state(str(tmp_path))
+    assert embedded.dirty == ["a.py", "new.py"]
+
+    # Revert the dirty edit and move to a branch that deletes b.py
+    (tmp_path / "a.py").write_text("a = 1\n")
+    (tmp_path / "new.py").unlink()
+    _git(tmp_path, "checkout", "-q", "-b", "feature")
+    _git(tmp_path, "rm", "-q", "b.py")
+    _git(tmp_path, "commit", "-q", "-m", "drop b")
+
+    changed = changed_since(str(tmp_path), embedded.commit, embedded.dirty)
+    assert changed == {"a.py", "b.py", "new.py"}
+    assert changed_since(str(tmp_path), "0" * 40) is None
+
+
+def test_non_ascii_paths_are_not_quoted(tmp_path):
+    _git(tmp_path, "init", "-q", "-b", "main")
+    (tmp_path / "café.py").write_text("a = 1\n")
+    _git(tmp_path, "add", ".")
+    _git(tmp_path, "commit", "-q", "-m", "init")
+    embedded = git_state(str(tmp_path))
+
+    (tmp_path / "café.py").write_text("a = 2\n")
+    (tmp_path / "naïve file.py").write_text("n = 1\n")
+    assert git_state(str(tmp_path)).dirty == ["café.py", "naïve file.py"]
+    assert changed_since(str(tmp_path), embedded.commit) == {
+        "café.py",
+        "naïve file.py",
+    }
@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.chroma_manager import ChromaManager
+from infra_generator.embedder import Embedder
+from infra_generator.index_snapshot import (
+    SnapshotError,
+    export_project,
+    import_project,
+    read_header,
+)
+from infra_generator.retriever import Retriever
+from infra_generator.utils import load_config
+
+
+def test_export_import_round_trip(tmp_path):
+    repo = tmp_path / "repo"
+    generate_repo(repo, files=40, services=3, seed=3)
+    with FakeOllama(dim=64) as ollama:
+        config = load_config()
+        config["ollama_base_url"] = ollama.url
+        source = ChromaManager(str(tmp_path / "src"))
+        Embedder(config, source).embed_project(str(repo), "shop")
+        embed_model = config["models"]["embed_model"]
+
+        snapshot = str(tmp_path / "shop.npz")
+        header = export_project(source, "shop", snapshot)
+        wide = str(tmp_path / "shop32.npz")
+        export_project(source, "shop", wide, dtype="float32")
+        assert os.path.getsize(snapshot) < os.path.getsize(wide)
+        assert read_header(snapshot)["embed_model"] == embed_model
+
+        target = ChromaManager(str(tmp_path / "dst"))
+        imported = import_project(target, snapshot, embed_model=embed_model)
+        assert imported["count"] == header["count"]
+        assert target.get_collection("shop").count() == header["count"]
+        assert target.get_project_metadata("shop") == source.get_project_metadata(
+            "shop"
+        )
+        assert sorted(target.occurrences.rows("shop")) == sorted(
+            source.occurrences.rows("shop")
+        )
+
+        config["chroma_db_dir"] = str(tmp_path / "dst")
+        hits = Retriever(config, target).retrieve_chunks(
+            "database", k=3, project="shop"
+        )["shop"]
+        assert hits and all(hit["occurrences"] for hit in hits)
+
+        with pytest.raises(SnapshotError):
+            import_project(
+                target, snapshot, embed_model="other-model", project="shop-copy"
+            )
+        import_project(
+            target, snapshot, embed_model="other-model", project="shop-copy", force=True
+        )
+        assert target.get_collection("shop-copy").count() == header["count"]
@@ -0,0 +1,54 @@
+import threading
+
+import pytest
+
+from infra_generator.pipeline import Stage, StageCache, StageGraph
+
+
+def _graph(calls, barrier=None):
+    def record(name, **outputs):
+        def func(**kwargs):
+            calls.append(name)
+            if barrier is not None and name in ("left", "right"):
+                # Both branches must be in flight at once to pass the barrier.
+                barrier.wait(timeout=5)
+            return outputs
+
+        return func
+
+    return StageGraph(
+        [
+            Stage("root", record("root", base=1), inputs=["seed"], outputs=["base"]),
+            Stage("left", record("left", a=2), inputs=["base"], outputs=["a"]),
+            Stage("right", record("right", b=3), inputs=["base"], outputs=["b"]),
+            Stage(
+                "join",
+                record("join", total=6),
+                inputs=["a", "b"],
+                outputs=["total"],
+                after=["side"],
+            ),
+            Stage("side", record("side"), inputs=["base"]),
+        ]
+    )
+
+
+def test_independent_stages_run_concurrently_and_after_is_respected():
+    calls = []
+    values = _graph(calls, threading.Barrier(2)).run({"seed": 0})
+    assert values["total"] == 6
+    assert calls[0] == "root"
+    assert calls.index("join") > calls.index("side")
+
+
+def test_only_reruns_selected_stages_from_cache(tmp_path):
+    cache = StageCache(str(tmp_path / "stages.json"))
+    _graph([]).run({"seed": 0}, cache=cache)
+
+    calls = []
+    values = _graph(calls).run({"seed": 0}, only=["join"], cache=StageCache(cache.path))
+    assert calls == ["join"]
+    assert values["a"] == 2
+
+    with pytest.raises(ValueError):
+        _graph([]).run({"seed": 0}, only=["nope"], cache=cache)
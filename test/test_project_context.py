@@ -0,0 +1,74 @@
+from infra_generator.infra_generator import InfraGenerator
+from infra_generator.project_context import ProjectContext, primary_manifest
+
+
+class CountingRetriever:
+    def __init__(self):
+        self.calls = 0
+
+    def retrieve_chunks(self, query, k=5, project=None):
+        self.calls += 1
+        return {project: [{"file_path": "app.py", "code": query}]}
+
+
+def test_context_memoizes_detection_and_retrieval(tmp_path):
+    (tmp_path / "requirements.txt").write_text("flask\n")
+    (tmp_path / "app.py").write_text("print('hi')\n")
+    detections = []
+
+    def detector(manifests):
+        detections.append(manifests)
+        return [{"name": "root_service", "manifest_content": manifests[0]["content"]}]
+
+    retriever = CountingRetriever()
+    ctx = ProjectContext(
+        "demo",
+        str(tmp_path),
+        retriever=retriever,
+        tree=["requirements.txt", "app.py"],
+        service_detector=detector,
+    )
+
+    assert ctx.services == ctx.services
+    assert len(detections) == 1
+    assert ctx.manifests == [{"path": "requirements.txt", "content": "flask\n"}]
+    assert ctx.entrypoint_content == "print('hi')\n"
+
+    ctx.retrieve_chunks("env vars", k=3, project="demo")
+    ctx.retrieve_chunks("env vars", k=3, project="demo")
+    ctx.retrieve_chunks("other", k=3, project="demo")
+    assert retriever.calls == 2
+
+    # Callers may trim their results without affecting later lookups
+    ctx.retrieve_chunks("env vars", k=3, project="demo")["demo"].clear()
+    assert len(ctx.retrieve_chunks("env vars", k=3, project="demo")["demo"]) == 1
+    assert retriever.calls == 2
+
+
+def test_infra_generator_detects_only_the_root_manifest(tmp_path):
+    class Manager:
+        def has_project(self, name):
+            return True
+
+        def get_project_metadata(self, name):
+            return {"project_dir": str(tmp_path)}
+
+    for path in [
+        "pyproject.toml",
+        "requirements.txt",
+        "api/go.mod",
+        "web/package.json",
+    ]:
+        (tmp_path / path).parent.mkdir(exist_ok=True)
+        (tmp_path / path).write_text("x\n")
+    detections = []
+    infra = InfraGenerator("demo", {"exclude_patterns": []}, Manager())
+    infra._detect_services_and_versions = lambda manifests: detections.append(
+        [m["path"] for m in manifests]
+    ) or [{"name": "root_service"}]
+
+    ctx = infra.get_project_context(CountingRetriever())
+    assert ctx.services == [{"name": "root_service"}]
+    assert detections == [["requirements.txt"]]
+    assert primary_manifest(["api/go.mod", "web/package.json"]) == "web/package.json"
+    assert primary_manifest(["README.md"]) is None
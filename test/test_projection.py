@@ -0,0 +1,74 @@
+import numpy as np
+
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.chroma_manager import ChromaManager
+from infra_generator.embedder import Embedder
+from infra_generator.projection import Projection, recall_report
+from infra_generator.retriever import Retriever
+from infra_generator.utils import load_config
+
+
+def test_projections_keep_width_and_round_trip(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(5, 16))
+    pca = Projection.fit_pca(vectors, 8)  # fewer samples than dims
+    out = pca.apply(vectors)
+    assert out.shape == (5, 8)
+    assert np.allclose(np.linalg.norm(out, axis=1), 1)
+    assert Projection.truncate(4).apply(vectors).shape == (5, 4)
+
+    pca.save(str(tmp_path / "p.npz"))
+    loaded = Projection.load(str(tmp_path / "p.npz"))
+    assert loaded.describe() == "pca:8"
+    assert np.allclose(loaded.apply(vectors), out, atol=1e-5)
+
+
+def test_recall_report_against_full_dimension():
+    rng = np.random.default_rng(1)
+    # 200 points on an 8-dimensional subspace of a 64-dimensional space
+    vectors = rng.normal(size=(200, 8)) @ rng.normal(size=(8, 64))
+    rows = recall_report(vectors, [2, 8], k=5, n_queries=50)
+    assert [r["dim"] for r in rows] == [2, 8]
+    assert rows[1]["recall_at_k"] > 0.99
+    assert rows[0]["recall_at_k"] < rows[1]["recall_at_k"]
+    assert rows[1]["size_ratio"] == 8 / 64
+    assert recall_report(vectors, [64], k=5, method="truncate")[0]["recall_at_k"] == 1
+
+
+def test_pca_projection_is_stored_and_applied_to_queries(tmp_path):
+    with FakeOllama(dim=32) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "embed_batch_size": 4,
+                "embedding_projection": {
+                    "method": "pca",
+                    "dim": 8,
+                    "pca_fit_chunks": 10,
+                },
+            }
+        )
+        repo = generate_repo(str(tmp_path / "repo"), files=30, services=2)
+        chroma_manager = ChromaManager(str(tmp_path / "chroma"))
+        embedder = Embedder(config, chroma_manager)
+        embedder.embed_project(repo["root"], "mono")
+
+        collection = chroma_manager.get_collection("mono")
+        stored = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        assert len(stored[0]) == 8
+        assert collection.metadata["projection"] == "pca:8"
+        assert chroma_manager.projections.load("mono").describe() == "pca:8"
+        hits = Retriever(config, chroma_manager).retrieve_chunks(
+            "redis", project="mono"
+        )
+        assert hits["mono"]
+
+        # Turning the projection off rebuilds the index at full width
+        config["embedding_projection"] = {"method": "none"}
+        embedder.embed_project(repo["root"], "mono")
+        collection = chroma_manager.get_collection("mono")
+        stored = collection.get(limit=1, include=["embeddings"])["embeddings"]
+        assert len(stored[0]) == 32
+        assert chroma_manager.projections.load("mono") is None
@@ -0,0 +1,22 @@
+from string import Formatter
+
+from infra_generator import prompt_templates
+
+
+def _fields(template):
+    return {name for _, name, _, _ in Formatter().parse(template) if name}
+
+
+def test_system_prompts_are_static_prefixes():
+    # Variables in a system prompt would break Ollama's prefix cache reuse.
+    assert _fields(prompt_templates.DOCKERFILE_SYSTEM_PROMPT) == set()
+    assert _fields(prompt_templates.DOCKER_COMPOSE_SYSTEM_PROMPT) == set()
+
+
+def test_user_prompts_carry_the_per_service_context():
+    assert {"tree", "manifest_content", "latest_base_image_tag"} <= _fields(
+        prompt_templates.DOCKERFILE_USER_PROMPT
+    )
+    assert {"tree", "postgres_image_tag", "redis_image_tag"} <= _fields(
+        prompt_templates.DOCKER_COMPOSE_USER_PROMPT
+    )
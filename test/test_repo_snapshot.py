@@ -0,0 +1,32 @@
+import hashlib
+
+from infra_generator.repo_snapshot import RepoSnapshot, is_excluded
+
+
+def test_is_excluded_matches_dirs_and_files():
+    patterns = ["node_modules/", "*.lock", "LICENSE"]
+    assert is_excluded("web/node_modules", patterns, is_dir=True)
+    assert not is_excluded("web/node_modules", patterns)
+    assert is_excluded("poetry.lock", patterns)
+    assert is_excluded("sub/LICENSE", patterns)
+    assert not is_excluded("src/app.py", patterns)
+
+
+def test_snapshot_walks_once_and_loads_lazily(tmp_path):
+    (tmp_path / "svc").mkdir()
+    (tmp_path / "svc" / "app.py").write_text("print('hi')\n")
+    (tmp_path / "svc" / "package.json").write_text("{}")
+    (tmp_path / "node_modules" / "dep").mkdir(parents=True)
+    (tmp_path / "node_modules" / "dep" / "index.js").write_text("x")
+    (tmp_path / "empty.txt").write_text("")
+
+    snap = RepoSnapshot.build(str(tmp_path), ["node_modules/"])
+
+    assert snap.paths() == ["empty.txt", "svc/app.py", "svc/package.json"]
+    assert [f.path for f in snap.with_extensions([".py"])] == ["svc/app.py"]
+    assert snap.find(["package.json"]) == ["svc/package.json"]
+    assert snap.read_text("svc/app.py") == "print('hi')\n"
+    assert snap.read_text("missing.py", default="?") == "?"
+    assert snap.get("empty.txt").read_bytes() == b""
+    assert snap.get("svc/app.py").sha1 == hashlib.sha1(b"print('hi')\n").hexdigest()
+    assert "Files analyzed: 3" in snap.summary("demo")
@@ -0,0 +1,101 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+import yaml
+
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.main import main
+from infra_generator.server import find_daemon, start_server, stop_server
+from infra_generator.utils import load_config
+
+
+def test_daemon_serves_forwarded_commands(tmp_path):
+    with FakeOllama(dim=16) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "chroma_db_dir": str(tmp_path / "chroma"),
+                "server_address_file": str(tmp_path / "server.json"),
+            }
+        )
+        repo = generate_repo(str(tmp_path / "repo"), files=40, services=2)
+        httpd = start_server(config)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        try:
+            assert find_daemon(config, "other.yaml") is None
+            client = find_daemon(config)
+            assert client is not None
+
+            embed = client.run("embed", {"project_dir": repo["root"], "name": "mono"})
+            assert embed["ok"]
+            assert client.run("list", {})["lines"] == ["mono"]
+            answer = client.run("ask", {"question": ["where", "is", "redis?"]})
+            assert answer["ok"] and answer["lines"]
+            missing = client.run("ask", {"question": ["x"], "project": "nope"})
+            assert not missing["ok"] and missing["exit_code"] == 1
+        finally:
+            httpd.shutdown()
+            stop_server(httpd)
+        assert find_daemon(config) is None
+
+
+def test_forwarded_output_is_relative_to_the_caller(tmp_path, monkeypatch):
+    repo = generate_repo(str(tmp_path / "repo"), files=20, services=1)
+    for args in (["init", "-q"], ["add", "."], ["commit", "-q", "-m", "init"]):
+        subprocess.run(
+            ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+            cwd=repo["root"],
+            check=True,
+        )
+    (tmp_path / "daemon").mkdir()
+    (tmp_path / "caller").mkdir()
+    with FakeOllama(dim=16) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "chroma_db_dir": str(tmp_path / "chroma"),
+                "server_address_file": str(tmp_path / "server.json"),
+                "stage_cache_dir": str(tmp_path / "stages"),
+                "clone_cache_dir": str(tmp_path / "clones"),
+            }
+        )
+        config_path = str(tmp_path / "config.yaml")
+        with open(config_path, "w") as f:
+            yaml.safe_dump(config, f)
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        daemon = subprocess.Popen(
+            [sys.executable, "-m", "infra_generator.main"]
+            + ["--config", config_path, "serve"],
+            cwd=str(tmp_path / "daemon"),
+            env={**os.environ, "PYTHONPATH": os.pathsep.join([f"{root}/src", root])},
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            deadline = time.time() + 60
+            while find_daemon(config, config_path) is None:
+                assert time.time() < deadline and daemon.poll() is None
+                time.sleep(0.2)
+            monkeypatch.chdir(tmp_path / "caller")
+            monkeypatch.setattr(
+                sys,
+                "argv",
+                ["infra-gen", "--config", config_path, "generate-infra"]
+                + [f"file://{repo['root']}", "-o", "out"],
+            )
+            with pytest.raises(SystemExit) as exit_info:
+                main()
+            assert exit_info.value.code == 0
+        finally:
+            daemon.terminate()
+            daemon.wait()
+    assert os.path.isfile(tmp_path / "caller" / "out" / "docker-compose.yml")
+    assert not os.path.exists(tmp_path / "daemon" / "out")
@@ -0,0 +1,27 @@
+from benchmarks.fake_ollama import FakeOllama
+from infra_generator.setup_ollama import OllamaSetup
+
+
+def test_setup_checks_once_and_reuses_the_stamp(tmp_path):
+    with FakeOllama(models=["embed:latest", "chat:7b"]) as server:
+        setup = OllamaSetup(
+            required_models=["embed", "chat:7b"],
+            host=server.url,
+            stamp_path=str(tmp_path / "stamp.json"),
+        )
+        setup.setup()
+        setup.setup()
+        assert server.requests["/api/tags"] == 1
+
+        assert setup.missing_models(setup.available_models()) == []
+        other = OllamaSetup(required_models=["chat:13b"], host=server.url)
+        assert other.missing_models(other.available_models()) == ["chat:13b"]
+
+    stale = OllamaSetup(
+        required_models=["embed"],
+        host=server.url,
+        stamp_path=str(tmp_path / "stamp.json"),
+        ttl=0,
+    )
+    assert not stale._stamp_valid()
+    assert stale.available_models() is None
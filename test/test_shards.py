@@ -0,0 +1,174 @@
+import subprocess
+
+import pytest
+
+from benchmarks.fake_ollama import FakeOllama
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.chroma_manager import ChromaManager, list_collection_names
+from infra_generator.embedder import Embedder
+from infra_generator.infra_agent import run_infra_pipeline
+from infra_generator.retriever import Retriever
+from infra_generator.shards import (
+    plan_shards,
+    service_dirs,
+    service_shard,
+    shard_name,
+)
+from infra_generator.utils import load_config
+
+
+def _git(repo, *args):
+    subprocess.run(
+        ["git", "-C", str(repo), "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        check=True,
+        capture_output=True,
+    )
+
+
+def test_files_go_to_the_deepest_service():
+    paths = [
+        "setup.py",
+        "tools/lint.py",
+        "services/api/pyproject.toml",
+        "services/api/app.py",
+        "services/api/plugins/auth/package.json",
+        "services/api/plugins/auth/index.js",
+        "services/web/package.json",
+        "services/web/main.js",
+    ]
+    services = service_dirs(paths)
+    assert services == ["services/api", "services/api/plugins/auth", "services/web"]
+    sources = [p for p in paths if p.endswith((".py", ".js"))]
+    assert plan_shards(sources, services) == {
+        "": ["setup.py", "tools/lint.py"],
+        "services/api": ["services/api/app.py"],
+        "services/api/plugins/auth": ["services/api/plugins/auth/index.js"],
+        "services/web": ["services/web/main.js"],
+    }
+    # Too-small services fold into the enclosing one
+    assert plan_shards(sources, services, min_files=2) == {"": sources}
+    assert shard_name("shop", "services/api") == "shop__services.api"
+    assert shard_name("shop", "") == "shop"
+    # A service folded into another is searched in the shard around it
+    assert service_shard("services/api", ["services"]) == "services"
+    assert service_shard("services", ["services"]) == "services"
+    assert service_shard("", ["services"]) == ""
+
+
+def test_sharded_project_embeds_and_searches_per_service(tmp_path):
+    repo = tmp_path / "repo"
+    files = {
+        "scripts/deploy.py": "def deploy(target):\n    return f'deploy {target}'\n",
+        "cart/requirements.txt": "flask\n",
+        "cart/app.py": "def add_to_cart(item):\n    return {'item': item}\n",
+        "billing/go.mod": "module billing\n",
+        "billing/main.go": "package main\n\nfunc ChargeCard(amount int) int {\n"
+        "\treturn amount\n}\n",
+    }
+    for path, content in files.items():
+        (repo / path).parent.mkdir(parents=True, exist_ok=True)
+        (repo / path).write_text(content)
+    _git(repo, "init", "-q", "-b", "main")
+    _git(repo, "add", ".")
+    _git(repo, "commit", "-q", "-m", "init")
+
+    with FakeOllama(dim=16) as ollama:
+        config = load_config()
+        config["ollama_base_url"] = ollama.url
+        config["chroma_db_dir"] = str(tmp_path / "chroma")
+        config["index_sharding"] = {"enabled": True, "min_files": 1}
+        manager = ChromaManager.from_config(config)
+        embedder = Embedder(config, manager)
+        report = embedder.embed_project(str(repo), "mono")
+        assert report["files"] == 3
+        assert set(report["shards"]) == {".", "cart", "billing"}
+        assert manager.get_shards("mono") == {
+            "cart": "mono__cart",
+            "billing": "mono__billing",
+        }
+        assert manager.get_all_projects() == ["mono"]
+        assert list_collection_names(config["chroma_db_dir"]) == ["mono"]
+
+        retriever = Retriever(config, manager)
+        hits = retriever.retrieve_chunks("charge card", k=3, project="mono")["mono"]
+        assert {h["service"] for h in hits} == {None, "cart", "billing"}
+        assert all(h["project"] == "mono" for h in hits)
+        distances = [h["distance"] for h in hits]
+        assert distances == sorted(distances)
+        only = retriever.retrieve_chunks(
+            "charge card", k=3, project="mono", services=["billing"]
+        )["mono"]
+        assert [h["file_path"] for h in only] == ["billing/main.go"]
+        root = retriever.retrieve_chunks(
+            "charge card", k=3, project="mono", services=[""]
+        )["mono"]
+        assert [(h["file_path"], h["service"]) for h in root] == [
+            ("scripts/deploy.py", None)
+        ]
+
+        # A change in one service only touches its shard
+        (repo / "cart/app.py").write_text("def checkout(cart):\n    return cart\n")
+        _git(repo, "commit", "-q", "-am", "checkout")
+        report = embedder.embed_project(str(repo), "mono")
+        assert report["shards"]["cart"]["files"] == 1
+        assert report["shards"]["billing"]["files"] == 0
+        assert report["shards"]["."]["files"] == 0
+
+        report = embedder.embed_project(str(repo), "mono", services=["billing"])
+        assert list(report["shards"]) == ["billing"]
+        assert report["shards"]["billing"]["files"] == 1
+
+        # Turning sharding off folds everything back into one collection
+        config["index_sharding"] = {"enabled": False}
+        report = embedder.embed_project(str(repo), "mono")
+        assert report["files"] == 3
+        assert manager.get_shards("mono") == {}
+        assert not manager.has_project("mono__cart")
+        manager.refresh()
+        assert [c.name for c in manager.client.list_collections()] == ["mono"]
+
+
+def test_generate_infra_searches_each_service_in_its_shard(tmp_path):
+    class RecordingRetriever(Retriever):
+        def retrieve_chunks(self, query, k=5, project=None, services=None):
+            searched.append((query, services))
+            return super().retrieve_chunks(query, k, project, services)
+
+    searched = []
+    repo = generate_repo(str(tmp_path / "repo"), files=60, services=2, seed=3)
+    with FakeOllama(dim=16) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "chroma_db_dir": str(tmp_path / "chroma"),
+                "stage_cache_dir": str(tmp_path / "stages"),
+                "index_sharding": {"enabled": True, "min_files": 1},
+            }
+        )
+        manager = ChromaManager.from_config(config)
+        run_infra_pipeline(
+            repo["root"],
+            str(tmp_path / "infra"),
+            config=config,
+            chroma_manager=manager,
+            retriever=RecordingRetriever(config, manager),
+            use_llm=True,
+        )
+    per_service = {
+        tuple(services) for query, services in searched if "service entrypoint" in query
+    }
+    assert per_service == {(s["path"],) for s in repo["services"]}
+    # The compose query still covers every shard
+    assert [s for q, s in searched if "top-level" in q] == [None]
+
+
+def test_sharding_refuses_a_pca_projection(tmp_path):
+    config = load_config()
+    config["chroma_db_dir"] = str(tmp_path / "chroma")
+    config["index_sharding"] = {"enabled": True}
+    config["embedding_projection"] = {"method": "pca", "dim": 8}
+    (tmp_path / "repo").mkdir()
+    embedder = Embedder(config, ChromaManager.from_config(config))
+    with pytest.raises(ValueError, match="pca"):
+        embedder.embed_project(str(tmp_path / "repo"), "mono")
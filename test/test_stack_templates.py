@@ -0,0 +1,186 @@
+import os
+from collections import Counter
+
+from benchmarks.fake_ollama import FakeOllama, default_reply
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.chroma_manager import ChromaManager
+from infra_generator.infra_agent import run_infra_pipeline
+from infra_generator.retriever import Retriever
+from infra_generator.stack_templates import detect_service, render_dockerfile
+from infra_generator.utils import load_config
+from infra_generator.validation import validate_dockerfile
+
+
+def _service(path, manifest):
+    return {"name": path or "root_service", "path": path, "manifest_path": manifest}
+
+
+def test_templates_cover_the_synthetic_stacks(tmp_path):
+    repo = generate_repo(str(tmp_path / "repo"), files=30, services=3, seed=1)
+    stacks = {}
+    for svc in repo["services"]:
+        rendered = render_dockerfile(
+            _service(svc["path"], svc["manifest"]), repo["root"]
+        )
+        assert validate_dockerfile(rendered["content"]) == []
+        stacks[rendered["stack"]] = rendered["content"]
+    assert set(stacks) == {"python-poetry", "node-yarn", "go"}
+    assert "FROM python:3.11-slim AS build" in stacks["python-poetry"]
+    assert "COPY package.json yarn.lock ./" in stacks["node-yarn"]
+    assert 'CMD ["node", "server.js"]' in stacks["node-yarn"]
+    assert "FROM golang:1.22-alpine AS build" in stacks["go"]
+
+
+def test_pip_and_npm_projects(tmp_path):
+    api = tmp_path / "api"
+    api.mkdir()
+    (api / "requirements.txt").write_text("fastapi==0.110.0\nuvicorn[standard]\n")
+    (api / "app.py").write_text("from fastapi import FastAPI\n\napi = FastAPI()\n")
+    rendered = render_dockerfile(_service("api", "api/requirements.txt"), str(tmp_path))
+    assert rendered["stack"] == "python-pip"
+    assert "python:3.12-slim" in rendered["content"]
+    assert '"uvicorn", "app:api"' in rendered["content"]
+
+    web = tmp_path / "web"
+    web.mkdir()
+    (web / "package.json").write_text(
+        '{"scripts": {"build": "tsc", "start": "node dist/index.js"}}'
+    )
+    (web / "package-lock.json").write_text("{}")
+    content = render_dockerfile(_service("web", "web/package.json"), str(tmp_path))[
+        "content"
+    ]
+    assert "RUN npm ci" in content and "RUN npm run build" in content
+    assert "EXPOSE" not in content
+
+
+def test_pnpm_is_enabled_in_every_stage_that_runs_it(tmp_path):
+    (tmp_path / "package.json").write_text(
+        '{"scripts": {"build": "tsc", "start": "node dist/index.js"}}'
+    )
+    (tmp_path / "pnpm-lock.yaml").write_text("lockfileVersion: '9.0'\n")
+    content = render_dockerfile(_service("", "package.json"), str(tmp_path))["content"]
+    stages = content.split("\n\n")
+    assert "RUN corepack enable" in stages[0]
+    for stage in stages[1:]:
+        if "pnpm" in stage:
+            assert stage.startswith("FROM base")
+
+
+def test_unknown_stacks_are_left_to_the_llm(tmp_path):
+    (tmp_path / "Cargo.toml").write_text('[package]\nname = "x"\n')
+    (tmp_path / "pyproject.toml").write_text('[project]\nname = "x"\n')
+    (tmp_path / "package.json").write_text('{"name": "x"}')
+    assert render_dockerfile(_service("", "Cargo.toml"), str(tmp_path)) is None
+    # No entry point to run
+    assert render_dockerfile(_service("", "pyproject.toml"), str(tmp_path)) is None
+    assert render_dockerfile(_service("", "package.json"), str(tmp_path)) is None
+
+
+def test_services_on_template_stacks_are_detected_without_the_llm(tmp_path):
+    (tmp_path / "web").mkdir()
+    (tmp_path / "web" / "package.json").write_text('{"engines": {"node": ">=18"}}')
+    (tmp_path / "go.mod").write_text("module api\n\ngo 1.21\n")
+    (tmp_path / "Cargo.toml").write_text('[package]\nname = "x"\n')
+    web = detect_service({"path": "web/package.json", "content": "{}"}, str(tmp_path))
+    assert web == {
+        "name": "web",
+        "path": "web",
+        "language": "node",
+        "manifest_path": "web/package.json",
+        "manifest_content": "{}",
+        "version": ">=18",
+    }
+    root = detect_service({"path": "go.mod"}, str(tmp_path))
+    assert (root["name"], root["language"], root["version"]) == (
+        "root_service",
+        "go",
+        "1.21",
+    )
+    assert detect_service({"path": "Cargo.toml"}, str(tmp_path)) is None
+
+
+def test_pipeline_uses_templates_unless_asked_for_the_llm(tmp_path):
+    class RecordingRetriever(Retriever):
+        def retrieve_chunks(self, query, k=5, project=None, services=None):
+            queries.append(query)
+            return super().retrieve_chunks(query, k, project, services)
+
+    generated = Counter()
+    queries = []
+
+    def responder(prompt):
+        reply = default_reply(prompt)
+        if "Manifest filename:" in prompt:
+            generated["detect"] += 1
+        else:
+            generated["compose" if reply.startswith("services:") else "docker"] += 1
+        return reply
+
+    repo = generate_repo(str(tmp_path / "repo"), files=30, services=2, seed=1)
+    out = str(tmp_path / "infra")
+    with FakeOllama(dim=16, responder=responder) as ollama:
+        config = load_config()
+        config.update(
+            {
+                "ollama_base_url": ollama.url,
+                "chroma_db_dir": str(tmp_path / "chroma"),
+                "stage_cache_dir": str(tmp_path / "stages"),
+            }
+        )
+        manager = ChromaManager.from_config(config)
+        retriever = RecordingRetriever(config, manager)
+        written = run_infra_pipeline(
+            repo["root"],
+            out,
+            config=config,
+            chroma_manager=manager,
+            retriever=retriever,
+        )
+        # No detection calls, and only the compose file's code context
+        assert generated == {"compose": 1}
+        assert len(queries) == 1 and "top-level" in queries[0]
+        assert len(written) == 3
+        with open(os.path.join(out, repo["services"][1]["path"], "Dockerfile")) as f:
+            assert f.read().startswith("FROM node:20-alpine AS base")
+
+        # Rendered Dockerfiles are locked like generated ones
+        generated.clear()
+        assert run_infra_pipeline(repo["root"], out, config=config) == []
+
+        generated.clear()
+        written = run_infra_pipeline(repo["root"], out, config=config, use_llm=True)
+        # Services are detected by the LLM too, so the compose file may follow
+        assert generated["docker"] == 2 and generated["detect"] > 0
+        assert sum(p.endswith("Dockerfile") for p in written) == 2
+
+
+def test_built_dependencies_are_copied_after_the_sources(tmp_path):
+    repo = generate_repo(str(tmp_path / "repo"), files=20, services=2, seed=1)
+    for svc in repo["services"]:
+        lines = render_dockerfile(_service(svc["path"], svc["manifest"]), repo["root"])[
+            "content"
+        ].splitlines()
+        built = next(i for i, l in enumerate(lines) if l.startswith("COPY --from="))
+        assert any(l.startswith("COPY") and " . " in l for l in lines[:built])
+
+
+def test_lower_bound_versions_get_the_default_image(tmp_path):
+    (tmp_path / "pyproject.toml").write_text(
+        '[project]\nname = "x"\nrequires-python = ">=3.8"\n'
+    )
+    (tmp_path / "main.py").write_text("print('hi')\n")
+    (tmp_path / "package.json").write_text(
+        '{"main": "main.js", "engines": {"node": ">=14"}}'
+    )
+    (tmp_path / "main.js").write_text("console.log('hi')\n")
+    python = render_dockerfile(_service("", "pyproject.toml"), str(tmp_path))
+    assert "FROM python:3.12-slim AS build" in python["content"]
+    node = render_dockerfile(_service("", "package.json"), str(tmp_path))
+    assert "FROM node:20-alpine AS base" in node["content"]
+
+    (tmp_path / "pyproject.toml").write_text(
+        '[project]\nname = "x"\nrequires-python = "~=3.10"\n'
+    )
+    python = render_dockerfile(_service("", "pyproject.toml"), str(tmp_path))
+    assert "FROM python:3.10-slim AS build" in python["content"]
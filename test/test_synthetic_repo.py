@@ -0,0 +1,31 @@
+from benchmarks.synthetic_repo import generate_repo
+from infra_generator.project_context import MANIFEST_FILENAMES
+from infra_generator.repo_snapshot import RepoSnapshot
+from infra_generator.utils import load_config
+
+
+def test_generate_repo_is_reproducible_and_noise_is_excluded(tmp_path):
+    info = generate_repo(str(tmp_path / "a"), files=300, services=3, seed=7)
+    generate_repo(str(tmp_path / "b"), files=300, services=3, seed=7)
+    tree_a = {
+        p.relative_to(tmp_path / "a"): p.read_bytes()
+        for p in (tmp_path / "a").rglob("*")
+        if p.is_file()
+    }
+    tree_b = {
+        p.relative_to(tmp_path / "b"): p.read_bytes()
+        for p in (tmp_path / "b").rglob("*")
+        if p.is_file()
+    }
+    assert tree_a == tree_b
+
+    assert abs(info["files"]["total"] - 300) <= 5
+    assert [s["language"] for s in info["services"]] == ["python", "node", "go"]
+
+    snapshot = RepoSnapshot.build(info["root"], load_config()["exclude_patterns"])
+    assert len(snapshot) <= info["files"]["source"]
+    assert not [p for p in snapshot.paths() if "node_modules" in p or "vendor" in p]
+    manifests = snapshot.find(MANIFEST_FILENAMES)
+    for service in info["services"]:
+        assert service["manifest"] in manifests
+        assert snapshot.get(service["entrypoint"]) is not None
@@ -0,0 +1,42 @@
+import json
+import threading
+
+import pytest
+
+from infra_generator.tracing import Tracer
+
+
+def test_nested_spans_and_chrome_trace(tmp_path):
+    tracer = Tracer()
+    with tracer.span("run", cat="stage") as root:
+        with tracer.span("llm", cat="llm", model="m") as child:
+            child.set(prompt_eval_count=12)
+
+        def worker():
+            with tracer.span("embed_file", cat="embed", parent=root):
+                pass
+
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+    with pytest.raises(ValueError):
+        with tracer.span("broken"):
+            raise ValueError("boom")
+
+    by_name = {s.name: s for s in tracer.spans}
+    assert by_name["llm"].parent_id == root.id
+    assert by_name["embed_file"].parent_id == root.id
+    assert by_name["embed_file"].thread_id != root.thread_id
+    assert "boom" in by_name["broken"].attrs["error"]
+
+    path = tmp_path / "trace.json"
+    tracer.write_chrome_trace(str(path))
+    events = json.loads(path.read_text())["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in spans][0] == "run"
+    assert spans[1]["args"]["prompt_eval_count"] == 12
+    assert any(e["ph"] == "M" for e in events)
+
+    table = tracer.summary()
+    assert table[1].startswith("stage:run")
+    assert len(table) == 5
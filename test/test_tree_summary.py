@@ -0,0 +1,50 @@
+from infra_generator.tree_summary import (
+    estimate_tokens,
+    service_scope,
+    summarize_tree,
+)
+
+
+def _monorepo():
+    paths = ["README.md", "docker-compose.yml"]
+    for s in range(40):
+        base = f"services/svc{s}"
+        paths += [f"{base}/pyproject.toml", f"{base}/app.py"]
+        paths += [f"{base}/pkg/mod{i}/f{j}.py" for i in range(20) for j in range(30)]
+    paths += [f"vendor/lib{i}/x{j}.go" for i in range(100) for j in range(50)]
+    return paths
+
+
+def test_small_tree_is_rendered_in_full():
+    out = summarize_tree(["app.py", "src/util.py", "requirements.txt"])
+    assert out.splitlines() == ["src/", "  util.py", "app.py", "requirements.txt"]
+
+
+def test_large_tree_fits_budget_and_keeps_focus_build_files():
+    out = summarize_tree(_monorepo(), max_tokens=300, focus="services/svc3")
+    assert estimate_tokens(out) <= 300
+    assert "  svc3/" in out
+    assert "    pyproject.toml" in out
+    assert "vendor/ (5000 files)" in out
+
+
+def test_collapsed_directories_keep_build_file_hints():
+    out = summarize_tree(_monorepo(), max_tokens=60)
+    assert out.startswith("services/ (24080 files; svc0/app.py, svc0/pyproject.toml")
+
+
+def test_service_scope_leaves_out_other_services():
+    services = [
+        {"name": "root_service", "path": ""},
+        {"name": "api", "path": "api"},
+        {"name": "jobs", "path": "api/jobs"},
+    ]
+    paths = ["README.md", "api/go.mod", "api/main.go", "api/jobs/package.json"]
+    summary, files = service_scope(services[1], services, paths)
+    assert files == ["api/go.mod", "api/main.go"]
+    assert "Directory: api" in summary and "Files analyzed: 2" in summary
+    assert service_scope(services[0], services, paths)[1] == ["README.md"]
+    assert service_scope(services[1], services, paths + ["web/x.js"]) == (
+        summary,
+        files,
+    )
@@ -0,0 +1,78 @@
+import base64
+import json
+import random
+
+from infra_generator.repo_snapshot import RepoSnapshot
+from infra_generator.triage import FileTriage, shannon_entropy
+
+
+def _write(root, name, data):
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data if isinstance(data, bytes) else data.encode())
+
+
+def test_triage_reasons(tmp_path):
+    rng = random.Random(0)
+    _write(tmp_path, "app.py", "def main():\n    return 42\n" * 50)
+    _write(tmp_path, "big.py", "x = 1\n" * 2000)
+    _write(tmp_path, "blob.js", b"\x7fELF\x00\x01" + bytes(range(256)))
+    _write(tmp_path, "api_pb2.py", "import grpc\n")
+    _write(
+        tmp_path, "client.go", "// Code generated by protoc. DO NOT EDIT.\npackage x\n"
+    )
+    _write(tmp_path, "vendor.js", "var a=1;" * 500)
+    blob = base64.b64encode(bytes(rng.getrandbits(8) for _ in range(3000)))
+    _write(
+        tmp_path,
+        "data.ts",
+        b"\n".join(blob[i : i + 80] for i in range(0, len(blob), 80)),
+    )
+
+    snapshot = RepoSnapshot.build(str(tmp_path))
+    triage = FileTriage(max_file_bytes=5000)
+    reasons = {f.path: triage.check(f) for f in snapshot}
+    assert reasons == {
+        "app.py": None,
+        "big.py": "too large",
+        "blob.js": "binary",
+        "api_pb2.py": "generated",
+        "client.go": "generated",
+        "vendor.js": "minified",
+        "data.ts": "high entropy",
+    }
+    assert shannon_entropy(b"") == 0.0
+    assert FileTriage.from_config({"triage": {"max_file_bytes": 5}}).max_file_bytes == 5
+
+
+def test_triage_keeps_short_configs_and_utf8_text(tmp_path):
+    rng = random.Random(1)
+    cjk = [chr(c) for c in range(0x4E00, 0x4E00 + 3000)]
+    _write(tmp_path, "settings.json", json.dumps({f"key_{i}": i for i in range(40)}))
+    secrets = "".join(
+        f"KEY_{i}={base64.b64encode(rng.randbytes(96)).decode()}\n" for i in range(4)
+    )
+    _write(tmp_path, ".env", secrets)
+    # One paragraph per line: ~360 bytes but 121 characters each
+    _write(
+        tmp_path,
+        "README.zh.md",
+        "".join("".join(rng.choice(cjk) for _ in range(120)) + "\n" for _ in range(40)),
+    )
+    _write(
+        tmp_path,
+        "messages.py",
+        "".join(
+            f'MSG_{i} = "{"".join(rng.choice(cjk) for _ in range(60))}"\n'
+            for i in range(100)
+        ),
+    )
+
+    snapshot = RepoSnapshot.build(str(tmp_path))
+    triage = FileTriage()
+    assert {f.path: triage.check(f) for f in snapshot} == {
+        ".env": None,
+        "README.zh.md": None,
+        "messages.py": None,
+        "settings.json": None,
+    }
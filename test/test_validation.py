@@ -0,0 +1,104 @@
+import json
+
+from benchmarks.fake_ollama import FakeOllama
+from infra_generator.tools.infra_tools import DockerfileServiceTool
+from infra_generator.utils import load_config
+from infra_generator.validation import (
+    strip_code_fences,
+    tree_checker,
+    validate_compose,
+    validate_dockerfile,
+)
+
+TREE = ["api/pyproject.toml", "api/app/main.py", "api/poetry.lock"]
+
+
+def test_dockerfile_checks():
+    exists = tree_checker(TREE, ["*.lock"])
+    good = (
+        "FROM python:3.11-slim AS build\n"
+        "WORKDIR /app\n"
+        "COPY pyproject.toml poetry.lock ./\n"
+        "RUN pip install poetry \\\n    && poetry install --no-root\n"
+        "FROM build\n"
+        "COPY --from=build /app /app\n"
+        "COPY app/ ./app\n"
+        'CMD ["python", "-m", "app.main"]\n'
+    )
+    assert validate_dockerfile(good, "api", exists) == []
+    bad = (
+        "WORKDIR /app\n"
+        "FROM python\n"
+        "COPY requirements.txt .\n"
+        "RUNN pip install -r requirements.txt\n"
+        "CMD [python, main.py]\n"
+    )
+    errors = validate_dockerfile(bad, "api", exists)
+    assert errors == [
+        "Line 1: WORKDIR before the first FROM.",
+        "Line 2: base image 'python' has no tag; pin a specific version.",
+        "Line 3: COPY source 'requirements.txt' does not exist in the project "
+        "(looked for 'api/requirements.txt').",
+        "Line 4: unknown instruction 'RUNN'.",
+        "Line 5: CMD exec form must be a JSON array of strings.",
+    ]
+    assert validate_dockerfile("FROM node:latest\n") == [
+        "Line 1: base image 'node:latest' uses the 'latest' tag; "
+        "pin a specific version."
+    ]
+
+
+def test_compose_checks():
+    assert validate_compose("services:\n  app:\n    build: .\n") == []
+    assert validate_compose("services:\n  app: [\n")[0].startswith(
+        "Invalid YAML at line 3"
+    )
+    errors = validate_compose(
+        "services:\n"
+        "  app:\n    build: .\n    depends_on: [db]\n    ports: ['80:http']\n"
+        "  cache:\n    image: redis:latest\n    volumes: ['data:/data']\n"
+    )
+    assert errors == [
+        "Service 'app': invalid port mapping '80:http'.",
+        "Service 'app' depends on undefined service 'db'.",
+        "Service 'cache': image 'redis:latest' uses the 'latest' tag; "
+        "pin a specific version.",
+        "Service 'cache' uses named volume 'data', which is not declared under "
+        "top-level 'volumes'.",
+    ]
+
+
+def test_strip_code_fences():
+    assert strip_code_fences("```dockerfile\nFROM a:1\n```") == "FROM a:1\n"
+    assert strip_code_fences("FROM a:1") == "FROM a:1\n"
+
+
+def test_broken_dockerfile_gets_a_targeted_repair():
+    prompts = []
+
+    def responder(prompt):
+        prompts.append(prompt)
+        if "Problems found by the validator" in prompt:
+            return '```\nFROM python:3.11-slim\nCOPY app/ ./app\nCMD ["python"]\n```'
+        return 'FROM python\nCOPY src/ ./src\nCMD ["python"]\n'
+
+    with FakeOllama(dim=16, responder=responder) as ollama:
+        config = load_config()
+        config["ollama_base_url"] = ollama.url
+        payload = {
+            "service": {"name": "api", "path": "api", "language": "python"},
+            "summary": "",
+            "tree": TREE,
+            "code_context": "",
+            "config": config,
+        }
+        artifact = json.loads(DockerfileServiceTool().run(json.dumps(payload)))
+
+    assert len(prompts) == 2
+    repair = prompts[1]
+    assert "- Line 1: base image 'python' has no tag" in repair
+    assert "COPY source 'src/' does not exist" in repair
+    assert "Project Summary" not in repair  # no project context resent
+    assert artifact["validation_errors"] == []
+    assert artifact["content"].startswith("FROM python:3.11-slim\n")
+    assert [u["template"] for u in artifact["repair_usage"]] == ["dockerfile_repair"]